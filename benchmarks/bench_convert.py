@@ -0,0 +1,26 @@
+"""Wall time of freeze() and thaw() against copy.deepcopy
+
+Run with ``python benchmarks/bench_convert.py``.
+"""
+import copy
+
+from common import best_of, generate_records
+
+import scdil
+
+SIZES = (100, 10000)
+
+
+def main() -> None:
+    print(f"{'records':>8} {'freeze':>12} {'thaw':>12} {'deepcopy':>12}")
+    for n_records in SIZES:
+        value = generate_records(n_records)
+        frozen = scdil.freeze(value)
+        t_freeze = best_of(lambda: scdil.freeze(value), repeat=3)
+        t_thaw = best_of(lambda: scdil.thaw(frozen), repeat=3)
+        t_deepcopy = best_of(lambda: copy.deepcopy(frozen), repeat=3)
+        print(f"{n_records:>8} {t_freeze:12.6f} {t_thaw:12.6f} {t_deepcopy:12.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Wall time of dumps() on large lists of dicts
+
+Run with ``python benchmarks/bench_dump.py``.
+"""
+import io
+import json
+
+from common import best_of, generate_records
+
+import scdil
+from scdil._dump import MachineDumper
+
+SIZES = (1000, 10000)
+
+
+def dump_without_json(value: scdil.Value) -> str:
+    stream = io.StringIO()
+    MachineDumper(stream, use_json=False).dump(value)
+    return stream.getvalue()
+
+
+def main() -> None:
+    print(
+        f"{'records':>8} {'human':>12} {'machine':>12}"
+        f" {'no json':>12} {'json.dumps':>12}"
+    )
+    for n_records in SIZES:
+        value = generate_records(n_records)
+        t_human = best_of(lambda: scdil.dumps(value), repeat=3)
+        t_machine = best_of(lambda: scdil.dumps(value, for_humans=False), repeat=3)
+        t_no_json = best_of(lambda: dump_without_json(value), repeat=3)
+        t_json = best_of(lambda: json.dumps(value), repeat=3)
+        print(
+            f"{n_records:>8} {t_human:12.6f} {t_machine:12.6f}"
+            f" {t_no_json:12.6f} {t_json:12.6f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Microbenchmarks of FrozenDict against dict
+
+Run with ``python benchmarks/bench_frozendict.py``.
+"""
+import pickle
+from typing import Callable, Dict, List, Tuple
+
+from common import best_of
+
+from scdil import FrozenDict
+
+SIZES = (10, 1000)
+
+
+def cases(n: int) -> List[Tuple[str, Callable[[], object], Callable[[], object]]]:
+    items: Dict[str, int] = {f"key{i}": i for i in range(n)}
+    d = dict(items)
+    f = FrozenDict(items)
+    key = f"key{n // 2}"
+    pickled_d = pickle.dumps(d)
+    pickled_f = pickle.dumps(f)
+    return [
+        ("construct", lambda: dict(items), lambda: FrozenDict(items)),
+        ("adopt", lambda: dict(items), lambda: FrozenDict._from_dict(dict(items))),
+        ("getitem", lambda: d[key], lambda: f[key]),
+        ("contains", lambda: key in d, lambda: key in f),
+        ("iterate", lambda: list(d), lambda: list(f)),
+        ("items", lambda: list(d.items()), lambda: list(f.items())),
+        ("hash", lambda: hash(frozenset(d.items())), lambda: hash(f)),
+        ("eq", lambda: d == items, lambda: f == items),
+        ("pickle", lambda: pickle.dumps(d), lambda: pickle.dumps(f)),
+        ("unpickle", lambda: pickle.loads(pickled_d), lambda: pickle.loads(pickled_f)),
+    ]
+
+
+def main() -> None:
+    print(f"{'size':>6} {'operation':>10} {'dict':>12} {'FrozenDict':>12} {'ratio':>7}")
+    for n in SIZES:
+        for name, dict_op, frozen_op in cases(n):
+            number = 10000 if n < 100 else 100
+            t_dict = best_of(dict_op, number=number)
+            t_frozen = best_of(frozen_op, number=number)
+            print(
+                f"{n:>6} {name:>10} {t_dict * 1e6:>10.3f}us {t_frozen * 1e6:>10.3f}us"
+                f" {t_frozen / t_dict:>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Wall time of load() on human-formatted and JSON-compatible documents
+
+Run with ``python benchmarks/bench_load.py``.
+"""
+import json
+
+from common import best_of, generate_document
+
+import scdil
+
+SIZES = (100, 1000)
+
+
+def main() -> None:
+    print(f"{'records':>8} {'format':>8} {'scdil.load':>12} {'json.loads':>12}")
+    for n_records in SIZES:
+        for for_humans in (True, False):
+            source = generate_document(n_records, for_humans=for_humans)
+            t_scdil = best_of(lambda: scdil.load(source), repeat=3)
+            if for_humans:
+                t_json = "-"
+            else:
+                t_json = f"{best_of(lambda: json.loads(source), repeat=3):12.6f}"
+            fmt = "human" if for_humans else "machine"
+            print(f"{n_records:>8} {fmt:>8} {t_scdil:12.6f} {t_json:>12}")
+
+
+if __name__ == "__main__":
+    main()
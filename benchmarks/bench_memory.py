@@ -0,0 +1,39 @@
+"""Peak and retained memory of load() at several document sizes
+
+Run with ``python benchmarks/bench_memory.py``.
+"""
+import gc
+import tracemalloc
+
+from common import generate_document
+
+import scdil
+
+SIZES = (10, 100, 1000, 10000)
+
+
+def main() -> None:
+    print(
+        f"{'records':>8} {'source':>10} {'peak':>12} {'retained':>12}"
+        f" {'deep_sizeof':>12} {'peak/B':>8} {'value/B':>8}"
+    )
+    for n_records in SIZES:
+        source = generate_document(n_records)
+        n_bytes = len(source.encode())
+        gc.collect()
+        # tracing starts anew for each size, so the peak is that of this load
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        value = scdil.load(source)
+        after, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = scdil.deep_sizeof(value)
+        print(
+            f"{n_records:>8} {n_bytes:>10} {peak - before:>12} {after - before:>12}"
+            f" {size:>12} {(peak - before) / n_bytes:>8.2f} {size / n_bytes:>8.2f}"
+        )
+        del value
+
+
+if __name__ == "__main__":
+    main()
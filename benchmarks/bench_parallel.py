@@ -0,0 +1,28 @@
+"""Wall time of dumps() of a large list of records with several worker processes
+
+Run with ``python benchmarks/bench_parallel.py``.
+"""
+import os
+
+from common import best_of, generate_records
+
+import scdil
+
+N_RECORDS = 100000
+WORKERS = (1, 2, 4, 8)
+
+
+def main() -> None:
+    value = generate_records(N_RECORDS)
+    print(f"{N_RECORDS} records, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'human':>12} {'machine':>12}")
+    for workers in WORKERS:
+        t_human = best_of(lambda: scdil.dumps(value, workers=workers), repeat=3)
+        t_machine = best_of(
+            lambda: scdil.dumps(value, for_humans=False, workers=workers), repeat=3
+        )
+        print(f"{workers:>8} {t_human:12.6f} {t_machine:12.6f}")
+
+
+if __name__ == "__main__":
+    main()
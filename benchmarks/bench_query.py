@@ -0,0 +1,43 @@
+"""Wall time of deep lookups with compiled queries and a PathIndex
+
+Run with ``python benchmarks/bench_query.py``.
+"""
+from typing import Any, Callable, Dict, cast
+
+from common import best_of, generate_records
+
+import scdil
+
+N_LOOKUPS = 100000
+QUERY = "services[500].limits.cpu"
+
+
+def lookups(value: scdil.Value) -> Dict[str, Callable[[], object]]:
+    compiled = scdil.query(QUERY)
+    index = scdil.PathIndex(value)
+    path = ("services", 500, "limits", "cpu")
+    v: Any = value
+    return {
+        "direct": lambda: [
+            v["services"][500]["limits"]["cpu"] for _ in range(N_LOOKUPS)
+        ],
+        "compiled": lambda: [compiled.get(v) for _ in range(N_LOOKUPS)],
+        "query()": lambda: [scdil.query(QUERY).get(v) for _ in range(N_LOOKUPS)],
+        "PathIndex": lambda: [index[path] for _ in range(N_LOOKUPS)],
+    }
+
+
+def main() -> None:
+    value = scdil.freeze(cast(scdil.Value, {"services": generate_records(1000)}))
+    print(f"{N_LOOKUPS} lookups of {QUERY}")
+    for name, func in lookups(value).items():
+        print(f"{name:>10} {best_of(func, repeat=3):12.6f}")
+    wildcard = scdil.query("services[?enabled == true].limits.cpu")
+    t_filter = best_of(lambda: wildcard.all(value), repeat=3)
+    print(f"{'filter':>10} {t_filter:12.6f} (all enabled services)")
+    t_index = best_of(lambda: scdil.PathIndex(value), repeat=3)
+    print(f"{'indexing':>10} {t_index:12.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import random
+import time
+from typing import Any, Callable, Dict, List, cast
+
+import scdil
+
+
+def generate_records(n_records: int, seed: int = 0) -> scdil.Value:
+    """Generates a list of config-like records with mixed scalar and nested values"""
+    rng = random.Random(seed)
+    records: List[Dict[str, Any]] = []
+    for i in range(n_records):
+        records.append(
+            {
+                "name": f"host-{i:06d}",
+                "enabled": rng.random() < 0.9,
+                "weight": rng.random(),
+                "port": rng.randint(1024, 65535),
+                "tags": [rng.choice(["web", "db", "cache", "batch"]) for _ in range(3)],
+                "limits": {"cpu": rng.randint(1, 64), "memory": "4Gi", "burst": None},
+                "description": "generated\nmultiline\ndescription",
+            }
+        )
+    return cast(scdil.Value, records)
+
+
+def generate_document(n_records: int, for_humans: bool = True) -> str:
+    """Generates SCDIL text for a block sequence of *n_records* records"""
+    return scdil.dumps(generate_records(n_records), for_humans=for_humans)
+
+
+def best_of(func: Callable[[], object], repeat: int = 5, number: int = 1) -> float:
+    """Returns the best per-call wall time over *repeat* runs of *number* calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
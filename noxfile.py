@@ -1,3 +1,5 @@
+import pathlib
+
 import nox
 
 
@@ -30,3 +32,10 @@ def tests(session: nox.Session) -> None:
         *session.posargs,
     )
     session.run("coverage", "xml")
+
+
+@nox.session
+def bench(session: nox.Session) -> None:
+    session.install(".")
+    for script in sorted(pathlib.Path("benchmarks").glob("bench_*.py")):
+        session.run("python", str(script), *session.posargs)
@@ -1,5 +1,20 @@
-from scdil._dump import dump, dumps  # noqa: F401
+from scdil._append import Appender  # noqa: F401
+from scdil._convert import freeze, thaw  # noqa: F401
+from scdil._cst import Document  # noqa: F401
+from scdil._dump import dump, dump_file, dumps, fingerprint, iterdumps  # noqa: F401
 from scdil._frozendict import FrozenDict  # noqa: F401
+from scdil._hamt import PersistentMap, PersistentMapEvolver  # noqa: F401
+from scdil._layered import LayeredMapping  # noqa: F401
 from scdil._load import load  # noqa: F401
+from scdil._query import PathIndex, Query, query  # noqa: F401
+from scdil._reload import Reloader  # noqa: F401
+from scdil._shm import (  # noqa: F401
+    SharedChannel,
+    SharedMapping,
+    SharedSequence,
+    from_shared_memory,
+    to_shared_memory,
+)
+from scdil._stats import DumpStats, LoadStats, deep_sizeof  # noqa: F401
 from scdil._types import Mapping, Sequence, Value  # noqa: F401
 from scdil._version import __version__  # noqa: F401
@@ -0,0 +1,105 @@
+import os
+import re
+from types import TracebackType
+from typing import BinaryIO, Iterable, Optional, Tuple, Type, Union, cast
+
+from scdil._dump import Dumpable, dumps
+from scdil._types import Value
+from scdil._writers import encode, write_all
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+
+# the dash of a block sequence element is followed by a space or a newline, unlike
+# that of a negative number
+_block_sequence_start = re.compile(rb"-(?:[ \n#]|$)")
+
+
+class Appender:
+    """Appends elements to a file holding a top-level block sequence
+
+    Elements are written in the same format as :func:`dump`, as if the file had been
+    dumped whole, without reading the elements already in the file. The file is
+    created if it does not exist, and must otherwise be empty or hold a block sequence,
+    or the empty sequence ``[]`` that :func:`dump` writes, which is replaced. Appending
+    to a file holding anything else raises ValueError.
+
+    Each append takes an exclusive advisory lock on the file, where ``fcntl`` is
+    available, so several processes can append to the same file.
+    """
+
+    def __init__(self, path: Union[str, "os.PathLike[str]"]) -> None:
+        flags = os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        self.path = path
+        self._fd = os.open(path, flags, 0o666)
+
+    def append(self, value: Dumpable) -> None:
+        """Appends an element to the file"""
+        self.extend((value,))
+
+    def extend(self, values: Iterable[Dumpable]) -> None:
+        """Appends elements to the file, with a single write"""
+        data = encode(dumps(cast(Value, list(values))))
+        if data == b"[]\n":
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            write_all(self._fd, [self._separator(), data])
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _separator(self) -> bytes:
+        """Checks the root of the file, returning what must be written before elements"""
+        size = os.fstat(self._fd).st_size
+        if size == 0:
+            return b""
+        # a duplicate, so the file is closed with it, writes still go to the end
+        with open(os.dup(self._fd), "rb") as f:
+            f.seek(0)
+            start, line = _first_value_line(f)
+            if line.strip() == b"[]" and not _first_value_line(f)[1]:
+                os.ftruncate(self._fd, start)
+                return b""
+            elif line and _block_sequence_start.match(line.lstrip()) is None:
+                raise ValueError(
+                    f"Can't append to {str(self.path)!r}, it does not hold a block "
+                    "sequence"
+                )
+            # a file edited by hand may not end in a newline
+            f.seek(size - 1)
+            return b"" if f.read(1) == b"\n" else b"\n"
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "Appender":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+def _first_value_line(f: BinaryIO) -> Tuple[int, bytes]:
+    """Returns the offset and text of the first line not blank or a comment
+
+    The line is empty if there is none.
+    """
+    start = f.tell()
+    for line in iter(f.readline, b""):
+        stripped = line.strip()
+        if stripped and not stripped.startswith(b"#"):
+            return start, line
+        start += len(line)
+    return start, b""
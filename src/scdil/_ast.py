@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional, Union
 
 
@@ -30,11 +30,15 @@ class Boolean(Token):
 @dataclass
 class Integer(Token):
     value: int
+    # decimal text of the value, as written if it was a decimal literal
+    text: str = field(default="", repr=False, compare=False)
 
 
 @dataclass
 class Float(Token):
     value: float
+    # text of the value as written
+    text: str = field(default="", repr=False, compare=False)
 
 
 @dataclass
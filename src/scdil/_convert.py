@@ -0,0 +1,142 @@
+from operator import is_
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, cast
+
+from scdil._frozendict import FrozenDict
+from scdil._types import Mapping, Sequence, Value
+
+_scalar_types = (type(None), bool, int, float, str)
+_scalars = frozenset(_scalar_types)
+
+# the Protocol isinstance checks are slow, so the builtin containers are looked up first
+_builtin_containers: Dict[type, bool] = {
+    list: False,
+    tuple: False,
+    dict: True,
+    FrozenDict: True,
+}
+
+# A container being converted: the original, its key in the parent container,
+# an iterator over its (key, child) pairs, and the converted children, either a dict
+# or a list filled by index.
+_Frame = Tuple[Value, Any, Iterator[Tuple[Any, Value]], Any]
+
+
+def freeze(value: Value) -> Value:
+    """Returns an immutable copy of a value, with tuples and FrozenDicts as containers
+
+    Tuples and FrozenDicts that only contain immutable values are returned as is.
+    A container reachable more than once is converted once and shared in the result.
+    """
+    if _kind(value) is None:
+        return value
+    memo: Dict[int, Value] = {}
+    converted = _keep_alive(value)
+    # containers being converted, the ancestors of the next child
+    active: Set[int] = {id(value)}
+    stack: List[_Frame] = [_frame(value, None)]
+    while stack:
+        children, out = stack[-1][2:]
+        for key, child in children:
+            if type(child) not in _scalars:
+                res = memo.get(id(child))
+                if res is None:
+                    if _kind(child) is not None:
+                        _enter(active, child)
+                        stack.append(_frame(child, key))
+                        break
+                    res = child
+                child = res
+            out[key] = child
+        else:
+            obj, key, _, out = stack.pop()
+            active.discard(id(obj))
+            res = memo[id(obj)] = _frozen(obj, out)
+            converted.append(obj)
+            if not stack:
+                return res
+            stack[-1][3][key] = res
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+def thaw(value: Value) -> Value:
+    """Returns a mutable copy of a value, with lists and dicts as containers
+
+    Mapping keys are left as they are, since they must stay hashable.
+    Like :func:`copy.deepcopy`, a container reachable more than once is converted
+    once and shared in the result, and recursive values keep their structure.
+    """
+    if _kind(value) is None:
+        return value
+    root = _frame(value, None)
+    result: Value = root[3]
+    memo: Dict[int, Value] = {id(value): result}
+    converted = _keep_alive(value)
+    stack: List[_Frame] = [root]
+    while stack:
+        children, out = stack[-1][2:]
+        for key, child in children:
+            if type(child) not in _scalars:
+                res = memo.get(id(child))
+                if res is None:
+                    if _kind(child) is not None:
+                        # the copy is filled in place, so it can be used right away
+                        frame = _frame(child, key)
+                        out[key] = memo[id(child)] = frame[3]
+                        converted.append(child)
+                        stack.append(frame)
+                        break
+                    res = child
+                child = res
+            out[key] = child
+        else:
+            stack.pop()
+    return result
+
+
+def _keep_alive(value: Value) -> List[Value]:
+    # The memo is keyed by id, so the containers in it must outlive the conversion.
+    # Views like SharedMapping create the containers they hold on every access.
+    return [value]
+
+
+def _kind(value: Value) -> Optional[bool]:
+    """Returns None for scalars, False for sequences, and True for mappings"""
+    if type(value) in _scalars:
+        return None
+    try:
+        return _builtin_containers[type(value)]
+    except KeyError:
+        pass
+    if isinstance(value, _scalar_types):
+        return None
+    elif isinstance(value, Sequence):
+        return False
+    elif isinstance(value, Mapping):
+        return True
+    raise TypeError(f"Got unsupported type {type(value).__qualname__}")
+
+
+def _enter(active: Set[int], value: Value) -> None:
+    if id(value) in active:
+        raise ValueError(f"Object {object.__repr__(value)} is recursive, aborting")
+    active.add(id(value))
+
+
+def _frame(value: Value, key: Any) -> _Frame:
+    if _kind(value):
+        return (value, key, iter(cast(Mapping, value).items()), {})
+    seq = cast(Sequence, value)
+    return (value, key, enumerate(seq), [None] * len(seq))
+
+
+def _frozen(value: Value, out: Any) -> Value:
+    if isinstance(out, dict):
+        if isinstance(value, FrozenDict) and all(
+            map(is_, out.values(), value.values())
+        ):
+            return value
+        return FrozenDict._from_dict(out)
+    res = tuple(out)
+    if isinstance(value, tuple) and all(map(is_, res, value)):
+        return value
+    return res
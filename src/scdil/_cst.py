@@ -0,0 +1,502 @@
+import re
+import typing
+from bisect import bisect_right
+from io import StringIO
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple, Union, cast
+
+import scdil._ast as ast
+from scdil._dump import HumanDumper, dumps
+from scdil._load import EvalContext, load, scdil_eval
+from scdil._parse import Lexer, Parser
+from scdil._types import MAPPING, SEQUENCE, STR, Value, kind_of
+
+_context = EvalContext()
+
+_newline = re.compile("\n")
+
+_block_types = (
+    ast.BlockSequence,
+    ast.BlockMapping,
+    ast.LiteralLines,
+    ast.FoldedLines,
+    ast.EscapedLiteralLines,
+    ast.EscapedFoldedLines,
+)
+
+# The places a value can be in: the whole document, after the : or - of a block
+# element, or inside a literal sequence or mapping
+_ROOT, _BLOCK, _LITERAL = range(3)
+
+
+class Document:
+    """SCDIL text that can be edited, keeping its comments and formatting
+
+    Indexing the document indexes its top-level value: sequences and mappings are
+    returned as views that can be indexed and assigned to in turn, and other values
+    are loaded. Keys can be added to mappings, but not removed.
+
+    Each assignment formats the new value like :func:`dump` does and only replaces
+    the text of the old one, so the cost of an edit depends on the size of the value,
+    not the size of the document. :func:`str` returns the edited text.
+    """
+
+    def __init__(self, stream: Union[str, TextIO]) -> None:
+        text = stream if isinstance(stream, str) else stream.read()
+        self._source = _Source(text)
+        self._slot = _Slot(self._source, self._source.root, _ROOT)
+
+    @property
+    def root(self) -> Any:
+        """The top-level value, as a view if it is a sequence or mapping"""
+        return self._slot.get()
+
+    @root.setter
+    def root(self, value: Value) -> None:
+        self._slot.set(value)
+
+    @property
+    def value(self) -> Value:
+        """The top-level value, loaded from the edited text"""
+        return load(str(self))
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.root[key]
+
+    def __setitem__(self, key: Any, value: Value) -> None:
+        self.root[key] = value
+
+    def __str__(self) -> str:
+        parts: List[str] = []
+        self._source.write(parts)
+        return "".join(parts)
+
+    def edits(self) -> List[Tuple[int, int, str]]:
+        """Returns the edits made to the original text, in order
+
+        Each edit is a (start, end, text) tuple, replacing the characters from *start*
+        to *end* of the original text by *text*.
+        """
+        edits = []
+        for splice in self._source.sorted_splices():
+            parts: List[str] = []
+            splice.write(parts)
+            edits.append((splice.start, splice.end, "".join(parts)))
+        return edits
+
+
+class MappingNode(typing.Mapping[Value, Any]):
+    """View of a mapping in a :class:`Document`"""
+
+    def __init__(self, slot: "_Slot") -> None:
+        self._slot = slot
+        self._node = slot.node
+        self._items: Dict[Any, _Slot] = {}
+        self._inserted = 0
+        source = slot.source
+        if isinstance(self._node, ast.BlockMapping):
+            for elem in self._node.elements:
+                lead = source.end(elem.colon)
+                self._items[elem.key.value] = _Slot(
+                    source, elem.value, _BLOCK, elem.N, lead, owner=slot
+                )
+        else:
+            for item in cast(ast.Mapping, self._node).elements:
+                key = scdil_eval(item.key, _context.keys)
+                self._items[key] = _Slot(source, item.value, _LITERAL, owner=slot)
+
+    def __getitem__(self, key: Any) -> Any:
+        self._check()
+        return self._items[key].get()
+
+    def __setitem__(self, key: Any, value: Value) -> None:
+        self._check()
+        slot = self._items.get(key)
+        if slot is None:
+            slot = self._insert(key)
+        slot.set(value)
+
+    def __iter__(self) -> Iterator[Any]:
+        self._check()
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        self._check()
+        return len(self._items)
+
+    def _check(self) -> None:
+        if self._slot.node is not self._node:
+            raise RuntimeError("The mapping was replaced in the document")
+
+    def _insert(self, key: Any) -> "_Slot":
+        source = self._slot.source
+        if isinstance(self._node, ast.BlockMapping):
+            if not isinstance(key, str):
+                raise TypeError(
+                    f"Block mapping keys must be strings, got {type(key).__qualname__}"
+                )
+            # after the comments on the line of the last element
+            N = self._node.N
+            offset = source.line_end(source.end(self._node.elements[-1].value))
+            splice = source.splice(offset, "\n" + " " * N + _dump_block_key(key))
+            slot = _Slot(source, None, _BLOCK, N, offset, splice, self._slot)
+        else:
+            splice = self._insert_literal(source, cast(ast.Mapping, self._node), key)
+            slot = _Slot(source, None, _LITERAL, splice=splice, owner=self._slot)
+        self._items[key] = slot
+        self._inserted += 1
+        return slot
+
+    def _insert_literal(
+        self, source: "_Source", node: ast.Mapping, key: Any
+    ) -> "_Splice":
+        item = _dump_literal(key) + ": "
+        if not node.elements:
+            separator = ", " if self._inserted else ""
+            return source.splice(source.start(node.rcurly), separator + item)
+        last = node.elements[-1]
+        first = _first_token(last.key)
+        if first.position.lineno != node.lcurly.position.lineno:
+            separator = "\n" + " " * first.position.charno
+        else:
+            separator = " "
+        if last.comma is None:
+            return source.splice(source.end(last.value), "," + separator + item)
+        return source.splice(source.end(last.comma), separator + item, ",")
+
+
+class SequenceNode(typing.Sequence[Any]):
+    """View of a sequence in a :class:`Document`"""
+
+    def __init__(self, slot: "_Slot") -> None:
+        self._slot = slot
+        self._node = slot.node
+        source = slot.source
+        if isinstance(self._node, ast.BlockSequence):
+            self._slots = [
+                _Slot(
+                    source,
+                    elem.value,
+                    _BLOCK,
+                    elem.N,
+                    source.end(elem.dash),
+                    owner=slot,
+                )
+                for elem in self._node.elements
+            ]
+        else:
+            self._slots = [
+                _Slot(source, elem.value, _LITERAL, owner=slot)
+                for elem in cast(ast.Sequence, self._node).elements
+            ]
+
+    def __getitem__(self, index: Any) -> Any:
+        self._check()
+        if isinstance(index, slice):
+            raise TypeError("Document sequences can not be sliced")
+        return self._slots[index].get()
+
+    def __setitem__(self, index: int, value: Value) -> None:
+        self._check()
+        self._slots[index].set(value)
+
+    def __len__(self) -> int:
+        self._check()
+        return len(self._slots)
+
+    def _check(self) -> None:
+        if self._slot.node is not self._node:
+            raise RuntimeError("The sequence was replaced in the document")
+
+
+class _Source:
+    """Text parsed into a syntax tree, with the edits made to it
+
+    Offsets are indexes into the text. The first *skip* characters are only there to
+    put the first line of the value at the right column, and are not written.
+    """
+
+    def __init__(self, text: str, skip: int = 0) -> None:
+        self.text = text
+        self.skip = skip
+        self.lines = [0]
+        self.lines.extend(match.end() for match in _newline.finditer(text))
+        # where each token ends, by id, since the tokens only record where they start
+        self.ends: Dict[int, ast.Position] = {}
+        lexer = _EndRecorder(Lexer(StringIO(text)), self.ends)
+        self.root = Parser(StringIO(), lexer=lexer).parse()
+        self.splices: List[_Splice] = []
+
+    def offset(self, position: ast.Position) -> int:
+        return self.lines[position.lineno] + position.charno
+
+    def start(self, node: Union[ast.Node, ast.Token]) -> int:
+        return self.offset(_first_token(node).position)
+
+    def end(self, node: Union[ast.Node, ast.Token]) -> int:
+        return self.offset(self.ends[id(_last_token(node))])
+
+    def column(self, offset: int) -> int:
+        return offset - self.lines[bisect_right(self.lines, offset) - 1]
+
+    def indentation(self, offset: int) -> int:
+        """Returns the indentation of the line holding *offset*"""
+        start = self.lines[bisect_right(self.lines, offset) - 1]
+        line = self.text[start:offset]
+        return len(line) - len(line.lstrip(" "))
+
+    def line_end(self, offset: int) -> int:
+        end = self.text.find("\n", offset)
+        return len(self.text) if end < 0 else end
+
+    def splice(self, offset: int, prefix: str, suffix: str = "") -> "_Splice":
+        """Adds a splice inserting text at *offset*, after those already there"""
+        splice = _Splice(offset, offset, len(self.splices), prefix, suffix)
+        self.splices.append(splice)
+        return splice
+
+    def sorted_splices(self) -> List["_Splice"]:
+        return sorted(self.splices, key=_splice_order)
+
+    def discard_within(self, slot: "_Slot") -> None:
+        """Drops the splices editing values inside *slot*, which is being replaced"""
+        self.splices = [
+            splice for splice in self.splices if not _inside(splice.slot, slot)
+        ]
+
+    def write(self, parts: List[str]) -> None:
+        pos = self.skip
+        for splice in self.sorted_splices():
+            assert splice.start >= pos, "splices must not overlap"
+            parts.append(self.text[pos : splice.start])
+            splice.write(parts)
+            pos = splice.end
+        parts.append(self.text[pos:])
+
+
+class _Splice:
+    """Text replacing the original text from *start* to *end*
+
+    It is the fixed *prefix* and *suffix* around the value in *source*, which is
+    preceded by *lead* when the value must start on a new line or after a space.
+    """
+
+    def __init__(
+        self, start: int, end: int, order: int, prefix: str = "", suffix: str = ""
+    ) -> None:
+        self.start = start
+        self.end = end
+        self.order = order
+        self.prefix = prefix
+        self.lead = ""
+        self.source: Optional[_Source] = None
+        self.suffix = suffix
+        # the slot of the value written by the splice
+        self.slot: Optional[_Slot] = None
+
+    def write(self, parts: List[str]) -> None:
+        assert self.source is not None
+        parts.append(self.prefix + self.lead)
+        self.source.write(parts)
+        parts.append(self.suffix)
+
+
+def _splice_order(splice: _Splice) -> Tuple[int, int, int]:
+    return splice.start, splice.end, splice.order
+
+
+class _Slot:
+    """Where a value is in a document, and the node holding its current value
+
+    For block values, *column* is the column of the key or dash of the element, and
+    *lead* the offset after its : or -. Slots of inserted keys start out with a splice
+    and no node.
+    """
+
+    def __init__(
+        self,
+        parent: _Source,
+        node: Optional[ast.Node],
+        context: int,
+        column: int = 0,
+        lead: int = -1,
+        splice: Optional[_Splice] = None,
+        owner: Optional["_Slot"] = None,
+    ) -> None:
+        self.parent = parent
+        # the slot of the container holding the value
+        self.owner = owner
+        self.context = context
+        self.column = column
+        self.lead = lead
+        self.splice = splice
+        if node is None:
+            assert splice is not None
+            splice.slot = self
+            self.start = self.end = splice.start
+        else:
+            self.start = parent.start(node)
+            self.end = parent.end(node)
+        self.source = parent
+        self.node = node
+        self.view: Union[MappingNode, SequenceNode, None] = None
+
+    def get(self) -> Any:
+        node = self.node
+        if isinstance(node, (ast.Mapping, ast.BlockMapping)):
+            if self.view is None:
+                self.view = MappingNode(self)
+            return self.view
+        elif isinstance(node, (ast.Sequence, ast.BlockSequence)):
+            if self.view is None:
+                self.view = SequenceNode(self)
+            return self.view
+        return scdil_eval(cast(ast.Node, node), _context)
+
+    def set(self, value: Value) -> None:
+        if self.context == _LITERAL:
+            text = _dump_literal(value)
+        else:
+            text = dumps(value)[:-1]
+        splice = self.splice
+        if splice is None:
+            splice = self.splice = _Splice(
+                self.start, self.end, len(self.parent.splices)
+            )
+            splice.slot = self
+            self.parent.splices.append(splice)
+        # the edits inside the old value would be written over the new one
+        self.parent.discard_within(self)
+        if self.context == _ROOT:
+            splice.end = self.end
+            indent = self.parent.column(self.start)
+            if _is_block(value, text):
+                self.move_comment(splice, indent)
+        elif self.context == _LITERAL:
+            indent = self.parent.indentation(self.start)
+        else:
+            indent = self.place_block_value(splice, _is_block(value, text))
+        # the first line is indented too, so the text parses with the right columns
+        source = _Source(" " * indent + text.replace("\n", "\n" + " " * indent), indent)
+        splice.source = source
+        self.source = source
+        self.node = source.root
+        self.view = None
+
+    def place_block_value(self, splice: _Splice, block: bool) -> int:
+        """Decides where a new block element value goes, returning its indentation
+
+        A value that has the same shape as the old one, both blocks or both inline,
+        takes its place. Otherwise everything after the : or - is replaced, so the
+        value can start on the next line or the same one. A comment after the old
+        value is then moved before a new block, onto the line of the : or -.
+        """
+        splice.end = self.end
+        if splice.start == self.lead or block != isinstance(self.node, _block_types):
+            splice.start = self.lead
+            indent = self.column + 2
+            splice.lead = "\n" + " " * indent if block else " "
+            comment = self.comment_after() if block else ""
+            if comment:
+                splice.end += len(comment)
+                splice.lead = comment + splice.lead
+            return indent
+        splice.lead = ""
+        if not block:
+            return self.column + 2
+        indent = self.parent.column(self.start)
+        self.move_comment(splice, indent)
+        return indent
+
+    def comment_after(self) -> str:
+        """Returns the comment after the old value, with the spaces before it"""
+        if self.node is None:
+            return ""
+        rest = self.parent.text[self.end : self.parent.line_end(self.end)]
+        return rest if rest.lstrip(" ").startswith("#") else ""
+
+    def move_comment(self, splice: _Splice, indent: int) -> None:
+        """Moves a comment after the old value to its own line before the new block
+
+        The comment would otherwise follow the last line of the block, and be part of
+        a block string.
+        """
+        comment = self.comment_after()
+        if comment:
+            splice.end += len(comment)
+            splice.lead = comment.lstrip(" ") + "\n" + " " * indent
+
+
+class _EndRecorder(Iterator[ast.Token]):
+    """Wraps a lexer, recording where each token ends"""
+
+    def __init__(self, lexer: Lexer, ends: Dict[int, ast.Position]) -> None:
+        self._lexer = lexer
+        self._ends = ends
+
+    def __next__(self) -> ast.Token:
+        tok = next(self._lexer)
+        self._ends[id(tok)] = self._lexer.position
+        return tok
+
+
+def _inside(slot: Optional[_Slot], ancestor: _Slot) -> bool:
+    """Returns True if *slot* is held, directly or not, by the value of *ancestor*"""
+    while slot is not None:
+        slot = slot.owner
+        if slot is ancestor:
+            return True
+    return False
+
+
+def _first_token(node: Union[ast.Node, ast.Token]) -> ast.Token:
+    if isinstance(node, ast.Token):
+        return node
+    elif isinstance(node, ast.Sequence):
+        return node.lbracket
+    elif isinstance(node, ast.Mapping):
+        return node.lcurly
+    elif isinstance(node, ast.BlockSequence):
+        return node.elements[0].dash
+    elif isinstance(node, ast.BlockMapping):
+        return node.elements[0].key
+    return cast(ast.Token, node.lines[0])
+
+
+def _last_token(node: Union[ast.Node, ast.Token]) -> ast.Token:
+    while True:
+        if isinstance(node, ast.Token):
+            return node
+        elif isinstance(node, ast.Sequence):
+            return node.rbracket
+        elif isinstance(node, ast.Mapping):
+            return node.rcurly
+        elif isinstance(node, (ast.BlockSequence, ast.BlockMapping)):
+            node = node.elements[-1].value
+        else:
+            return cast(ast.Token, node.lines[-1])
+
+
+def _is_block(value: Value, text: str) -> bool:
+    """Returns True if *text*, the dump of *value*, is a block"""
+    kind = kind_of(value)
+    if kind == STR:
+        return not text.startswith('"')
+    elif kind < SEQUENCE:
+        return False
+    return not text.startswith("{" if kind == MAPPING else "[")
+
+
+def _dump_literal(value: Value) -> str:
+    stream = StringIO()
+    dumper = HumanDumper(stream)
+    dumper.run(dumper.dispatch_literal(value, depth=0))
+    dumper.flush()
+    return stream.getvalue()
+
+
+def _dump_block_key(key: str) -> str:
+    stream = StringIO()
+    dumper = HumanDumper(stream)
+    dumper.dump_block_mapping_key(key)
+    dumper.flush()
+    return stream.getvalue()
@@ -1,37 +1,331 @@
+import hashlib
 import io
 import json
 import math
+import os
+import re
+import secrets
 import sys
 from abc import ABC, abstractmethod
-from typing import Iterable, Iterator, Set, TextIO, Tuple, TypeVar, cast
-
-from scdil._types import Mapping, Sequence, Value
-
-T = TypeVar("T")
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from operator import itemgetter
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+    Union,
+    cast,
+)
+
+from scdil._frozendict import FrozenDict
+from scdil._stats import DumpStats, NodeCounter, StatsWriter
+from scdil._types import (
+    ITERATOR,
+    MAPPING,
+    SEQUENCE,
+    STR,
+    Mapping,
+    Sequence,
+    Value,
+    kind_of,
+)
+from scdil._writers import BufferWriter, HashWriter, Output, text_writer
+
+# Values, or iterators dumped as sequences
+Dumpable = Union[Value, Iterator[Value]]
 
 
 def dumps(
-    value: Value,
+    value: Dumpable,
     *,
     for_humans: bool = True,
+    canonical: bool = False,
+    check_circular: bool = True,
+    workers: int = 1,
+    stats: Optional[DumpStats] = None,
 ) -> str:
-    """Dumps a Python value as a SCDIL string"""
+    """Dumps a Python value as a SCDIL string
+
+    Iterators, such as generators, are dumped as sequences.
+    """
     string = io.StringIO()
-    dump(value, stream=string, for_humans=for_humans)
+    dump(
+        value,
+        stream=string,
+        for_humans=for_humans,
+        canonical=canonical,
+        check_circular=check_circular,
+        workers=workers,
+        stats=stats,
+    )
     return string.getvalue()
 
 
 def dump(
-    value: Value,
+    value: Dumpable,
+    *,
+    stream: Output = sys.stdout,
+    for_humans: bool = True,
+    canonical: bool = False,
+    check_circular: bool = True,
+    workers: int = 1,
+    stats: Optional[DumpStats] = None,
+) -> None:
+    """Dumps a Python value in SCDIL format to the stream
+
+    *stream* can be a text stream, or a binary stream, bytearray, or file descriptor
+    to write the output to as UTF-8.
+
+    Iterators, such as generators, are dumped as sequences. Their elements are
+    written to the stream as they are produced, so they are never all in memory.
+
+    If *canonical* is True, the value is dumped in the machine format whatever
+    *for_humans* is, with the keys of mappings sorted. The output then only depends
+    on the contents of the value, which makes it suitable for hashing, see
+    :func:`fingerprint`.
+
+    Containers may appear more than once in the value, but a container holding itself
+    raises ValueError. If *check_circular* is False, that check is skipped, which is
+    faster, but a recursive value is then dumped until memory runs out. Only skip it
+    for values known to be acyclic, like those returned by :func:`load`.
+
+    If *workers* is more than 1, the elements of a top-level sequence or the items of
+    a top-level mapping are dumped in chunks by a pool of that many processes, which
+    must be able to pickle them. The output is the same as with a single process.
+
+    If *stats* is given, counters and timings are added to it.
+    """
+    writer = text_writer(stream)
+    options = DumpOptions(for_humans, canonical, check_circular)
+    if stats is not None:
+        dump_with_stats(value, writer, options, workers, stats)
+    else:
+        dump_to(writer, value, options, workers)
+    if writer is not stream:
+        writer.flush()
+
+
+def dump_file(
+    path: Union[str, "os.PathLike[str]"],
+    value: Dumpable,
     *,
-    stream: TextIO = sys.stdout,
     for_humans: bool = True,
+    canonical: bool = False,
+    check_circular: bool = True,
+    workers: int = 1,
+) -> None:
+    """Dumps a Python value in SCDIL format to a file, replacing it atomically
+
+    The value is dumped to a temporary file next to *path*, which is then renamed
+    over it, so readers see either the previous file or the whole new one.
+    """
+    path = os.fspath(path)
+    temp_path = f"{path}.{secrets.token_hex(4)}.tmp"
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    fd = os.open(temp_path, flags, 0o666)
+    try:
+        try:
+            dump(
+                value,
+                stream=fd,
+                for_humans=for_humans,
+                canonical=canonical,
+                check_circular=check_circular,
+                workers=workers,
+            )
+            # the data must be on disk before the rename is
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class DumpOptions(NamedTuple):
+    for_humans: bool = True
+    canonical: bool = False
+    check_circular: bool = True
+
+
+def make_dumper(
+    stream: TextIO, options: DumpOptions, use_json: bool = True
+) -> "DumperBase":
+    if options.canonical:
+        return CanonicalDumper(stream, options.check_circular, use_json)
+    elif options.for_humans:
+        return HumanDumper(stream=stream, check_circular=options.check_circular)
+    return MachineDumper(stream, options.check_circular, use_json)
+
+
+def dump_to(
+    stream: TextIO,
+    value: Dumpable,
+    options: DumpOptions,
+    workers: int,
+    counter: Optional[NodeCounter] = None,
 ) -> None:
-    """Dumps a Python value in SCDIL format to the stream"""
-    if for_humans:
-        HumanDumper(stream=stream).dump(value)
+    kind = kind_of(value)
+    if workers > 1 and kind >= SEQUENCE:
+        if counter is not None and kind == ITERATOR:
+            value = counter.elements(cast(Iterator[Value], value))
+        dump_parallel(stream, value, options, workers)
     else:
-        MachineDumper(stream=stream).dump(value)
+        dumper = make_dumper(stream, options)
+        dumper.counter = counter
+        dumper.dump(value)
+
+
+# elements or items of the top-level container dumped by each task of dump_parallel
+parallel_chunk_length = 1000
+
+
+def dump_parallel(
+    stream: TextIO, value: Dumpable, options: DumpOptions, workers: int
+) -> None:
+    """Dumps a container in a pool of processes, which each dump chunks of it
+
+    At depth 0, the dump of each chunk is the prefix, the chunk's part of the dump
+    of the whole container, and the suffix. Those parts are joined by the separator.
+    """
+    chunks, literal_mapping = _split(value, options.canonical)
+    first = next(chunks, None)
+    if first is None:
+        # empty containers are always dumped as literals
+        make_dumper(stream, options).dump(value)
+        return
+    if options.canonical or not options.for_humans:
+        brackets = "{}" if isinstance(first, dict) else "[]"
+        prefix, separator, suffix = brackets[0], ",", brackets[1]
+    elif literal_mapping:
+        prefix, separator, suffix = "{\n", ",\n", "\n}\n"
+    else:
+        # block sequences and mappings end with a newline
+        prefix, separator, suffix = "", "", ""
+    all_chunks = chain((first,), chunks)
+    with ProcessPoolExecutor(workers) as executor:
+        # only a few chunks are in flight, the container may be an iterator
+        pending = deque(
+            executor.submit(_dump_chunk, chunk, options, literal_mapping)
+            for chunk in islice(all_chunks, 2 * workers)
+        )
+        stream.write(prefix)
+        while pending:
+            text = pending.popleft().result()
+            for chunk in islice(all_chunks, 1):
+                pending.append(
+                    executor.submit(_dump_chunk, chunk, options, literal_mapping)
+                )
+            stream.write(text[len(prefix) : len(text) - len(suffix)])
+            if pending:
+                stream.write(separator)
+        stream.write(suffix)
+
+
+def _split(value: Dumpable, canonical: bool) -> Tuple[Iterator[Any], bool]:
+    """Returns the chunks of a container, and whether it is a literal mapping"""
+    if kind_of(value) != MAPPING:
+        iterator = iter(cast(Iterable[Value], value))
+        return iter(lambda: list(islice(iterator, parallel_chunk_length)), []), False
+    mapping = cast(Mapping, value)
+    items = iter(sorted_items(mapping) if canonical else mapping.items())
+    return (
+        iter(lambda: dict(islice(items, parallel_chunk_length)), {}),
+        not all_str(mapping),
+    )
+
+
+def _dump_chunk(chunk: Value, options: DumpOptions, literal_mapping: bool) -> str:
+    stream = io.StringIO()
+    dumper = make_dumper(stream, options)
+    if literal_mapping and isinstance(dumper, HumanDumper):
+        # the chunk may have only string keys, while the whole mapping does not
+        dumper.run(dumper.dump_literal_mapping(cast(Mapping, chunk), depth=0))
+        dumper.write("\n")
+        dumper.flush()
+    else:
+        dumper.dump(chunk)
+    return stream.getvalue()
+
+
+def fingerprint(
+    value: Dumpable, *, algorithm: str = "sha256", check_circular: bool = True
+) -> str:
+    """Returns the hex digest of the canonical dump of a value
+
+    The dump is hashed as it is written, without building it whole. See
+    :func:`hashlib.new` for the algorithms available.
+    """
+    writer = HashWriter(hashlib.new(algorithm))
+    # the JSON encoder would build the dump of a whole document in one string
+    CanonicalDumper(
+        cast(TextIO, writer), check_circular=check_circular, use_json=False
+    ).dump(value)
+    return writer.hash.hexdigest()
+
+
+def iterdumps(
+    value: Dumpable,
+    *,
+    for_humans: bool = True,
+    canonical: bool = False,
+    check_circular: bool = True,
+    chunk_size: int = 65536,
+) -> Iterator[bytes]:
+    """Dumps a Python value as SCDIL, yielding the UTF-8 encoded output in chunks
+
+    Chunks are yielded while the value is dumped, and all but the last are
+    *chunk_size* bytes long.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    chunks = BufferWriter()
+    options = DumpOptions(for_humans, canonical, check_circular)
+    # the JSON encoder would dump a whole document before the first chunk
+    dumper = make_dumper(cast(TextIO, chunks), options, use_json=False)
+    for _ in dumper.steps(dumper.dump_value(value)):
+        if len(chunks.buffer) >= chunk_size:
+            yield from chunks.take(chunk_size)
+    dumper.flush()
+    yield from chunks.take(chunk_size)
+    if chunks.buffer:
+        yield bytes(chunks.buffer)
+
+
+def dump_with_stats(
+    value: Dumpable,
+    stream: TextIO,
+    options: DumpOptions,
+    workers: int,
+    stats: DumpStats,
+) -> None:
+    # the elements of iterators are counted as they are dumped
+    counter = NodeCounter()
+    counter.add(value)
+    start = perf_counter()
+    writer = StatsWriter(stream)
+    dump_to(cast(TextIO, writer), value, options, workers, counter)
+    end = perf_counter()
+
+    stats.bytes_written += writer.bytes_written
+    stats.write_calls += writer.write_calls
+    stats.write_time += writer.elapsed
+    stats.dump_time += (end - start) - writer.elapsed
+    stats.total_time += end - start
+    stats.node_count += counter.count
+    stats.max_depth = max(stats.max_depth, counter.max_depth)
 
 
 literal_string_escaper = {i: f"\\x{i:02X}" for i in range(32)}  # C0 control codes
@@ -49,352 +343,570 @@ literal_string_escaper[ord('"')] = '\\"'
 escaped_block_string_escaper = literal_string_escaper.copy()
 del escaped_block_string_escaper[ord('"')]
 
-_use_escape_code = {chr(c) for c in literal_string_escaper}
-_use_escape_code.remove("\n")
+# escaped block strings are translated whole and then split on newlines
+_escaped_block_text_escaper = escaped_block_string_escaper.copy()
+del _escaped_block_text_escaper[ord("\n")]
+
+# characters translated by literal_string_escaper, searching for them is much cheaper
+# than translating, and most strings have none
+_escaped_char = re.compile('[\x00-\x1f\x7f-\x9f"\\\\]')
+
+# the same without newlines, which block strings can hold
+_use_escape_code = re.compile('[\x00-\x09\x0b-\x1f\x7f-\x9f"\\\\]')
 
 
 def needs_escaping(value: str) -> bool:
-    return bool(_use_escape_code.intersection(value))
+    return _use_escape_code.search(value) is not None
+
+
+_INDENTS = tuple("  " * depth for depth in range(64))
+_NEXT_LINES = tuple("\n" + indent for indent in _INDENTS)
+
+
+def indent(depth: int) -> str:
+    return _INDENTS[depth] if depth < 64 else "  " * depth
+
+
+def next_line(depth: int) -> str:
+    return _NEXT_LINES[depth] if depth < 64 else "\n" + "  " * depth
+
+
+def format_float(value: float) -> str:
+    if value == math.inf:
+        return "inf"
+    elif value == -math.inf:
+        return "-inf"
+    elif math.isnan(value):
+        return "nan"
+    else:
+        return float.__repr__(value)
+
+
+def format_str(value: str) -> str:
+    if _escaped_char.search(value) is None:
+        return '"' + value + '"'
+    return '"' + value.translate(literal_string_escaper) + '"'
+
+
+def format_null(value: None) -> str:
+    return "null"
+
+
+def format_bool(value: bool) -> str:
+    return "true" if value else "false"
+
+
+# formats each kind of scalar, strings as literals
+scalar_formatters: List[Callable[[Any], str]] = [
+    format_null,
+    format_bool,
+    int.__repr__,
+    format_float,
+    format_str,
+]
+
+
+# The dump of a container, which writes its output as it is iterated and yields the
+# frames of the containers in it, or None after flushing the output. Frames are run
+# on an explicit stack rather than by recursion, so values of any depth can be dumped.
+Frame = Iterator[Optional["Frame"]]
+
+
+_json_encoder = json.JSONEncoder(
+    ensure_ascii=False,
+    check_circular=False,
+    allow_nan=False,
+    separators=(",", ":"),
+)
+
+# orders keys like sorted_items does for mappings with string keys only
+_sorted_json_encoder = json.JSONEncoder(
+    ensure_ascii=False,
+    check_circular=False,
+    allow_nan=False,
+    separators=(",", ":"),
+    sort_keys=True,
+)
 
 
 class DumperBase(ABC):
+    # buffered parts are written to the stream in one call once there are this many
+    flush_threshold = 4096
+
     @property
     def stream(self) -> TextIO:
         return self._stream
 
-    def __init__(self, stream: TextIO) -> None:
+    def __init__(self, stream: TextIO, check_circular: bool = True) -> None:
         self._stream = stream
-        self._seen: Set[int] = set()
-
-    def check_recursive(self, value: Value) -> None:
-        if id(value) in self._seen:
+        self.check_circular = check_circular
+        # ids of the containers being dumped, the ancestors of the current value
+        self._active: Set[int] = set()
+        self._parts: List[str] = []
+        self.write = self._parts.append
+        # counts the elements of the iterators dumped, for stats
+        self.counter: Optional[NodeCounter] = None
+
+    def flush(self) -> None:
+        """Writes the buffered output to the stream"""
+        if self._parts:
+            self._stream.write("".join(self._parts))
+            self._parts.clear()
+
+    def maybe_flush(self) -> bool:
+        """Flushes the buffered output if it is large, returning True if it did"""
+        if len(self._parts) >= self.flush_threshold:
+            self.flush()
+            return True
+        return False
+
+    def check_recursive(self, value: object) -> None:
+        """Marks a container as being dumped, raising ValueError if it already is"""
+        if not self.check_circular:
+            return
+        elif id(value) in self._active:
             raise ValueError(
                 f"Object {object.__repr__(value)} is recursive, aborting dump"
             )
-        self._seen.add(id(value))
-
-    def dump_null(self) -> None:
-        self.stream.write("null")
-
-    def dump_bool(self, value: bool) -> None:
-        if value is True:
-            self.stream.write("true")
-        elif value is False:
-            self.stream.write("false")
-        else:  # pragma: no cover
-            assert False, f"Got abnormal bool {value!r}"
-
-    def dump_int(self, value: int) -> None:
-        self.stream.write(json.dumps(value))
-
-    def dump_float(self, value: float) -> None:
-        if value == math.inf:
-            self.stream.write("inf")
-        elif value == -math.inf:
-            self.stream.write("-inf")
-        elif math.isnan(value):
-            self.stream.write("nan")
-        else:
-            self.stream.write(json.dumps(value))
-
-    def dump_str(self, value: str) -> None:
-        self.stream.write('"')
-        self.dump_literal_line(value)
-        self.stream.write('"')
+        self._active.add(id(value))
+
+    def leave(self, value: object) -> None:
+        """Marks a container as dumped
+
+        Only the containers being dumped are tracked. Containers created by an
+        iterator may be freed once dumped, and their ids reused.
+        """
+        if self.check_circular:
+            self._active.discard(id(value))
+
+    def stream_elements(self, iterator: Iterator[Value]) -> Iterator[Value]:
+        """Yields the elements of an iterator, flushing the output as needed
+
+        The output of an iterator is written as its elements are produced, rather
+        than when it is exhausted, so it does not pile up in memory.
+        """
+        if self.counter is not None:
+            iterator = self.counter.elements(iterator)
+        for elem in iterator:
+            self.maybe_flush()
+            yield elem
+
+    def run(self, frame: Optional[Frame]) -> None:
+        """Runs a frame and the frames it yields, depth first"""
+        deque(self.steps(frame), maxlen=0)
+
+    def steps(self, frame: Optional[Frame]) -> Iterator[None]:
+        """Runs a frame like run, pausing when a frame is entered, flushes, or ends"""
+        if frame is None:
+            return
+        stack = [frame]
+        while stack:
+            for nested in stack[-1]:
+                if nested is not None:
+                    stack.append(nested)
+                break
+            else:
+                stack.pop()
+            yield
 
-    def dump_literal_line(self, value: str) -> None:
-        self.stream.write(value.translate(literal_string_escaper))
+    def dump(self, value: Dumpable) -> None:
+        self.run(self.dump_value(value))
+        self.flush()
 
     @abstractmethod
-    def dump(self, value: Value) -> None:
-        ...
+    def dump_value(self, value: Dumpable) -> Frame:
+        """Returns the frame dumping a whole value"""
 
 
 class MachineDumper(DumperBase):
-    def dump(self, value: Value) -> None:
-        if value is None:
-            self.dump_null()
-        elif isinstance(value, bool):
-            self.dump_bool(value)
-        elif isinstance(value, int):
-            self.dump_int(value)
-        elif isinstance(value, float):
-            self.dump_float(value)
-        elif isinstance(value, str):
-            self.dump_str(value)
-        elif isinstance(value, Sequence):
-            self.dump_sequence(value)
-        elif isinstance(value, Mapping):
-            self.dump_mapping(value)
+    """Dumps values in the compact, single line format
+
+    If *use_json* is True, the sequences and mappings that the C JSON encoder
+    formats exactly as SCDIL would are handed to it whole.
+    """
+
+    json_encoder = _json_encoder
+
+    def __init__(
+        self, stream: TextIO, check_circular: bool = True, use_json: bool = True
+    ) -> None:
+        super().__init__(stream, check_circular)
+        self.use_json = use_json
+        self._json: Set[int] = set()
+
+    def dump_value(self, value: Dumpable) -> Frame:
+        if self.use_json:
+            self._json = json_compatible(value)
+        nested = self.dispatch(value)
+        if nested is not None:
+            yield nested
+
+    def dispatch(self, value: Dumpable) -> Optional[Frame]:
+        """Writes a scalar, or returns the frame dumping a container"""
+        kind = kind_of(value)
+        if kind < SEQUENCE:
+            self.write(scalar_formatters[kind](value))
+            return None
+        elif kind == SEQUENCE:
+            return self.dump_sequence(cast(Sequence, value))
+        elif kind == MAPPING:
+            return self.dump_mapping(cast(Mapping, value))
         else:
-            raise TypeError(f"Got unsupported type {type(value).__qualname__}")
+            return self.dump_sequence(
+                self.stream_elements(cast(Iterator[Value], value))
+            )
 
-    def dump_sequence(self, value: Sequence) -> None:
+    def dump_sequence(self, value: Iterable[Value]) -> Frame:
+        if id(value) in self._json:
+            self.write(self.json_encoder.encode(value))
+            return
         self.check_recursive(value)
-        self.stream.write("[")
-        for elem, last in mark_last(value):
-            self.dump(elem)
-            if not last:
-                self.stream.write(",")
-        self.stream.write("]")
-
-    def dump_mapping(self, value: Mapping) -> None:
+        self.write("[")
+        for i, elem in enumerate(value):
+            if self.maybe_flush():
+                yield None
+            if i:
+                self.write(",")
+            nested = self.dispatch(elem)
+            if nested is not None:
+                yield nested
+        self.write("]")
+        self.leave(value)
+        self.maybe_flush()
+
+    def dump_mapping(self, value: Mapping) -> Frame:
+        if id(value) in self._json:
+            self.write(self.json_encoder.encode(value))
+            return
         self.check_recursive(value)
-        self.stream.write("{")
-        for (key, val), last in mark_last(value.items()):
-            self.dump(key)
-            self.stream.write(":")
-            self.dump(val)
-            if not last:
-                self.stream.write(",")
-        self.stream.write("}")
+        self.write("{")
+        for i, (key, val) in enumerate(self.items(value)):
+            if self.maybe_flush():
+                yield None
+            if i:
+                self.write(",")
+            nested = self.dispatch(key)
+            if nested is not None:
+                yield nested
+            self.write(":")
+            nested = self.dispatch(val)
+            if nested is not None:
+                yield nested
+        self.write("}")
+        self.leave(value)
+        self.maybe_flush()
+
+    def items(self, value: Mapping) -> Iterable[Tuple[Value, Value]]:
+        """Returns the items of a mapping, in the order they are dumped"""
+        return value.items()
+
+
+class CanonicalDumper(MachineDumper):
+    """Dumps values in the machine format, with the keys of mappings sorted
+
+    Scalars are already formatted one way only, and strings only escape what they
+    must, so the output only depends on the contents of the value.
+    """
+
+    json_encoder = _sorted_json_encoder
+
+    def items(self, value: Mapping) -> Iterable[Tuple[Value, Value]]:
+        return sorted_items(value)
+
+
+def sorted_items(value: Mapping) -> List[Tuple[Value, Value]]:
+    """Returns the items of a mapping in canonical order
+
+    Keys are ordered by kind first, in the order null, bool, int, float, string,
+    sequence, then mapping. Strings are then ordered by code point, and the other keys
+    by their canonical dump. Keys that dump the same, like NaNs, are ordered by the
+    canonical dump of their value.
+    """
+    if all_str(value):
+        return sorted(value.items(), key=itemgetter(0))
+    items = list(value.items())
+    orders: List[Tuple[Any, ...]] = [_key_order(key) for key, _ in items]
+    if len(set(orders)) != len(orders):
+        orders = [
+            (*order, dumps(val, canonical=True))
+            for order, (_, val) in zip(orders, items)
+        ]
+    return [item for _, item in sorted(zip(orders, items), key=itemgetter(0))]
+
+
+def _key_order(key: Value) -> Tuple[int, str]:
+    kind = kind_of(key)
+    if kind == STR:
+        return kind, cast(str, key)
+    return kind, dumps(key, canonical=True)
+
+
+# JSON escapes these characters differently than SCDIL, or not at all.
+# All other characters, numbers, and constants are formatted the same way.
+_json_escapes_differ = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]")
+
+# The C encoder recurses, so only containers nested this deep at most are encoded
+_json_max_depth = 100
+
+_json_scalar_checks: Dict[type, Callable[[Any], bool]] = {
+    str: lambda value: _json_escapes_differ.search(value) is None,
+    float: math.isfinite,
+    int: lambda value: True,
+    bool: lambda value: True,
+    type(None): lambda value: True,
+}
+
+# A container being checked: the container, an iterator over its elements or its
+# keys then values, whether it is JSON-compatible so far, and how many levels of
+# containers it holds, itself included.
+_JsonFrame = List[Any]
+
+
+def json_compatible(value: Dumpable) -> Set[int]:
+    """Returns the ids of the containers in *value* that JSON encodes as SCDIL does
+
+    Those are lists, tuples, and dicts with string keys, holding only compatible
+    containers and scalars, at most _json_max_depth levels deep. If the value is
+    recursive, it is left to the SCDIL dumper, which rejects it.
+    """
+    # heights of the containers checked, None for those not compatible
+    heights: Dict[int, Optional[int]] = {}
+    # containers entered, those not in heights yet are being checked
+    active = {id(value)}
+    root = _json_frame(value)
+    stack = [] if root is None else [root]
+    while stack:
+        frame = stack[-1]
+        for child in frame[1]:
+            check = _json_scalar_checks.get(type(child))
+            if check is not None:
+                frame[2] = frame[2] and check(child)
+            elif id(child) in heights:
+                # a shared container is only checked once
+                _json_add_child(frame, heights[id(child)])
+            elif id(child) in active:
+                return set()
+            else:
+                child_frame = _json_frame(child)
+                if child_frame is None:
+                    frame[2] = False
+                    continue
+                active.add(id(child))
+                stack.append(child_frame)
+                break
+        else:
+            stack.pop()
+            height = frame[3] if frame[2] else None
+            heights[id(frame[0])] = height
+            if stack:
+                _json_add_child(stack[-1], height)
+    return {key for key, height in heights.items() if height is not None}
+
+
+def _json_add_child(frame: _JsonFrame, height: Optional[int]) -> None:
+    if height is None or height >= _json_max_depth:
+        frame[2] = False
+    elif height >= frame[3]:
+        frame[3] = height + 1
+
+
+def _json_frame(value: Dumpable) -> Optional[_JsonFrame]:
+    # Other containers are not walked: they may create their elements on access,
+    # so the ids of their elements may be reused by the time they are dumped.
+    typ: type = type(value)
+    if typ is list or typ is tuple:
+        return [value, iter(cast(Sequence, value)), True, 1]
+    elif typ is dict or typ is FrozenDict:
+        mapping = cast(Mapping, value)
+        keys_ok = typ is dict and all(type(key) is str for key in mapping.keys())
+        return [value, chain(mapping.keys(), mapping.values()), keys_ok, 1]
+    return None
 
 
 class HumanDumper(DumperBase):
-    def dump(self, value: Value) -> None:  # noqa: C901
-        if value is None:
-            self.dump_null()
-        elif isinstance(value, bool):
-            self.dump_bool(value)
-        elif isinstance(value, int):
-            self.dump_int(value)
-        elif isinstance(value, float):
-            self.dump_float(value)
-        elif isinstance(value, str):
-            if value == "\n":
-                self.stream.write('"\\n"')
-            elif "\n" in value:
-                if needs_escaping(value):
-                    self.dump_escaped_block_string(value, depth=0)
-                else:
-                    self.dump_block_string(value, depth=0)
-            else:
-                self.dump_str(value)
-        elif isinstance(value, Sequence):
-            if len(value) == 0:
-                self.stream.write("[]")
-            else:
-                self.dump_block_sequence(value, depth=0)
-        elif isinstance(value, Mapping):
-            if len(value) == 0:
-                self.stream.write("{}")
-            elif all(isinstance(key, str) for key in value.keys()):
-                self.dump_block_mapping(value, depth=0)
-            else:
-                self.dump_literal_mapping(value, depth=0)
+    def dump_value(self, value: Dumpable) -> Frame:
+        kind = kind_of(value)
+        container = self.non_empty(value, kind) if kind >= SEQUENCE else None
+        nested: Optional[Frame] = None
+        if kind == STR:
+            self.dump_human_str(cast(str, value), depth=0, inline="", block="")
+        elif container is None:
+            nested = self.dispatch_literal(value, depth=0)
+        elif kind != MAPPING:
+            nested = self.dump_block_sequence(container, depth=0)
+        elif all_str(cast(Mapping, container)):
+            nested = self.dump_block_mapping(cast(Mapping, container), depth=0)
         else:
-            raise TypeError(f"Got unsupported type {type(value).__qualname__}")
+            nested = self.dump_literal_mapping(cast(Mapping, container), depth=0)
+        if nested is not None:
+            yield nested
         # always end the dump with a newline
-        self.stream.write("\n")
-
-    def dispatch_literal(self, value: Value, depth: int) -> None:  # noqa: C901
-        if value is None:
-            self.dump_null()
-        elif isinstance(value, bool):
-            self.dump_bool(value)
-        elif isinstance(value, int):
-            self.dump_int(value)
-        elif isinstance(value, float):
-            self.dump_float(value)
-        elif isinstance(value, str):
-            self.dump_str(value)
-        elif isinstance(value, Sequence):
-            if len(value) == 0:
-                self.stream.write("[]")
-            else:
-                self.dump_literal_sequence(value, depth=depth)
-        elif isinstance(value, Mapping):
-            if len(value) == 0:
-                self.stream.write("{}")
-            else:
-                self.dump_literal_mapping(value, depth=depth)
+        self.write("\n")
+
+    def non_empty(self, value: Dumpable, kind: int) -> Optional[Any]:
+        """Returns a container if it is not empty, else None
+
+        An iterator is checked by taking its first element, so an iterator over all of
+        its elements is returned instead.
+        """
+        if kind != ITERATOR:
+            return value if len(cast(Sequence, value)) != 0 else None
+        iterator = self.stream_elements(cast(Iterator[Value], value))
+        for first in iterator:
+            return chain((first,), iterator)
+        return None
+
+    def dispatch_literal(self, value: Dumpable, depth: int) -> Optional[Frame]:
+        """Writes a scalar or empty container, or returns the frame dumping a container"""
+        kind = kind_of(value)
+        if kind < SEQUENCE:
+            self.write(scalar_formatters[kind](value))
+            return None
+        container = self.non_empty(value, kind)
+        if container is None:
+            self.write("{}" if kind == MAPPING else "[]")
+            return None
+        elif kind == MAPPING:
+            return self.dump_literal_mapping(container, depth=depth)
         else:
-            raise TypeError(f"Got unsupported type {type(value).__qualname__}")
+            return self.dump_literal_sequence(container, depth=depth)
 
-    def dump_literal_sequence(self, value: Sequence, depth: int) -> None:
+    def dump_literal_sequence(self, value: Iterable[Value], depth: int) -> Frame:
         self.check_recursive(value)
-        self.stream.write("[\n")
-        line_start = "  " * (depth + 1)
-        for elem, last in mark_last(value):
-            self.stream.write(line_start)
-            self.dispatch_literal(elem, depth=(depth + 1))
-            if not last:
-                self.stream.write(",")
-            self.stream.write("\n")
-        self.stream.write("  " * depth)
-        self.stream.write("]")
-
-    def dump_literal_mapping(self, value: Mapping, depth: int) -> None:
+        line_start = indent(depth + 1)
+        self.write("[\n" + line_start)
+        separator = ",\n" + line_start
+        for i, elem in enumerate(value):
+            if self.maybe_flush():
+                yield None
+            if i:
+                self.write(separator)
+            nested = self.dispatch_literal(elem, depth=(depth + 1))
+            if nested is not None:
+                yield nested
+        self.write(next_line(depth) + "]")
+        self.leave(value)
+        self.maybe_flush()
+
+    def dump_literal_mapping(self, value: Mapping, depth: int) -> Frame:
         self.check_recursive(value)
-        self.stream.write("{\n")
-        line_start = "  " * (depth + 1)
-        for (key, val), last in mark_last(value.items()):
-            self.stream.write(line_start)
-            self.dispatch_literal(key, depth=(depth + 1))
-            self.stream.write(": ")
-            self.dispatch_literal(val, depth=(depth + 1))
-            if not last:
-                self.stream.write(",")
-            self.stream.write("\n")
-        self.stream.write("  " * depth)
-        self.stream.write("}")
+        line_start = indent(depth + 1)
+        self.write("{\n" + line_start)
+        separator = ",\n" + line_start
+        for i, (key, val) in enumerate(value.items()):
+            if self.maybe_flush():
+                yield None
+            if i:
+                self.write(separator)
+            nested = self.dispatch_literal(key, depth=(depth + 1))
+            if nested is not None:
+                yield nested
+            self.write(": ")
+            nested = self.dispatch_literal(val, depth=(depth + 1))
+            if nested is not None:
+                yield nested
+        self.write(next_line(depth) + "}")
+        self.leave(value)
+        self.maybe_flush()
+
+    def dump_human_str(self, value: str, depth: int, inline: str, block: str) -> None:
+        """Dumps a string inline if it fits on one line, else as a block string
+
+        *inline* or *block* is written first, depending on the format chosen.
+        """
+        if _escaped_char.search(value) is None:
+            # the common case, no newlines and nothing to escape
+            self.write(inline + '"' + value + '"')
+        elif "\n" not in value:
+            self.write(inline + format_str(value))
+        elif value == "\n":
+            self.write(inline + '"\\n"')
+        elif needs_escaping(value):
+            self.write(block)
+            self.dump_escaped_block_string(value, depth=depth)
+        else:
+            self.write(block)
+            self.dump_block_string(value, depth=depth)
 
     def dump_block_string(self, value: str, depth: int) -> None:
-        next_line = "\n" + "  " * depth
-        for line, last in mark_last(value.split("\n")):
-            self.stream.write("|")
-            # normally this would escape control code
-            # but we have already checked that value has no escape codes before calling this function
-            self.dump_literal_line(line)
-            if not last:
-                self.stream.write(next_line)
+        # there is nothing to escape, or dump_escaped_block_string would be used
+        self.write("|" + value.replace("\n", next_line(depth) + "|"))
 
     def dump_escaped_block_string(self, value: str, depth: int) -> None:
-        next_line = "\n" + "  " * depth
-        for line, last in mark_last(value.split("\n")):
-            self.stream.write("\\|")
-            self.dump_escaped_block_line(line)
-            if not last:
-                self.stream.write(next_line)
-
-    def dump_escaped_block_line(self, value: str) -> None:
-        self.stream.write(value.translate(escaped_block_string_escaper))
+        text = value.translate(_escaped_block_text_escaper)
+        self.write("\\|" + text.replace("\n", next_line(depth) + "\\|"))
 
-    def dump_block_sequence(self, value: Sequence, depth: int) -> None:
+    def dump_block_sequence(self, value: Iterable[Value], depth: int) -> Frame:
         self.check_recursive(value)
-        next_line = "\n" + "  " * depth
-        for elem, last in mark_last(value):
-            self.stream.write("-")
-            self.dispatch_block_sequence_elem(elem, depth=depth)
-            if not last:
-                self.stream.write(next_line)
-
-    def dispatch_block_sequence_elem(  # noqa: C901
-        self, value: Value, depth: int
-    ) -> None:
-        if value is None:
-            self.stream.write(" ")
-            self.dump_null()
-        elif isinstance(value, bool):
-            self.stream.write(" ")
-            self.dump_bool(value)
-        elif isinstance(value, int):
-            self.stream.write(" ")
-            self.dump_int(value)
-        elif isinstance(value, float):
-            self.stream.write(" ")
-            self.dump_float(value)
-        elif isinstance(value, str):
-            if value == "\n":
-                self.stream.write(' "\\n"')
-            elif "\n" in value:
-                self.stream.write("\n")
-                self.stream.write("  " * (depth + 1))
-                if needs_escaping(value):
-                    self.dump_escaped_block_string(value, depth=(depth + 1))
-                else:
-                    self.dump_block_string(value, depth=(depth + 1))
-            else:
-                self.stream.write(" ")
-                self.dump_str(value)
-        elif isinstance(value, Sequence):
-            if len(value) == 0:
-                self.stream.write(" []")
-            else:
-                self.stream.write("\n")
-                self.stream.write("  " * (depth + 1))
-                self.dump_block_sequence(value, depth=(depth + 1))
-        elif isinstance(value, Mapping):
-            if len(value) == 0:
-                self.stream.write(" {}")
-            elif all(isinstance(key, str) for key in value.keys()):
-                self.stream.write("\n")
-                self.stream.write("  " * (depth + 1))
-                self.dump_block_mapping(value, depth=(depth + 1))
-            else:
-                self.stream.write(" ")
-                self.dump_literal_mapping(value, depth=(depth + 1))
-        else:
-            raise TypeError(f"Got unsupported type {type(value).__qualname__}")
-
-    def dump_block_mapping(self, value: Mapping, depth: int) -> None:
+        separator = next_line(depth) + "-"
+        for i, elem in enumerate(value):
+            if self.maybe_flush():
+                yield None
+            self.write(separator if i else "-")
+            nested = self.dispatch_block_value(elem, depth=depth)
+            if nested is not None:
+                yield nested
+        self.leave(value)
+        self.maybe_flush()
+
+    def dump_block_mapping(self, value: Mapping, depth: int) -> Frame:
         self.check_recursive(value)
-        next_line = "\n" + "  " * depth
-        for (key, val), last in mark_last(value.items()):
-            key = cast(str, key)
-            self.dump_block_mapping_key(key)
-            self.stream.write(":")
-            self.dispatch_block_mapping_value(val, depth=depth)
-            if not last:
-                self.stream.write(next_line)
+        separator = next_line(depth)
+        for i, (key, val) in enumerate(value.items()):
+            if self.maybe_flush():
+                yield None
+            if i:
+                self.write(separator)
+            self.dump_block_mapping_key(cast(str, key))
+            nested = self.dispatch_block_value(val, depth=depth)
+            if nested is not None:
+                yield nested
+        self.leave(value)
+        self.maybe_flush()
 
     def dump_block_mapping_key(self, value: str) -> None:
         # TODO: this check may be more or less forgiving than parser
         if value.isidentifier():
-            self.stream.write(value)
+            self.write(value + ":")
         else:
-            self.dump_str(value)
-
-    def dispatch_block_mapping_value(  # noqa: C901
-        self, value: Value, depth: int
-    ) -> None:
-        if value is None:
-            self.stream.write(" ")
-            self.dump_null()
-        elif isinstance(value, bool):
-            self.stream.write(" ")
-            self.dump_bool(value)
-        elif isinstance(value, int):
-            self.stream.write(" ")
-            self.dump_int(value)
-        elif isinstance(value, float):
-            self.stream.write(" ")
-            self.dump_float(value)
-        elif isinstance(value, str):
-            if value == "\n":
-                self.stream.write(' "\\n"')
-            elif "\n" in value:
-                self.stream.write("\n")
-                self.stream.write("  " * (depth + 1))
-                if needs_escaping(value):
-                    self.dump_escaped_block_string(value, depth=(depth + 1))
-                else:
-                    self.dump_block_string(value, depth=(depth + 1))
-            else:
-                self.stream.write(" ")
-                self.dump_str(value)
-        elif isinstance(value, Sequence):
-            if len(value) == 0:
-                self.stream.write(" []")
-            else:
-                self.stream.write("\n")
-                self.stream.write("  " * (depth + 1))
-                self.dump_block_sequence(value, depth=(depth + 1))
-        elif isinstance(value, Mapping):
-            if len(value) == 0:
-                self.stream.write(" {}")
-            elif all(isinstance(key, str) for key in value.keys()):
-                self.stream.write("\n")
-                self.stream.write("  " * (depth + 1))
-                self.dump_block_mapping(value, depth=(depth + 1))
-            else:
-                self.stream.write(" ")
-                self.dump_literal_mapping(value, depth=(depth + 1))
+            self.write(format_str(value) + ":")
+
+    def dispatch_block_value(self, value: Dumpable, depth: int) -> Optional[Frame]:
+        """Dumps a block sequence element or block mapping value, after the - or :
+
+        Containers that are not empty are returned as frames, like in dispatch_literal.
+        """
+        kind = kind_of(value)
+        if kind == STR:
+            self.dump_human_str(
+                cast(str, value),
+                depth=(depth + 1),
+                inline=" ",
+                block=next_line(depth + 1),
+            )
+            return None
+        elif kind < SEQUENCE:
+            self.write(" " + scalar_formatters[kind](value))
+            return None
+        container = self.non_empty(value, kind)
+        if container is None:
+            self.write(" {}" if kind == MAPPING else " []")
+            return None
+        elif kind != MAPPING:
+            self.write(next_line(depth + 1))
+            return self.dump_block_sequence(container, depth=(depth + 1))
+        elif all_str(container):
+            self.write(next_line(depth + 1))
+            return self.dump_block_mapping(container, depth=(depth + 1))
         else:
-            raise TypeError(f"Got unsupported type {type(value).__qualname__}")
+            self.write(" ")
+            return self.dump_literal_mapping(container, depth=(depth + 1))
 
 
-def mark_last(iterable: Iterable[T]) -> Iterator[Tuple[T, bool]]:
-    """Returns the given iterable zipped with a boolean which is always False except on the last element"""
-    it = iter(iterable)
-    try:
-        v = next(it)
-    except StopIteration:
-        return
-    try:
-        while True:
-            prev_v = v
-            v = next(it)
-            yield prev_v, False
-    except StopIteration:
-        yield prev_v, True
+_str_only = frozenset((str,))
+
+
+def all_str(value: Mapping) -> bool:
+    """Returns True if all keys of the mapping are strings, so it can be a block mapping"""
+    key_types = set(map(type, value.keys()))
+    return key_types <= _str_only or all(issubclass(t, str) for t in key_types)
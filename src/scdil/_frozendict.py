@@ -9,6 +9,7 @@ from typing import (
     KeysView,
     List,
     Mapping,
+    Optional,
     Protocol,
     Tuple,
     Type,
@@ -38,6 +39,8 @@ class _SupportsKeysAndGetItem(Protocol[_K, _V_co]):
 class FrozenDict(Mapping[_K, _V_co]):
     """ """
 
+    __slots__ = ("_dict", "_hash")
+
     @overload
     def __init__(self) -> None:
         ...
@@ -76,10 +79,22 @@ class FrozenDict(Mapping[_K, _V_co]):
 
     def __init__(self, *args, **kwargs):  # type: ignore
         self._dict: Dict[_K, _V_co] = dict(*args, **kwargs)
+        self._hash: Optional[int] = None
+
+    @classmethod
+    def _from_dict(cls, __dict: Dict[_K, _V]) -> "FrozenDict[_K, _V]":
+        """Creates a FrozenDict that takes ownership of *__dict* without copying it
+
+        The caller must not modify *__dict* afterwards.
+        """
+        self = cls.__new__(cls)
+        self._dict = __dict  # type: ignore
+        self._hash = None
+        return self  # type: ignore
 
     @classmethod
     def fromkeys(cls, __iterable: Iterable[_K], __value: _V) -> "FrozenDict[_K, _V]":
-        return FrozenDict(dict.fromkeys(__iterable, __value))
+        return cls._from_dict(dict.fromkeys(__iterable, __value))
 
     def __len__(self) -> int:
         return len(self._dict)
@@ -87,6 +102,13 @@ class FrozenDict(Mapping[_K, _V_co]):
     def __getitem__(self, __item: _K) -> _V_co:
         return self._dict[__item]
 
+    # the Mapping mixins go through __getitem__ and catch KeyError, which is slow
+    def __contains__(self, __item: object) -> bool:
+        return __item in self._dict
+
+    def get(self, __key: Any, __default: Any = None) -> Any:
+        return self._dict.get(__key, __default)
+
     def __iter__(self) -> Iterator[_K]:
         return iter(self._dict)
 
@@ -97,7 +119,9 @@ class FrozenDict(Mapping[_K, _V_co]):
         return f"{type(self).__qualname__}({self._dict!r})"
 
     def __eq__(self, __other: object) -> bool:
-        if isinstance(__other, dict):
+        if __other is self:
+            return True
+        elif isinstance(__other, dict):
             return self._dict == __other
         elif not isinstance(__other, type(self)):
             return NotImplemented
@@ -105,10 +129,25 @@ class FrozenDict(Mapping[_K, _V_co]):
             return self._dict == __other._dict
 
     def __hash__(self) -> int:
-        return sum(hash(item) for item in self.items())
+        # the contents never change, so the hash is computed at most once
+        if self._hash is None:
+            self._hash = hash(frozenset(self._dict.items()))
+        return self._hash
+
+    def __reduce__(
+        self,
+    ) -> Tuple[Any, Tuple[Type["FrozenDict[_K, _V_co]"], Dict[_K, _V_co]]]:
+        return (_adopt, (type(self), self._dict))
+
+    def __setstate__(self, __state: Dict[str, Any]) -> None:
+        # FrozenDicts pickled before __slots__ were restored from their __dict__,
+        # and the hash they carry, if any, was computed differently
+        self._dict = __state["_dict"]
+        self._hash = None
 
     def copy(self) -> "FrozenDict[_K, _V_co]":
-        return FrozenDict(self._dict.items())
+        # immutable, so there is no need to actually copy
+        return self
 
     def keys(self) -> KeysView[_K]:
         return self._dict.keys()
@@ -128,22 +167,25 @@ class FrozenDict(Mapping[_K, _V_co]):
         def __or__(self, __other: Mapping[_K, _V_co]) -> "FrozenDict[_K, _V_co]":
             if not isinstance(__other, Mapping):
                 return NotImplemented
-            res = FrozenDict(self)
-            res |= __other
-            return res
+            res = dict(self._dict)
+            res.update(__other)
+            return FrozenDict._from_dict(res)
 
         def __ror__(self, __other: Mapping[_K, _V_co]) -> "FrozenDict[_K, _V_co]":
             if not isinstance(__other, Mapping):
                 return NotImplemented
-            res = FrozenDict(__other)
-            res |= self
-            return res
+            res = dict(__other)
+            res.update(self._dict)
+            return FrozenDict._from_dict(res)
 
-        def __ior__(self, __other: Mapping[_K, _V_co]) -> "FrozenDict[_K, _V_co]":
-            self._dict |= __other
-            return self
+        # there is deliberately no __ior__, so "a |= b" rebinds "a" to a new FrozenDict
 
     def __class_getitem__(
         cls: Type["FrozenDict[_K, _V_co]"], __item: Any
     ) -> Type["FrozenDict[_K, _V_co]"]:
         return cls
+
+
+def _adopt(cls: Type[FrozenDict[_K, _V]], __dict: Dict[_K, _V]) -> FrozenDict[_K, _V]:
+    """Unpickles a FrozenDict, adopting the freshly unpickled dict"""
+    return cls._from_dict(__dict)
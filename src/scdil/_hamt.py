@@ -0,0 +1,467 @@
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+    overload,
+)
+
+_K = TypeVar("_K")
+_V = TypeVar("_V")
+_T = TypeVar("_T")
+
+# Each level of the trie consumes 5 bits of the hash, so each node has up to 32 slots.
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+# Marks a slot whose value is a child node rather than a key-value pair.
+_CHILD = object()
+
+# Returned by lookups that do not find the key; None is a valid value.
+_MISSING = object()
+
+
+def _hash(key: object) -> int:
+    return hash(key) & _HASH_MASK
+
+
+def _popcount(n: int) -> int:
+    return bin(n).count("1")
+
+
+class _Node:
+    """Trie node holding key-value pairs and child nodes in a flat array
+
+    Nodes are immutable once published. While building, an evolver owns the nodes it
+    created, identified by *owner*, and may modify them in place.
+    """
+
+    __slots__ = ("array", "owner")
+
+    def __init__(self, array: List[Any], owner: Optional[object]) -> None:
+        self.array = array
+        self.owner = owner
+
+    def edit(self, owner: Optional[object]) -> "_Node":
+        raise NotImplementedError  # pragma: no cover
+
+    def find(self, shift: int, h: int, key: object) -> object:
+        raise NotImplementedError  # pragma: no cover
+
+    def assoc(
+        self,
+        shift: int,
+        h: int,
+        key: object,
+        value: object,
+        owner: Optional[object],
+        added: List[bool],
+    ) -> "_Node":
+        raise NotImplementedError  # pragma: no cover
+
+    def without(
+        self,
+        shift: int,
+        h: int,
+        key: object,
+        owner: Optional[object],
+        removed: List[bool],
+    ) -> Optional["_Node"]:
+        raise NotImplementedError  # pragma: no cover
+
+    def single_pair(self) -> bool:
+        return len(self.array) == 2 and self.array[0] is not _CHILD
+
+
+class _BitmapNode(_Node):
+    """Node whose slots are selected by 5 bits of the hash and compressed with a bitmap"""
+
+    __slots__ = ("bitmap",)
+
+    def __init__(self, bitmap: int, array: List[Any], owner: Optional[object]) -> None:
+        super().__init__(array, owner)
+        self.bitmap = bitmap
+
+    def edit(self, owner: Optional[object]) -> "_BitmapNode":
+        if owner is not None and self.owner is owner:
+            return self
+        return _BitmapNode(self.bitmap, self.array.copy(), owner)
+
+    def find(self, shift: int, h: int, key: object) -> object:
+        bit = 1 << ((h >> shift) & _MASK)
+        if not self.bitmap & bit:
+            return _MISSING
+        idx = 2 * _popcount(self.bitmap & (bit - 1))
+        k = self.array[idx]
+        v = self.array[idx + 1]
+        if k is _CHILD:
+            return cast(_Node, v).find(shift + _BITS, h, key)
+        if k is key or k == key:
+            return v
+        return _MISSING
+
+    def assoc(
+        self,
+        shift: int,
+        h: int,
+        key: object,
+        value: object,
+        owner: Optional[object],
+        added: List[bool],
+    ) -> "_BitmapNode":
+        bit = 1 << ((h >> shift) & _MASK)
+        idx = 2 * _popcount(self.bitmap & (bit - 1))
+        if not self.bitmap & bit:
+            node = self.edit(owner)
+            node.array[idx:idx] = (key, value)
+            node.bitmap |= bit
+            added.append(True)
+            return node
+        k = self.array[idx]
+        v = self.array[idx + 1]
+        if k is _CHILD:
+            child = cast(_Node, v).assoc(shift + _BITS, h, key, value, owner, added)
+            if child is v:
+                return self
+            node = self.edit(owner)
+            node.array[idx + 1] = child
+            return node
+        if k is key or k == key:
+            if v is value:
+                return self
+            node = self.edit(owner)
+            node.array[idx + 1] = value
+            return node
+        # a different key already lives in this slot, push both down a level
+        child = _make_node(shift + _BITS, _hash(k), k, v, h, key, value, owner)
+        added.append(True)
+        node = self.edit(owner)
+        node.array[idx] = _CHILD
+        node.array[idx + 1] = child
+        return node
+
+    def without(
+        self,
+        shift: int,
+        h: int,
+        key: object,
+        owner: Optional[object],
+        removed: List[bool],
+    ) -> Optional["_BitmapNode"]:
+        bit = 1 << ((h >> shift) & _MASK)
+        if not self.bitmap & bit:
+            return self
+        idx = 2 * _popcount(self.bitmap & (bit - 1))
+        k = self.array[idx]
+        v = self.array[idx + 1]
+        if k is _CHILD:
+            child = cast(_Node, v).without(shift + _BITS, h, key, owner, removed)
+            if not removed:
+                return self
+            node = self.edit(owner)
+            if child is None:
+                return node.remove_slot(idx, bit)
+            if child.single_pair():
+                # keep the trie as shallow as possible
+                node.array[idx : idx + 2] = child.array
+            else:
+                node.array[idx + 1] = child
+            return node
+        if k is key or k == key:
+            removed.append(True)
+            return self.edit(owner).remove_slot(idx, bit)
+        return self
+
+    def remove_slot(self, idx: int, bit: int) -> Optional["_BitmapNode"]:
+        self.bitmap &= ~bit
+        if not self.bitmap:
+            return None
+        del self.array[idx : idx + 2]
+        return self
+
+
+class _CollisionNode(_Node):
+    """Node holding key-value pairs whose keys all have the same hash"""
+
+    __slots__ = ("hash",)
+
+    def __init__(self, h: int, array: List[Any], owner: Optional[object]) -> None:
+        super().__init__(array, owner)
+        self.hash = h
+
+    def edit(self, owner: Optional[object]) -> "_CollisionNode":
+        if owner is not None and self.owner is owner:
+            return self
+        return _CollisionNode(self.hash, self.array.copy(), owner)
+
+    def index(self, key: object) -> int:
+        array = self.array
+        for idx in range(0, len(array), 2):
+            k = array[idx]
+            if k is key or k == key:
+                return idx
+        return -1
+
+    def find(self, shift: int, h: int, key: object) -> object:
+        if h != self.hash:
+            return _MISSING
+        idx = self.index(key)
+        return _MISSING if idx < 0 else self.array[idx + 1]
+
+    def assoc(
+        self,
+        shift: int,
+        h: int,
+        key: object,
+        value: object,
+        owner: Optional[object],
+        added: List[bool],
+    ) -> _Node:
+        if h != self.hash:
+            # the new key diverges from the colliding keys at this level
+            bit = 1 << ((self.hash >> shift) & _MASK)
+            wrapper = _BitmapNode(bit, [_CHILD, self], owner)
+            return wrapper.assoc(shift, h, key, value, owner, added)
+        idx = self.index(key)
+        if idx < 0:
+            node = self.edit(owner)
+            node.array.extend((key, value))
+            added.append(True)
+            return node
+        if self.array[idx + 1] is value:
+            return self
+        node = self.edit(owner)
+        node.array[idx + 1] = value
+        return node
+
+    def without(
+        self,
+        shift: int,
+        h: int,
+        key: object,
+        owner: Optional[object],
+        removed: List[bool],
+    ) -> Optional["_CollisionNode"]:
+        if h != self.hash:
+            return self
+        idx = self.index(key)
+        if idx < 0:
+            return self
+        removed.append(True)
+        if len(self.array) == 2:
+            return None
+        node = self.edit(owner)
+        del node.array[idx : idx + 2]
+        return node
+
+
+def _make_node(
+    shift: int,
+    h1: int,
+    k1: object,
+    v1: object,
+    h2: int,
+    k2: object,
+    v2: object,
+    owner: Optional[object],
+) -> _Node:
+    if h1 == h2 or shift >= _HASH_BITS:
+        return _CollisionNode(h1, [k1, v1, k2, v2], owner)
+    i1 = (h1 >> shift) & _MASK
+    i2 = (h2 >> shift) & _MASK
+    if i1 == i2:
+        child = _make_node(shift + _BITS, h1, k1, v1, h2, k2, v2, owner)
+        return _BitmapNode(1 << i1, [_CHILD, child], owner)
+    if i1 < i2:
+        return _BitmapNode((1 << i1) | (1 << i2), [k1, v1, k2, v2], owner)
+    else:
+        return _BitmapNode((1 << i1) | (1 << i2), [k2, v2, k1, v1], owner)
+
+
+def _iter_pairs(root: _Node) -> Iterator[Tuple[Any, Any]]:
+    stack = [root.array]
+    while stack:
+        array = stack.pop()
+        for idx in range(0, len(array), 2):
+            k = array[idx]
+            if k is _CHILD:
+                stack.append(array[idx + 1].array)
+            else:
+                yield k, array[idx + 1]
+
+
+_EMPTY = _BitmapNode(0, [], None)
+
+
+class PersistentMap(Mapping[_K, _V]):
+    """Immutable mapping backed by a hash array mapped trie
+
+    :meth:`set`, :meth:`delete`, and :meth:`update` return new maps in O(log n),
+    sharing all unchanged parts of the trie with the original.
+    Use :meth:`evolver` to apply many edits at once.
+    Iteration order depends on the hashes of the keys, not on insertion order.
+    """
+
+    __slots__ = ("_root", "_count", "_hash")
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        evolver: PersistentMapEvolver[_K, _V] = PersistentMapEvolver(_EMPTY, 0)
+        evolver.update(*args, **kwargs)
+        self._root: _Node = evolver._root
+        self._count: int = evolver._count
+        self._hash: Optional[int] = None
+
+    @classmethod
+    def _from_root(cls, root: _Node, count: int) -> "PersistentMap[_K, _V]":
+        self = cls.__new__(cls)
+        self._root = root
+        self._count = count
+        self._hash = None
+        return self
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, __key: _K) -> _V:
+        value = self._root.find(0, _hash(__key), __key)
+        if value is _MISSING:
+            raise KeyError(__key)
+        return cast(_V, value)
+
+    def __contains__(self, __key: object) -> bool:
+        return self._root.find(0, _hash(__key), __key) is not _MISSING
+
+    @overload
+    def get(self, __key: _K) -> Optional[_V]:
+        ...
+
+    @overload
+    def get(self, __key: _K, __default: Union[_V, _T]) -> Union[_V, _T]:
+        ...
+
+    def get(self, __key: _K, __default: object = None) -> object:
+        value = self._root.find(0, _hash(__key), __key)
+        return __default if value is _MISSING else value
+
+    def __iter__(self) -> Iterator[_K]:
+        return (k for k, _ in _iter_pairs(self._root))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__qualname__}({dict(_iter_pairs(self._root))!r})"
+
+    def __eq__(self, __other: object) -> bool:
+        if __other is self:
+            return True
+        if not isinstance(__other, Mapping):
+            return NotImplemented
+        if len(__other) != self._count:
+            return False
+        for key, value in _iter_pairs(self._root):
+            other_value = __other.get(key, _MISSING)
+            if other_value is not value and other_value != value:
+                return False
+        return True
+
+    def __hash__(self) -> int:
+        # same formula as FrozenDict, so equal maps of either type hash equal
+        if self._hash is None:
+            self._hash = hash(frozenset(_iter_pairs(self._root)))
+        return self._hash
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Dict[_K, _V]]]:
+        return (type(self), (dict(_iter_pairs(self._root)),))
+
+    def set(self, key: _K, value: _V) -> "PersistentMap[_K, _V]":
+        """Returns a new map with *key* set to *value*"""
+        added: List[bool] = []
+        root = self._root.assoc(0, _hash(key), key, value, None, added)
+        if root is self._root:
+            return self
+        return self._from_root(root, self._count + len(added))
+
+    def delete(self, key: _K) -> "PersistentMap[_K, _V]":
+        """Returns a new map without *key*, raising KeyError if it is not present"""
+        removed: List[bool] = []
+        root = self._root.without(0, _hash(key), key, None, removed)
+        if not removed:
+            raise KeyError(key)
+        return self._from_root(_EMPTY if root is None else root, self._count - 1)
+
+    def update(self, *args: Any, **kwargs: Any) -> "PersistentMap[_K, _V]":
+        """Returns a new map with the keys and values of the arguments added,
+        accepting the same arguments as :meth:`dict.update`
+        """
+        evolver = self.evolver()
+        evolver.update(*args, **kwargs)
+        return evolver.persistent()
+
+    def evolver(self) -> "PersistentMapEvolver[_K, _V]":
+        """Returns a mutable view of this map for applying many edits efficiently"""
+        return PersistentMapEvolver(self._root, self._count)
+
+
+class PersistentMapEvolver(MutableMapping[_K, _V]):
+    """Mutable builder for :class:`PersistentMap`
+
+    Nodes created by the evolver are modified in place by later edits, so a batch
+    of edits does not copy each path more than once. :meth:`persistent` returns the
+    result without affecting maps created earlier.
+    """
+
+    def __init__(self, root: _Node, count: int) -> None:
+        self._root = root
+        self._count = count
+        self._owner = object()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, __key: _K) -> _V:
+        value = self._root.find(0, _hash(__key), __key)
+        if value is _MISSING:
+            raise KeyError(__key)
+        return cast(_V, value)
+
+    def __contains__(self, __key: object) -> bool:
+        return self._root.find(0, _hash(__key), __key) is not _MISSING
+
+    def __iter__(self) -> Iterator[_K]:
+        return (k for k, _ in _iter_pairs(self._root))
+
+    def __setitem__(self, __key: _K, __value: _V) -> None:
+        added: List[bool] = []
+        self._root = self._root.assoc(
+            0, _hash(__key), __key, __value, self._owner, added
+        )
+        self._count += len(added)
+
+    def __delitem__(self, __key: _K) -> None:
+        removed: List[bool] = []
+        root = self._root.without(0, _hash(__key), __key, self._owner, removed)
+        if not removed:
+            raise KeyError(__key)
+        self._root = _EMPTY if root is None else root
+        self._count -= 1
+
+    def set(self, key: _K, value: _V) -> "PersistentMapEvolver[_K, _V]":
+        self[key] = value
+        return self
+
+    def delete(self, key: _K) -> "PersistentMapEvolver[_K, _V]":
+        del self[key]
+        return self
+
+    def persistent(self) -> PersistentMap[_K, _V]:
+        """Returns a PersistentMap of the current contents"""
+        # the published nodes must never change, so later edits need a new owner
+        self._owner = object()
+        return PersistentMap._from_root(self._root, self._count)
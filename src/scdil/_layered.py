@@ -0,0 +1,76 @@
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple, cast
+
+from scdil import _types
+from scdil._types import Value
+
+
+class LayeredMapping(Mapping[Value, Value]):
+    """Read-only view merging several mappings, earlier layers taking priority
+
+    A key takes its value from the first layer that has it. If that value is a
+    mapping, it is merged with the mappings under the same key in the following
+    layers, up to the first layer where that key is not a mapping. Nothing is copied:
+    merged values are views themselves, created on first access and cached. The
+    layers must not be modified while the view is in use.
+    """
+
+    __slots__ = ("_layers", "_cache", "_keys")
+
+    def __init__(self, *layers: _types.Mapping) -> None:
+        self._layers = layers
+        self._cache: Dict[Value, Value] = {}
+        self._keys: Optional[Dict[Value, None]] = None
+
+    @property
+    def layers(self) -> Tuple[_types.Mapping, ...]:
+        return self._layers
+
+    def __getitem__(self, __key: Value) -> Value:
+        try:
+            return self._cache[__key]
+        except KeyError:
+            pass
+        result = self._resolve(__key)
+        self._cache[__key] = result
+        return result
+
+    def _resolve(self, key: Value) -> Value:
+        mappings: List[_types.Mapping] = []
+        for layer in self._layers:
+            if key not in layer:
+                continue
+            value = layer[key]
+            if not isinstance(value, _types.Mapping):
+                if not mappings:
+                    # anything but a mapping hides the same key in all lower layers
+                    return value
+                break
+            mappings.append(value)
+        if not mappings:
+            raise KeyError(key)
+        elif len(mappings) == 1:
+            return mappings[0]
+        else:
+            return cast(_types.Mapping, LayeredMapping(*mappings))
+
+    def __contains__(self, __key: object) -> bool:
+        return any(__key in layer for layer in self._layers)
+
+    def _all_keys(self) -> Dict[Value, None]:
+        if self._keys is None:
+            # like ChainMap, keys of the lowest priority layer come first
+            keys: Dict[Value, None] = {}
+            for layer in reversed(self._layers):
+                keys.update(dict.fromkeys(layer.keys()))
+            self._keys = keys
+        return self._keys
+
+    def __iter__(self) -> Iterator[Value]:
+        return iter(self._all_keys())
+
+    def __len__(self) -> int:
+        return len(self._all_keys())
+
+    def __repr__(self) -> str:
+        layers = ", ".join(repr(layer) for layer in self._layers)
+        return f"{type(self).__qualname__}({layers})"
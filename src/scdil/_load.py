@@ -1,114 +1,407 @@
+import json
+import re
+from dataclasses import dataclass, field
 from functools import singledispatch
 from io import StringIO
-from typing import Dict, List, TextIO, Union
+from math import copysign
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 
 import scdil._ast as ast
 from scdil._frozendict import FrozenDict
-from scdil._parse import Parser
+from scdil._parse import Lexer, Parser
+from scdil._stats import LoadStats, StatsLexer, StatsReader, record_nodes, sizeof
 from scdil._types import Mapping, Sequence, Value
 
-
-def load(stream: Union[str, TextIO]) -> Value:
-    """Creates a Python object from SCDIL text or file"""
-    if isinstance(stream, str):
-        stream = StringIO(stream)
-    parser = Parser(stream)
+T = TypeVar("T")
+
+PairsHook = Callable[[List[Tuple[Any, Any]]], Any]
+SequenceFactory = Callable[[List[Any]], Any]
+ScalarParser = Callable[[str], Any]
+
+
+def load(
+    stream: Union[str, TextIO],
+    *,
+    immutable: bool = False,
+    dedupe: bool = False,
+    object_pairs_hook: Optional[PairsHook] = None,
+    sequence_factory: Optional[SequenceFactory] = None,
+    parse_float: Optional[ScalarParser] = None,
+    parse_int: Optional[ScalarParser] = None,
+    parse_string: Optional[ScalarParser] = None,
+    stats: Optional[LoadStats] = None,
+) -> Value:
+    """Creates a Python object from SCDIL text or file
+
+    If *immutable* is True, sequences are loaded as tuples and mappings as FrozenDicts,
+    so the result is hashable.
+    If *dedupe* is True, equal scalars share a single instance; with *immutable*,
+    so do equal sequences and mappings.
+
+    Like :func:`json.load`, hooks are called in place of the default constructors:
+    *object_pairs_hook* with a list of the key-value pairs of each mapping,
+    *sequence_factory* with a list of the elements of each sequence,
+    *parse_float* with the text of each float (including ``inf`` and ``nan``),
+    *parse_int* with the decimal text of each integer,
+    and *parse_string* with each string.
+    Hooks are not applied to mapping keys.
+
+    If *stats* is given, counters and per-phase timings are added to it.
+    """
+    ctx = EvalContext(
+        immutable,
+        Interner() if dedupe else None,
+        object_pairs_hook,
+        sequence_factory,
+        parse_float,
+        parse_int,
+        parse_string,
+    )
+    if stats is not None:
+        return load_with_stats(stream, ctx, stats)
+    text = stream if isinstance(stream, str) else stream.read()
+    decoder = ctx.json_decoder
+    if decoder is not None and (value := load_json(text, decoder)) is not None:
+        return value
+    parser = Parser(StringIO(text))
     ast = parser.parse()
-    return scdil_eval(ast, False)
+    return scdil_eval(ast, ctx)
+
+
+def load_with_stats(
+    stream: Union[str, TextIO], ctx: "EvalContext", stats: LoadStats
+) -> Value:
+    start = perf_counter()
+    reader = StatsReader(StringIO(stream) if isinstance(stream, str) else stream)
+    text = reader.read()
+    read = perf_counter()
+    decoder = ctx.json_decoder
+    value = None if decoder is None else load_json(text, decoder)
+    json_done = perf_counter()
+    if value is not None:
+        stats.json_loads += 1
+        stats.json_time += json_done - read
+    else:
+        lexer = StatsLexer(Lexer(StringIO(text)))
+        parser = Parser(StringIO(), lexer=lexer)
+        tree = parser.parse()
+        parsed = perf_counter()
+        value = scdil_eval(tree, ctx)
+        for kind, count in lexer.token_counts.items():
+            stats.token_counts[kind] = stats.token_counts.get(kind, 0) + count
+        stats.json_time += json_done - read
+        stats.lex_time += lexer.elapsed
+        stats.parse_time += (parsed - json_done) - lexer.elapsed
+        stats.eval_time += perf_counter() - parsed
+    if ctx.interner is not None:
+        stats.dedupe_hits += ctx.interner.hits
+        stats.dedupe_bytes_saved += ctx.interner.bytes_saved
+    stats.bytes_read += reader.bytes_read
+    stats.read_time += reader.elapsed
+    stats.total_time += perf_counter() - start
+    record_nodes(stats, value)
+    return value
+
+
+def _reject_constant(name: str) -> None:
+    raise ValueError(f"{name} is not a SCDIL value")
+
+
+_json_decoder = json.JSONDecoder(parse_constant=_reject_constant)
+
+
+def _frozen_pairs(pairs: List[Tuple[str, Any]]) -> FrozenDict[str, Any]:
+    return FrozenDict._from_dict(
+        {key: _tuples(val) if type(val) is list else val for key, val in pairs}
+    )
+
+
+def _tuples(value: List[Any]) -> Tuple[Any, ...]:
+    # the objects in a decoded array are already frozen, only the arrays are left
+    return tuple(_tuples(elem) if type(elem) is list else elem for elem in value)
+
+
+class _FrozenJSONDecoder(json.JSONDecoder):
+    """Decodes objects to FrozenDicts and arrays to tuples
+
+    The C scanner has no hook for arrays, so each object converts the arrays among
+    its values as it is built, and the root array is converted last.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(
+            object_pairs_hook=_frozen_pairs, parse_constant=_reject_constant
+        )
+
+    def decode(self, s: str, *args: Any, **kwargs: Any) -> Any:
+        value = super().decode(s, *args, **kwargs)
+        return _tuples(value) if type(value) is list else value
+
+
+_frozen_json_decoder = _FrozenJSONDecoder()
+
+# only documents that are a single literal sequence or mapping go to the fast path
+_json_start = re.compile(r"[ \n]*[\[{]")
+
+# raw DEL and C1 control codes are valid in JSON strings, but not in SCDIL strings
+_c1_control_code = re.compile("[\x7F-\x9F]")
+
+# JSON combines escaped surrogate pairs, SCDIL decodes each escape individually
+_escaped_surrogate = re.compile(r"\\u[dD][89a-fA-F]")
+
+
+def json_compatible(text: str) -> bool:
+    """Checks that JSON decodes *text* to what SCDIL would, if it decodes at all"""
+    # JSON allows tabs and carriage returns as whitespace, SCDIL does not
+    if "\t" in text or "\r" in text or "\x7F" in text:
+        return False
+    # the substring checks are much cheaper than the regexes, so they go first
+    if not text.isascii() and _c1_control_code.search(text):
+        return False
+    if "\\u" in text and _escaped_surrogate.search(text):
+        return False
+    return True
+
+
+def load_json(text: str, decoder: json.JSONDecoder = _json_decoder) -> Optional[Value]:
+    """Decodes *text* with the C JSON decoder, if its result is what SCDIL would produce
+
+    Returns None if *text* must go through the SCDIL parser.
+    """
+    if _json_start.match(text) is None or not json_compatible(text):
+        return None
+    try:
+        return cast(Value, decoder.decode(text))
+    except (ValueError, RecursionError):
+        return None
+
+
+class Interner:
+    """Table of canonical instances of values, keyed by structure
+
+    Containers are keyed by the identity of their elements, so every element of an
+    interned container must itself have been interned.
+    """
+
+    def __init__(self) -> None:
+        self.table: Dict[object, object] = {}
+        self.hits = 0
+        self.bytes_saved = 0
+
+    def intern(self, value: T) -> T:
+        typ = type(value)
+        key: object
+        if typ is str:
+            key = value
+        elif typ is tuple:
+            key = (tuple, *map(id, cast(Tuple[Value, ...], value)))
+        elif typ is FrozenDict:
+            items = cast(FrozenDict[Value, Value], value).items()
+            key = (FrozenDict, *(id(obj) for item in items for obj in item))
+        elif typ is int:
+            key = (int, value)
+        elif typ is float:
+            # 0.0 == -0.0, so the sign is part of the key
+            key = (float, value, copysign(1.0, cast(float, value)))
+        else:
+            # None and booleans are singletons, mutable containers are never shared
+            return value
+        canonical = self.table.setdefault(key, value)
+        if canonical is not value:
+            self.hits += 1
+            self.bytes_saved += sizeof(value)
+        return cast(T, canonical)
+
+
+@dataclass
+class EvalContext:
+    immutable: bool = False
+    interner: Optional[Interner] = None
+    object_pairs_hook: Optional[PairsHook] = None
+    sequence_factory: Optional[SequenceFactory] = None
+    parse_float: Optional[ScalarParser] = None
+    parse_int: Optional[ScalarParser] = None
+    parse_string: Optional[ScalarParser] = None
+    keys: "EvalContext" = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # mapping keys must be hashable, so they are always evaluated immutably
+        # and without hooks
+        if self.immutable and not self.has_hooks:
+            self.keys = self
+        else:
+            self.keys = EvalContext(True, self.interner)
+
+    @property
+    def has_hooks(self) -> bool:
+        return (
+            self.object_pairs_hook is not None
+            or self.sequence_factory is not None
+            or self.parse_float is not None
+            or self.parse_int is not None
+            or self.parse_string is not None
+        )
+
+    @property
+    def json_decoder(self) -> Optional[json.JSONDecoder]:
+        """A JSON decoder that builds values the way this context would, if possible"""
+        if (
+            self.interner is not None
+            or self.sequence_factory is not None
+            or self.parse_string is not None
+        ):
+            return None
+        if not self.has_hooks:
+            return _frozen_json_decoder if self.immutable else _json_decoder
+        if self.immutable:
+            return None
+        return json.JSONDecoder(
+            object_pairs_hook=self.object_pairs_hook,
+            parse_float=self.parse_float,
+            parse_int=self.parse_int,
+            parse_constant=_reject_constant,
+        )
 
 
 @singledispatch
-def scdil_eval(node: ast.Node, immutable: bool) -> Value:
+def scdil_eval(node: ast.Node, ctx: EvalContext) -> Value:
     raise NotImplementedError  # pragma: no cover
 
 
 @scdil_eval.register
-def _(node: ast.Integer, immutable: bool) -> int:
-    return node.value
+def _(node: ast.Integer, ctx: EvalContext) -> Value:
+    if ctx.parse_int is not None:
+        return cast(Value, ctx.parse_int(node.text))
+    if ctx.interner is None:
+        return node.value
+    return ctx.interner.intern(node.value)
 
 
 @scdil_eval.register
-def _(node: ast.Float, immutable: bool) -> float:
-    return node.value
+def _(node: ast.Float, ctx: EvalContext) -> Value:
+    if ctx.parse_float is not None:
+        return cast(Value, ctx.parse_float(node.text))
+    if ctx.interner is None:
+        return node.value
+    return ctx.interner.intern(node.value)
 
 
 @scdil_eval.register
-def _(node: ast.String, immutable: bool) -> str:
-    return node.value
+def _(node: ast.String, ctx: EvalContext) -> Value:
+    return eval_str(node.value, ctx)
 
 
 @scdil_eval.register
-def _(node: ast.Null, immutable: bool) -> None:
+def _(node: ast.Null, ctx: EvalContext) -> None:
     return None
 
 
 @scdil_eval.register
-def _(node: ast.Boolean, immutable: bool) -> bool:
+def _(node: ast.Boolean, ctx: EvalContext) -> bool:
     return node.value
 
 
 @scdil_eval.register
-def _(node: ast.Sequence, immutable: bool) -> Sequence:
-    res = [scdil_eval(elem.value, immutable=immutable) for elem in node.elements]
-    if immutable:
-        return tuple(res)
-    else:
-        return res
+def _(node: ast.Sequence, ctx: EvalContext) -> Sequence:
+    return eval_sequence(node.elements, ctx)
 
 
 @scdil_eval.register
-def _(node: ast.Mapping, immutable: bool) -> Mapping:
-    res: Dict[Value, Value] = {}
-    for elem in node.elements:
-        key: Value = scdil_eval(elem.key, immutable=True)
-        value = scdil_eval(elem.value, immutable=immutable)
-        res[key] = value
-    if immutable:
-        return FrozenDict(res)
-    else:
-        return res
+def _(node: ast.Mapping, ctx: EvalContext) -> Mapping:
+    keys = ctx.keys
+    items = (
+        (scdil_eval(elem.key, keys), scdil_eval(elem.value, ctx))
+        for elem in node.elements
+    )
+    return eval_mapping(items, ctx)
 
 
 @scdil_eval.register
-def _(node: ast.BlockSequence, immutable: bool) -> Sequence:
-    res = [scdil_eval(elem.value, immutable=immutable) for elem in node.elements]
-    if immutable:
-        return tuple(res)
-    else:
-        return res
+def _(node: ast.BlockSequence, ctx: EvalContext) -> Sequence:
+    return eval_sequence(node.elements, ctx)
 
 
 @scdil_eval.register
-def _(node: ast.BlockMapping, immutable: bool) -> Mapping:
-    res: Dict[Value, Value] = {}
-    for elem in node.elements:
-        key = elem.key.value
-        value = scdil_eval(elem.value, immutable=immutable)
-        res[key] = value
-    if immutable:
-        return FrozenDict(res)
+def _(node: ast.BlockMapping, ctx: EvalContext) -> Mapping:
+    if ctx.interner is None:
+        items = (
+            (elem.key.value, scdil_eval(elem.value, ctx)) for elem in node.elements
+        )
     else:
-        return res
+        intern = ctx.interner.intern
+        items = (
+            (intern(elem.key.value), scdil_eval(elem.value, ctx))
+            for elem in node.elements
+        )
+    return eval_mapping(items, ctx)
 
 
 @scdil_eval.register
-def _(node: ast.LiteralLines, immutable: bool) -> str:
-    return "\n".join(line.value for line in node.lines)
+def _(node: ast.LiteralLines, ctx: EvalContext) -> Value:
+    return eval_str("\n".join(line.value for line in node.lines), ctx)
 
 
 @scdil_eval.register
-def _(node: ast.FoldedLines, immutable: bool) -> str:
-    return folded_lines(node.lines)
+def _(node: ast.FoldedLines, ctx: EvalContext) -> Value:
+    return eval_str(folded_lines(node.lines), ctx)
 
 
 @scdil_eval.register
-def _(node: ast.EscapedLiteralLines, immutable: bool) -> str:
-    return "\n".join(line.value for line in node.lines)
+def _(node: ast.EscapedLiteralLines, ctx: EvalContext) -> Value:
+    return eval_str("\n".join(line.value for line in node.lines), ctx)
 
 
 @scdil_eval.register
-def _(node: ast.EscapedFoldedLines, immutable: bool) -> str:
-    return folded_lines(node.lines)
+def _(node: ast.EscapedFoldedLines, ctx: EvalContext) -> Value:
+    return eval_str(folded_lines(node.lines), ctx)
+
+
+def eval_sequence(
+    elements: Union[List[ast.SequenceElement], List[ast.BlockSequenceElement]],
+    ctx: EvalContext,
+) -> Sequence:
+    if ctx.sequence_factory is not None:
+        return cast(
+            Sequence, ctx.sequence_factory([scdil_eval(e.value, ctx) for e in elements])
+        )
+    if not ctx.immutable:
+        return [scdil_eval(elem.value, ctx) for elem in elements]
+    res = tuple(scdil_eval(elem.value, ctx) for elem in elements)
+    if ctx.interner is None:
+        return res
+    return ctx.interner.intern(res)
+
+
+def eval_mapping(items: Iterable[Tuple[Value, Value]], ctx: EvalContext) -> Mapping:
+    if ctx.object_pairs_hook is not None:
+        return cast(Mapping, ctx.object_pairs_hook(list(items)))
+    if not ctx.immutable:
+        return dict(items)
+    res = FrozenDict._from_dict(dict(items))
+    if ctx.interner is None:
+        return res
+    return ctx.interner.intern(res)
+
+
+def eval_str(value: str, ctx: EvalContext) -> Value:
+    if ctx.parse_string is not None:
+        return cast(Value, ctx.parse_string(value))
+    if ctx.interner is None:
+        return value
+    return ctx.interner.intern(value)
 
 
 def folded_lines(
@@ -13,8 +13,10 @@ class ParseError(Exception):
 
 
 class Parser:
-    def __init__(self, stream: TextIO) -> None:
-        self.lexer = Lexer(stream)
+    def __init__(
+        self, stream: TextIO, lexer: Optional[Iterator[ast.Token]] = None
+    ) -> None:
+        self.lexer: Iterator[ast.Token] = Lexer(stream) if lexer is None else lexer
         self.curr: Optional[ast.Token] = next(self.lexer, None)
         self.lookahead: Optional[ast.Token] = None
 
@@ -444,7 +446,7 @@ class Lexer(Iterator[ast.Token]):
         while c in hex_chars:
             c = self.save_and_next()
         value = int(self.get_capture(), 16)
-        return ast.Integer(self.finish_capture(), value)
+        return ast.Integer(self.finish_capture(), value, str(value))
 
     def lex_octal(self) -> ast.Integer:
         assert self.curr == "0"
@@ -458,7 +460,7 @@ class Lexer(Iterator[ast.Token]):
         while c in octal_chars:
             c = self.save_and_next()
         value = int(self.get_capture(), 8)
-        return ast.Integer(self.finish_capture(), value)
+        return ast.Integer(self.finish_capture(), value, str(value))
 
     def lex_binary(self) -> ast.Integer:
         assert self.curr == "0"
@@ -472,7 +474,7 @@ class Lexer(Iterator[ast.Token]):
         while c in ("0", "1"):
             c = self.save_and_next()
         value = int(self.get_capture(), 2)
-        return ast.Integer(self.finish_capture(), value)
+        return ast.Integer(self.finish_capture(), value, str(value))
 
     def lex_decimal(self) -> Union[ast.Integer, ast.Float]:
         is_float = False
@@ -490,12 +492,11 @@ class Lexer(Iterator[ast.Token]):
             is_float = True
             self.consume_exponent()
         # evaluate
+        text = self.get_capture()
         if is_float:
-            value = float(self.get_capture())
-            return ast.Float(self.finish_capture(), value)
+            return ast.Float(self.finish_capture(), float(text), text)
         else:
-            value = int(self.get_capture())
-            return ast.Integer(self.finish_capture(), value)
+            return ast.Integer(self.finish_capture(), int(text), text)
 
     def consume_integral(self) -> None:
         c = self.curr
@@ -533,9 +534,9 @@ class Lexer(Iterator[ast.Token]):
             c = self.save_and_next()
         value = self.get_capture()
         if value == "-inf":
-            return ast.Float(self.finish_capture(), -inf)
+            return ast.Float(self.finish_capture(), -inf, value)
         elif value == "+inf":
-            return ast.Float(self.finish_capture(), inf)
+            return ast.Float(self.finish_capture(), inf, value)
         else:
             raise ParseError(
                 self.finish_capture(), f"{value!r} is not a valid named number"
@@ -629,9 +630,9 @@ class Lexer(Iterator[ast.Token]):
         elif value == "false":
             return ast.Boolean(self.finish_capture(), False)
         elif value == "inf":
-            return ast.Float(self.finish_capture(), inf)
+            return ast.Float(self.finish_capture(), inf, value)
         elif value == "nan":
-            return ast.Float(self.finish_capture(), nan)
+            return ast.Float(self.finish_capture(), nan, value)
         else:
             return ast.Name(self.finish_capture(), value)
 
@@ -0,0 +1,379 @@
+import operator
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, cast
+
+from scdil._convert import freeze
+from scdil._load import load
+from scdil._parse import ParseError
+from scdil._types import (
+    FLOAT,
+    INT,
+    MAPPING,
+    SEQUENCE,
+    Mapping,
+    Sequence,
+    Value,
+    kind_of,
+)
+
+# The keys and indexes leading to a value from the root
+KeyPath = Tuple[Value, ...]
+
+Step = Callable[[Iterable[Value]], Iterator[Value]]
+
+_missing: Any = object()
+
+_token = re.compile(
+    r"""\s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*")
+        |(?P<op>==|!=|<=|>=|<|>)
+        |(?P<punct>[.\[\]*?])
+        |(?P<name>[^\W\d]\w*)
+        |(?P<number>[-+]?(?:inf|nan|\d[\w.]*(?:[-+]\d+)?))
+    )""",
+    re.VERBOSE,
+)
+
+_operators: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+_numbers = (INT, FLOAT)
+
+
+class Query:
+    """A compiled query, returned by :func:`query`"""
+
+    def __init__(self, text: str, steps: List[Any]) -> None:
+        self.text = text
+        # the keys of a path without wildcards or filters, which has one result at most
+        self.keys: Optional[KeyPath] = None
+        if all(isinstance(step, tuple) for step in steps):
+            self.keys = sum(steps, ())
+            self._lookup = _lookup(self.keys)
+        self._steps = [
+            _key_step(_lookup(step)) if isinstance(step, tuple) else step
+            for step in steps
+        ]
+
+    def all(self, value: Value) -> List[Value]:
+        """Returns the values matching the query, in order"""
+        return list(self.iter(value))
+
+    def iter(self, value: Value) -> Iterator[Value]:
+        """Iterates over the values matching the query, in order"""
+        values: Iterable[Value] = (value,)
+        for step in self._steps:
+            values = step(values)
+        return iter(values)
+
+    def get(self, value: Value, default: Any = _missing) -> Any:
+        """Returns the first value matching the query
+
+        If there is none, returns *default*, or raises KeyError if it is not given.
+        """
+        if self.keys is not None:
+            try:
+                return self._lookup(value)
+            except (LookupError, TypeError):
+                pass
+        else:
+            for found in self.iter(value):
+                return found
+        if default is _missing:
+            raise KeyError(self.text)
+        return default
+
+    def __repr__(self) -> str:
+        return f"query({self.text!r})"
+
+
+@lru_cache(maxsize=1024)
+def query(text: str) -> Query:
+    """Compiles a query on values, caching the compiled query
+
+    A query is a path of steps from the root value, the empty query being the root:
+
+    - ``name``, or ``.name`` after another step, selects a key of mappings,
+      ``["any key"]`` a key written as a SCDIL string, and ``[0]`` an index of
+      sequences or an integer key;
+    - ``*`` or ``[*]`` selects all the elements of sequences and values of mappings;
+    - ``[?path]`` selects the elements and values that have *path*, a query of keys
+      and indexes only, and ``[?path == scalar]`` those where its value compares to
+      a SCDIL scalar with one of ``==``, ``!=``, ``<``, ``<=``, ``>`` or ``>=``.
+
+    Like ``services[?name == "web"].ports[0]``. Keys that are missing select nothing.
+    """
+    return Query(text, _QueryParser(text).parse())
+
+
+class PathIndex:
+    """Index of all the values in a value by their key path, for lookups in O(1)
+
+    The value is frozen first, so it can't change while it is indexed. Paths are
+    either tuples of keys and indexes, or queries without wildcards or filters.
+    """
+
+    def __init__(self, value: Value) -> None:
+        self.value = freeze(value)
+        self._index: Dict[KeyPath, Value] = {(): self.value}
+        stack: List[Tuple[KeyPath, Value]] = [((), self.value)]
+        while stack:
+            path, container = stack.pop()
+            kind = kind_of(container)
+            if kind == MAPPING:
+                items: Iterable[Tuple[Value, Value]] = cast(Mapping, container).items()
+            elif kind == SEQUENCE:
+                items = enumerate(cast(Sequence, container))
+            else:
+                continue
+            for key, child in items:
+                child_path = path + (key,)
+                self._index[child_path] = child
+                stack.append((child_path, child))
+
+    def __getitem__(self, path: Any) -> Value:
+        keys = self._keys(path)
+        try:
+            return self._index[keys]
+        except KeyError:
+            found = self._missed(keys)
+        if found is _missing:
+            raise KeyError(path)
+        return cast(Value, found)
+
+    def get(self, path: Any, default: Any = None) -> Any:
+        keys = self._keys(path)
+        found = self._index.get(keys, _missing)
+        if found is _missing:
+            found = self._missed(keys)
+        return default if found is _missing else found
+
+    def __contains__(self, path: Any) -> bool:
+        return self.get(path, _missing) is not _missing
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def all(self, text: str) -> List[Value]:
+        """Returns the values matching a query of any kind"""
+        return query(text).all(self.value)
+
+    def _missed(self, keys: KeyPath) -> Any:
+        # negative indexes are not in the index, every other path is
+        if any(type(key) is int and key < 0 for key in keys):
+            return _query_keys(keys).get(self.value, _missing)
+        return _missing
+
+    def _keys(self, path: Any) -> KeyPath:
+        if isinstance(path, tuple):
+            return path
+        keys = query(path).keys
+        if keys is None:
+            raise ValueError(f"Only queries of keys can be looked up, got {path!r}")
+        return keys
+
+
+@lru_cache(maxsize=1024)
+def _query_keys(keys: KeyPath) -> Query:
+    return Query(repr(keys), [keys])
+
+
+class _QueryParser:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.tokens: List[Tuple[str, str]] = []
+        pos = 0
+        while text[pos:].strip():
+            match = _token.match(text, pos)
+            if match is None:
+                raise self.error(f"unexpected {text[pos:].strip()[0]!r}")
+            pos = match.end()
+            kind = cast(str, match.lastgroup)
+            self.tokens.append((kind, match.group(kind)))
+        self.pos = 0
+
+    def error(self, msg: str) -> ValueError:
+        return ValueError(f"Invalid query {self.text!r}: {msg}")
+
+    def peek(self) -> str:
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else ""
+
+    def next(self) -> Tuple[str, str]:
+        if self.pos == len(self.tokens):
+            raise self.error("unexpected end")
+        self.pos += 1
+        return self.tokens[self.pos - 1]
+
+    def expect(self, value: str) -> None:
+        if self.next()[1] != value:
+            raise self.error(f"expected {value!r}")
+
+    def parse(self) -> List[Any]:
+        """Returns the steps, key tuples or functions, for the whole query"""
+        steps: List[Any] = []
+        if self.pos < len(self.tokens) and self.peek() != "[":
+            steps.append(self.parse_dotted())
+        while self.pos < len(self.tokens):
+            if self.peek() == ".":
+                self.next()
+                steps.append(self.parse_dotted())
+            else:
+                steps.append(self.parse_bracket())
+        return _merge_keys(steps)
+
+    def parse_dotted(self) -> Any:
+        kind, value = self.next()
+        if value == "*":
+            return _children
+        elif kind == "name":
+            return (value,)
+        raise self.error(f"expected a name or '*', got {value!r}")
+
+    def parse_bracket(self) -> Any:
+        self.expect("[")
+        if self.peek() == "*":
+            self.next()
+            step: Any = _children
+        elif self.peek() == "?":
+            self.next()
+            step = self.parse_filter()
+        else:
+            step = (self.parse_key(),)
+        self.expect("]")
+        return step
+
+    def parse_key(self) -> Value:
+        kind, value = self.next()
+        key = self.scalar(kind, value)
+        if kind_of(key) == INT or (kind == "string" and isinstance(key, str)):
+            return key
+        raise self.error(f"expected an integer or string key, got {value!r}")
+
+    def parse_filter(self) -> Step:
+        keys: KeyPath = ()
+        while self.peek() not in ("]", "") and self.peek() not in _operators:
+            if self.peek() == "[":
+                self.next()
+                keys += (self.parse_key(),)
+                self.expect("]")
+            else:
+                if keys:
+                    self.expect(".")
+                kind, value = self.next()
+                if kind != "name":
+                    raise self.error(f"expected a name, got {value!r}")
+                keys += (value,)
+        if not keys:
+            raise self.error("expected a path to filter on")
+        if self.peek() not in _operators:
+            return _filter_step(_lookup(keys), None)
+        op = self.next()[1]
+        literal = self.scalar(*self.next())
+        return _filter_step(_lookup(keys), _comparison(op, literal))
+
+    def scalar(self, kind: str, text: str) -> Value:
+        if kind not in ("string", "number", "name"):
+            raise self.error(f"expected a scalar, got {text!r}")
+        try:
+            value = load(text)
+        except (ParseError, ValueError):
+            raise self.error(f"invalid scalar {text!r}") from None
+        if kind_of(value) >= SEQUENCE:
+            raise self.error(f"expected a scalar, got {text!r}")
+        return value
+
+
+def _merge_keys(steps: List[Any]) -> List[Any]:
+    """Joins the keys of consecutive key steps, so they are looked up in one step"""
+    merged: List[Any] = []
+    for step in steps:
+        if merged and isinstance(step, tuple) and isinstance(merged[-1], tuple):
+            merged[-1] += step
+        else:
+            merged.append(step)
+    return merged
+
+
+def _lookup(keys: KeyPath) -> Callable[[Value], Value]:
+    """Compiles a function looking up each key in turn
+
+    The lookups are unrolled into one expression, which is much faster than a loop.
+    Strings are scalars, so indexing one raises KeyError instead of giving a character.
+    """
+    names = [f"k{i}" for i in range(len(keys))]
+    lines = []
+    expr = "value"
+    for name, key in zip(names, keys):
+        if isinstance(key, int):
+            lines.append(f"value = {expr}")
+            lines.append(f"if type(value) is str: raise KeyError({name})")
+            expr = "value"
+        expr += f"[{name}]"
+    lines.append(f"return {expr}")
+    # the keys are arguments of the outer function, so they are not part of the code
+    source = f"def make({', '.join(names)}):\n  def lookup(value):\n"
+    source += "".join(f"    {line}\n" for line in lines)
+    source += "  return lookup\n"
+    namespace: Dict[str, Any] = {}
+    exec(source, namespace)
+    return cast(Callable[[Value], Value], namespace["make"](*keys))
+
+
+def _key_step(lookup: Callable[[Value], Value]) -> Step:
+    def key_step(values: Iterable[Value]) -> Iterator[Value]:
+        for value in values:
+            try:
+                yield lookup(value)
+            except (LookupError, TypeError):
+                pass
+
+    return key_step
+
+
+def _children(values: Iterable[Value]) -> Iterator[Value]:
+    for value in values:
+        kind = kind_of(value)
+        if kind == MAPPING:
+            yield from cast(Mapping, value).values()
+        elif kind == SEQUENCE:
+            yield from cast(Sequence, value)
+
+
+def _filter_step(
+    lookup: Callable[[Value], Value], test: Optional[Callable[[Value], bool]]
+) -> Step:
+    def filter_step(values: Iterable[Value]) -> Iterator[Value]:
+        for child in _children(values):
+            try:
+                found = lookup(child)
+            except (LookupError, TypeError):
+                continue
+            if test is None or test(found):
+                yield child
+
+    return filter_step
+
+
+def _comparison(op: str, literal: Value) -> Callable[[Value], bool]:
+    compare = _operators[op]
+    literal_kind = kind_of(literal)
+    is_number = literal_kind in _numbers
+
+    def test(value: Value) -> bool:
+        # values of different kinds are never equal, and are not ordered
+        kind = kind_of(value)
+        if kind != literal_kind and not (is_number and kind in _numbers):
+            return op == "!="
+        try:
+            return bool(compare(value, literal))
+        except TypeError:
+            return False
+
+    return test
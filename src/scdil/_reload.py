@@ -0,0 +1,241 @@
+import os
+import threading
+from math import copysign
+from types import TracebackType
+from typing import Any, Callable, List, Optional, Tuple, Type, Union, cast
+
+from scdil._frozendict import FrozenDict
+from scdil._load import load
+from scdil._types import Value
+
+# The keys and indexes leading to a value from the root
+KeyPath = Tuple[Value, ...]
+
+Subscriber = Callable[[List[KeyPath]], None]
+
+_containers = frozenset((dict, FrozenDict, list, tuple))
+
+_missing: Any = object()
+
+# A pair of containers being compared: the old and the new container, the path to
+# them, an iterator over the keys of the new children with the old and new child,
+# the children of the merged container, and whether anything in them changed
+_Frame = List[Any]
+
+
+class Reloader:
+    """Keeps the value loaded from a file up to date, polling the file for changes
+
+    The file is checked with :func:`os.stat` on each call to :meth:`poll`, or every
+    *interval* seconds in a background thread between :meth:`start` and :meth:`stop`.
+    When it changed, it is loaded again and merged with the old value, so the parts
+    that are equal are still the old objects and caches keyed on them stay valid.
+    The merged value then replaces :attr:`value` in a single assignment.
+
+    If loading the file fails, the old value is kept and the error is stored in
+    :attr:`error` until the file loads again.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        *,
+        interval: float = 1.0,
+        immutable: bool = False,
+    ) -> None:
+        self.path = path
+        self.interval = interval
+        self.immutable = immutable
+        self.error: Optional[Exception] = None
+        self._subscribers: List[Tuple[Subscriber, KeyPath]] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stat = self._stat_file()
+        self._value = self._load()
+
+    @property
+    def value(self) -> Value:
+        """The value last loaded from the file"""
+        return self._value
+
+    def subscribe(self, callback: Subscriber, prefix: KeyPath = ()) -> None:
+        """Calls *callback* with the paths that changed, after each reload
+
+        With a *prefix*, only the paths under it are passed, along with those of its
+        parents when they were replaced as a whole, and *callback* is only called if
+        there are any.
+        """
+        self._subscribers.append((callback, tuple(prefix)))
+
+    def unsubscribe(self, callback: Subscriber) -> None:
+        self._subscribers = [sub for sub in self._subscribers if sub[0] != callback]
+
+    def poll(self) -> List[KeyPath]:
+        """Reloads the file if it changed, returning the paths that changed"""
+        with self._lock:
+            stat = self._stat_file()
+            if stat == self._stat:
+                return []
+            # a file that fails to load is not loaded again until it changes
+            self._stat = stat
+            try:
+                new = self._load()
+            except Exception as exc:
+                self.error = exc
+                raise
+            self.error = None
+            self._value, changes = merge(self._value, new)
+        if changes:
+            self._notify(changes)
+        return changes
+
+    def start(self) -> None:
+        """Starts polling the file in a background thread"""
+        if self._thread is not None:
+            raise RuntimeError("The reloader is already started")
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"Reloader({self.path})", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background thread, waiting for it to finish"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                # kept in self.error, the thread keeps polling
+                pass
+
+    def _stat_file(self) -> Tuple[int, int, int, int]:
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino
+
+    def _load(self) -> Value:
+        with open(self.path, "rb") as f:
+            text = f.read().decode("utf-8", "surrogatepass")
+        return load(text, immutable=self.immutable)
+
+    def _notify(self, changes: List[KeyPath]) -> None:
+        for callback, prefix in list(self._subscribers):
+            n = len(prefix)
+            paths = [
+                path
+                for path in changes
+                if path[:n] == prefix or prefix[: len(path)] == path
+            ]
+            if paths:
+                callback(paths)
+
+    def __enter__(self) -> "Reloader":
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.stop()
+
+
+def merge(old: Value, new: Value) -> Tuple[Value, List[KeyPath]]:
+    """Returns *new* with the parts equal to those of *old* replaced by them
+
+    Containers are only rebuilt if something in them changed, otherwise the old
+    container is used as a whole. Mappings are compared like with ``==``, whatever
+    the order of their keys.
+
+    The paths returned are those of the values changed, added, or removed, not those
+    of the containers holding them.
+    """
+    if not _same_container_type(old, new):
+        return (old, []) if _same_scalar(old, new) else (new, [()])
+    changes: List[KeyPath] = []
+    stack = [_frame(old, new, ())]
+    while stack:
+        frame = stack[-1]
+        path, children, out = frame[2:5]
+        for key, old_child, new_child in children:
+            if _same_container_type(old_child, new_child):
+                stack.append(_frame(old_child, new_child, path + (key,)))
+                break
+            elif _same_scalar(old_child, new_child):
+                out[key] = old_child
+            else:
+                out[key] = new_child
+                changes.append(path + (key,))
+                frame[5] = True
+        else:
+            stack.pop()
+            changed = _removed(frame, changes) or frame[5]
+            result = _rebuild(frame[1], out) if changed else frame[0]
+            if not stack:
+                return result, changes
+            stack[-1][4][path[-1]] = result
+            stack[-1][5] = stack[-1][5] or changed
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+def _same_container_type(old: Value, new: Value) -> bool:
+    return type(old) is type(new) and type(new) in _containers
+
+
+def _same_scalar(old: Value, new: Value) -> bool:
+    if old is new:
+        return True
+    elif type(old) is not type(new):
+        return False
+    elif isinstance(old, float) and isinstance(new, float):
+        # NaNs are not equal to themselves but are no change, 0.0 and -0.0 are
+        # equal but are dumped differently
+        if old != old:
+            return new != new
+        return old == new and copysign(1.0, old) == copysign(1.0, new)
+    return bool(old == new)
+
+
+def _frame(old: Any, new: Any, path: KeyPath) -> _Frame:
+    if isinstance(new, (dict, FrozenDict)):
+        children: Any = (
+            (key, old.get(key, _missing), child) for key, child in new.items()
+        )
+        out: Any = {}
+    else:
+        children = (
+            (i, old[i] if i < len(old) else _missing, child)
+            for i, child in enumerate(new)
+        )
+        out = [None] * len(new)
+    return [old, new, path, children, out, False]
+
+
+def _removed(frame: _Frame, changes: List[KeyPath]) -> bool:
+    """Adds the paths of the values removed from the old container"""
+    old, new, path = frame[:3]
+    if isinstance(new, (dict, FrozenDict)):
+        if len(old) == len(new) and not frame[5]:
+            # the keys of new are all in old, or a change was recorded
+            return False
+        removed: List[Any] = [key for key in old if key not in new]
+    else:
+        removed = list(range(len(new), len(old)))
+    changes.extend(path + (key,) for key in removed)
+    return bool(removed)
+
+
+def _rebuild(new: Value, out: Any) -> Value:
+    if isinstance(new, FrozenDict):
+        return FrozenDict._from_dict(out)
+    elif isinstance(new, tuple):
+        return tuple(out)
+    return cast(Value, out)
@@ -0,0 +1,575 @@
+import struct
+import sys
+import threading
+import time
+import typing
+from multiprocessing import resource_tracker, shared_memory
+from typing import (
+    Any,
+    Dict,
+    ItemsView,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    ValuesView,
+    cast,
+    overload,
+)
+
+from scdil import _types
+from scdil._convert import freeze
+from scdil._types import Value
+
+# Layout of a shared value, all integers little-endian:
+#
+#   header     magic "SCDL", format version (u8), offset of the root value (u32)
+#   null       tag
+#   false      tag
+#   true       tag
+#   integer    tag, i64
+#   big int    tag, byte count (u32), two's complement bytes
+#   float      tag, f64
+#   string     tag, byte count (u32), UTF-8 bytes
+#   sequence   tag, element count (u32), offset of each element (u32)
+#   mapping    tag, item count (u32), offsets of each key and value (u32, u32),
+#              then item indexes (u32) sorted by the encoded keys, for lookups
+#
+# Values are written after the values they contain, and equal scalars and
+# containers reachable more than once are only written once.
+
+_MAGIC = b"SCDL"
+_FORMAT = 1
+
+_NULL, _FALSE, _TRUE, _INT, _BIG_INT, _FLOAT, _STR, _SEQUENCE, _MAPPING = range(9)
+
+_header = struct.Struct("<4sBI")
+_u32 = struct.Struct("<I")
+_tag_i64 = struct.Struct("<Bq")
+_tag_f64 = struct.Struct("<Bd")
+_tag_u32 = struct.Struct("<BI")
+
+# sorts after every encoded scalar, whose first byte is its tag
+_CONTAINER_SORT_KEY = b"\xff"
+
+_scalar_types = (type(None), bool, int, float, str)
+
+# Layout of the control block of a channel: magic "SCDC", sequence number (u64),
+# version (u64), byte count of the name of the data block (u8), then the name.
+# The sequence number is odd while the publisher is changing the rest.
+_control = struct.Struct("<4sQQB")
+_CONTROL_MAGIC = b"SCDC"
+_CONTROL_SIZE = _control.size + 255
+_sequence = struct.Struct("<Q")
+
+# serializes the replacement of resource_tracker.register, see _attach
+_attach_lock = threading.Lock()
+
+
+def to_shared_memory(
+    value: Value, name: Optional[str] = None
+) -> shared_memory.SharedMemory:
+    """Copies a value into a new shared memory block
+
+    The block is laid out so that :func:`from_shared_memory` can read it in place.
+    The caller owns the block and must ``close()`` and ``unlink()`` it when done.
+    """
+    data = _Encoder().encode(value)
+    shm = shared_memory.SharedMemory(name, create=True, size=len(data))
+    cast(memoryview, shm.buf)[: len(data)] = data
+    return shm
+
+
+def from_shared_memory(block: Union[str, shared_memory.SharedMemory]) -> Value:
+    """Returns a read-only view of a value written by :func:`to_shared_memory`
+
+    Sequences and mappings are returned as :class:`SharedSequence` and
+    :class:`SharedMapping`, which decode elements as they are accessed. The views
+    keep the block open; it must not be modified while they are in use.
+    """
+    shm = _attach(block) if isinstance(block, str) else block
+    opened = _Block(shm)
+    magic, version, root = _header.unpack_from(opened.buf)
+    if magic != _MAGIC or version != _FORMAT:
+        raise ValueError(f"Shared memory block {shm.name!r} does not hold a value")
+    return _decode(opened, root)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    # Before 3.13, attaching registers the block with the resource tracker, which
+    # unlinks it when the process exits. There is no way to opt out but replacing
+    # register while attaching. Only this block is skipped, so the blocks other
+    # threads create meanwhile are still registered.
+    skipped = name.lstrip("/")
+    with _attach_lock:
+        register = resource_tracker.register
+
+        def register_others(name: Any, rtype: str) -> None:
+            if rtype != "shared_memory" or name.lstrip("/") != skipped:
+                register(name, rtype)
+
+        resource_tracker.register = register_others
+        try:
+            return shared_memory.SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+
+class _Block:
+    """A shared memory block, kept open as long as there are views into it"""
+
+    __slots__ = ("shm", "buf")
+
+    def __init__(self, shm: shared_memory.SharedMemory) -> None:
+        self.shm = shm
+        self.buf = cast(memoryview, shm.buf)
+
+
+class _Encoder:
+    def __init__(self) -> None:
+        self.buf = bytearray(_header.size)
+        self.scalars: Dict[bytes, int] = {}
+        self.containers: Dict[int, int] = {}
+        # the containers are keyed by id, so they must outlive the encoder
+        self.written: List[Value] = []
+
+    def encode(self, value: Value) -> bytearray:
+        root = self.write(value)
+        _header.pack_into(self.buf, 0, _MAGIC, _FORMAT, root)
+        return self.buf
+
+    def write(self, value: Value) -> int:
+        if isinstance(value, _scalar_types):
+            return self.scalar(value)
+        # containers being written, the ancestors of the top of the stack
+        active: Set[int] = set()
+        # the children of a container are listed when it is first visited, and
+        # written with it once they have been written themselves
+        stack: List[Tuple[Value, Optional[_Children]]] = [(value, None)]
+        while stack:
+            obj, children = stack.pop()
+            if children is not None:
+                active.discard(id(obj))
+                self.containers[id(obj)] = self.container(*children)
+                self.written.append(obj)
+                continue
+            if id(obj) in self.containers:
+                continue
+            if id(obj) in active:
+                raise ValueError(
+                    f"Object {object.__repr__(obj)} is recursive, aborting"
+                )
+            active.add(id(obj))
+            children = _children(obj)
+            stack.append((obj, children))
+            stack.extend(
+                (child, None)
+                for child in children[1]
+                if not isinstance(child, _scalar_types)
+            )
+        return self.containers[id(value)]
+
+    def offset_of(self, value: Value) -> int:
+        if isinstance(value, _scalar_types):
+            return self.scalar(value)
+        return self.containers[id(value)]
+
+    def scalar(self, value: Value) -> int:
+        data = _encode_scalar(value)
+        offset = self.scalars.get(data)
+        if offset is None:
+            offset = self.scalars[data] = self.append(data)
+        return offset
+
+    def container(self, is_mapping: bool, children: List[Value]) -> int:
+        offsets = [self.offset_of(child) for child in children]
+        if is_mapping:
+            size = len(children) // 2
+            data = bytearray(_tag_u32.pack(_MAPPING, size))
+            data += struct.pack(f"<{2 * size}I", *offsets)
+            sort_keys = [_sort_key_of(key) for key in children[::2]]
+            index = sorted(range(size), key=sort_keys.__getitem__)
+            data += struct.pack(f"<{size}I", *index)
+        else:
+            data = bytearray(_tag_u32.pack(_SEQUENCE, len(children)))
+            data += struct.pack(f"<{len(children)}I", *offsets)
+        return self.append(data)
+
+    def append(self, data: Union[bytes, bytearray]) -> int:
+        offset = len(self.buf)
+        if offset + len(data) > 0xFFFFFFFF:
+            raise ValueError("Value is too large to be put in shared memory")
+        self.buf += data
+        return offset
+
+
+# whether a container is a mapping, and its elements or its keys and values in turn
+_Children = Tuple[bool, List[Value]]
+
+
+def _children(value: Value) -> _Children:
+    if isinstance(value, _types.Sequence):
+        return False, list(value)
+    elif isinstance(value, _types.Mapping):
+        return True, [obj for item in value.items() for obj in item]
+    raise TypeError(f"Got unsupported type {type(value).__qualname__}")
+
+
+def _encode_scalar(value: Value) -> bytes:
+    if value is None:
+        return bytes((_NULL,))
+    elif isinstance(value, bool):
+        return bytes((_TRUE if value else _FALSE,))
+    elif isinstance(value, int):
+        if -(2**63) <= value < 2**63:
+            return _tag_i64.pack(_INT, value)
+        data = value.to_bytes(value.bit_length() // 8 + 1, "little", signed=True)
+        return _tag_u32.pack(_BIG_INT, len(data)) + data
+    elif isinstance(value, float):
+        return _tag_f64.pack(_FLOAT, value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8", "surrogatepass")
+        return _tag_u32.pack(_STR, len(data)) + data
+    raise TypeError(f"Got unsupported type {type(value).__qualname__}")
+
+
+def _sort_key_of(key: Value) -> bytes:
+    if isinstance(key, _scalar_types):
+        return _encode_scalar(key)
+    return _CONTAINER_SORT_KEY
+
+
+def _key_encodings(key: object) -> Optional[List[bytes]]:
+    """Returns the encodings of all scalars equal to *key*, or None if it is a container"""
+    if isinstance(key, (bool, int, float)):
+        return [_encode_scalar(n) for n in _equal_numbers(key)]
+    elif isinstance(key, _scalar_types):
+        return [_encode_scalar(key)]
+    return None
+
+
+def _equal_numbers(key: Union[int, float]) -> List[Value]:
+    # like dict lookups, 1 finds the keys 1.0 and True
+    if isinstance(key, float) and not key.is_integer():
+        return [key]
+    n = int(key)
+    equal: List[Value] = [n]
+    if n in (0, 1):
+        equal.append(bool(n))
+    try:
+        f = float(n)
+    except OverflowError:
+        pass
+    else:
+        if f == n:
+            equal.append(f)
+            if n == 0:
+                equal.append(-0.0)
+    return equal
+
+
+def _decode(block: _Block, offset: int) -> Value:
+    buf = block.buf
+    tag = buf[offset]
+    if tag == _STR:
+        (size,) = _u32.unpack_from(buf, offset + 1)
+        return str(buf[offset + 5 : offset + 5 + size], "utf-8", "surrogatepass")
+    elif tag == _INT:
+        return cast(int, _tag_i64.unpack_from(buf, offset)[1])
+    elif tag == _FLOAT:
+        return cast(float, _tag_f64.unpack_from(buf, offset)[1])
+    elif tag == _SEQUENCE:
+        return SharedSequence(block, offset)
+    elif tag == _MAPPING:
+        return cast(_types.Mapping, SharedMapping(block, offset))
+    elif tag == _BIG_INT:
+        (size,) = _u32.unpack_from(buf, offset + 1)
+        return int.from_bytes(
+            buf[offset + 5 : offset + 5 + size], "little", signed=True
+        )
+    return (None, False, True)[tag]
+
+
+def _decode_key(block: _Block, offset: int) -> Value:
+    # mapping keys must be hashable
+    return freeze(_decode(block, offset))
+
+
+def _stored_sort_key(buf: memoryview, offset: int) -> bytes:
+    tag = buf[offset]
+    if tag in (_NULL, _FALSE, _TRUE):
+        size = 1
+    elif tag in (_INT, _FLOAT):
+        size = 9
+    elif tag in (_STR, _BIG_INT):
+        size = 5 + _u32.unpack_from(buf, offset + 1)[0]
+    else:
+        return _CONTAINER_SORT_KEY
+    return bytes(buf[offset : offset + size])
+
+
+class SharedSequence(typing.Sequence[Value]):
+    """Read-only view of a sequence in shared memory, see :func:`from_shared_memory`"""
+
+    __slots__ = ("_block", "_offset", "_len")
+
+    def __init__(self, block: _Block, offset: int) -> None:
+        self._block = block
+        self._offset = offset
+        (self._len,) = _u32.unpack_from(block.buf, offset + 1)
+
+    def __len__(self) -> int:
+        return cast(int, self._len)
+
+    @overload
+    def __getitem__(self, index: int) -> Value:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Tuple[Value, ...]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Value, Tuple[Value, ...]]:
+        if isinstance(index, slice):
+            return tuple(self[i] for i in range(*index.indices(self._len)))
+        i = index + self._len if index < 0 else index
+        if not 0 <= i < self._len:
+            raise IndexError("SharedSequence index out of range")
+        (offset,) = _u32.unpack_from(self._block.buf, self._offset + 5 + 4 * i)
+        return _decode(self._block, offset)
+
+    def __iter__(self) -> Iterator[Value]:
+        offsets = struct.unpack_from(
+            f"<{self._len}I", self._block.buf, self._offset + 5
+        )
+        return (_decode(self._block, offset) for offset in offsets)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, str) or not isinstance(other, _types.Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__qualname__}({list(self)!r})"
+
+
+class SharedMapping(typing.Mapping[Value, Value]):
+    """Read-only view of a mapping in shared memory, see :func:`from_shared_memory`
+
+    Keys are found by binary search, without decoding the other keys.
+    """
+
+    __slots__ = ("_block", "_offset", "_len")
+
+    def __init__(self, block: _Block, offset: int) -> None:
+        self._block = block
+        self._offset = offset
+        (self._len,) = _u32.unpack_from(block.buf, offset + 1)
+
+    def __len__(self) -> int:
+        return cast(int, self._len)
+
+    def __getitem__(self, __key: Value) -> Value:
+        offset = self._find(__key)
+        if offset is None:
+            raise KeyError(__key)
+        return _decode(self._block, offset)
+
+    def __contains__(self, __key: object) -> bool:
+        return self._find(__key) is not None
+
+    def __iter__(self) -> Iterator[Value]:
+        return (_decode_key(self._block, key) for key, _ in self._offsets())
+
+    def values(self) -> ValuesView[Value]:
+        return _SharedValuesView(self)
+
+    def items(self) -> ItemsView[Value, Value]:
+        return _SharedItemsView(self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__qualname__}({dict(self.items())!r})"
+
+    def _offsets(self) -> Iterator[Tuple[int, int]]:
+        """Returns the offsets of the keys and values in insertion order"""
+        offsets = struct.unpack_from(
+            f"<{2 * self._len}I", self._block.buf, self._offset + 5
+        )
+        return zip(offsets[::2], offsets[1::2])
+
+    def _find(self, key: object) -> Optional[int]:
+        """Returns the offset of the value of *key*, or None if it is missing"""
+        encodings = _key_encodings(key)
+        if encodings is None:
+            return self._scan(key)
+        for encoding in encodings:
+            offset = self._search(encoding)
+            if offset is not None:
+                return offset
+        return None
+
+    def _scan(self, key: object) -> Optional[int]:
+        # container keys are rare, they are compared one by one
+        buf = self._block.buf
+        for key_offset, value_offset in self._offsets():
+            if (
+                buf[key_offset] >= _SEQUENCE
+                and _decode_key(self._block, key_offset) == key
+            ):
+                return value_offset
+        return None
+
+    def _search(self, encoding: bytes) -> Optional[int]:
+        buf = self._block.buf
+        items = self._offset + 5
+        index = items + 8 * self._len
+        lo, hi = 0, self._len
+        while lo < hi:
+            mid = (lo + hi) // 2
+            (item,) = _u32.unpack_from(buf, index + 4 * mid)
+            (key_offset,) = _u32.unpack_from(buf, items + 8 * item)
+            if _stored_sort_key(buf, key_offset) < encoding:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self._len:
+            return None
+        (item,) = _u32.unpack_from(buf, index + 4 * lo)
+        key_offset, value_offset = struct.unpack_from("<II", buf, items + 8 * item)
+        if _stored_sort_key(buf, key_offset) != encoding:
+            return None
+        return cast(int, value_offset)
+
+
+class _SharedValuesView(ValuesView[Value]):
+    _mapping: SharedMapping
+
+    def __iter__(self) -> Iterator[Value]:
+        block = self._mapping._block
+        return (_decode(block, value) for _, value in self._mapping._offsets())
+
+
+class _SharedItemsView(ItemsView[Value, Value]):
+    _mapping: SharedMapping
+
+    def __iter__(self) -> Iterator[Tuple[Value, Value]]:
+        block = self._mapping._block
+        return (
+            (_decode_key(block, key), _decode(block, value))
+            for key, value in self._mapping._offsets()
+        )
+
+
+class SharedChannel:
+    """Publishes successive versions of a value to other processes
+
+    One process creates the channel with ``create=True`` and publishes to it, other
+    processes open it by name and :meth:`get` the latest version. Each version is
+    written to its own block with :func:`to_shared_memory` and swapped in atomically,
+    so readers see either the previous version or the new one. The block of the
+    previous version is unlinked, but stays valid for readers that still use it.
+    """
+
+    # seconds a reader waits for a publish to finish before giving up
+    read_timeout = 1.0
+
+    def __init__(self, name: str, create: bool = False) -> None:
+        self.name = name
+        self._created = create
+        if create:
+            self._control = shared_memory.SharedMemory(
+                name, create=True, size=_CONTROL_SIZE
+            )
+            self._control_buf = cast(memoryview, self._control.buf)
+            _control.pack_into(self._control_buf, 0, _CONTROL_MAGIC, 0, 0, 0)
+        else:
+            self._control = _attach(name)
+            self._control_buf = cast(memoryview, self._control.buf)
+            if bytes(self._control_buf[:4]) != _CONTROL_MAGIC:
+                raise ValueError(f"Shared memory block {name!r} is not a channel")
+        self._block: Optional[shared_memory.SharedMemory] = None
+        self._version = 0
+        self._value: Value = None
+
+    @property
+    def version(self) -> int:
+        """The latest published version, 0 if nothing has been published yet"""
+        return self._read()[0]
+
+    def publish(self, value: Value) -> int:
+        """Makes *value* the latest version and returns its version number"""
+        if not self._created:
+            raise ValueError("Only the process that created a channel can publish")
+        version = self._version + 1
+        block = to_shared_memory(value, f"{self.name}_{version}")
+        name = block.name.encode()
+        buf = self._control_buf
+        (seq,) = _sequence.unpack_from(buf, 4)
+        _sequence.pack_into(buf, 4, seq + 1)
+        _control.pack_into(buf, 0, _CONTROL_MAGIC, seq + 1, version, len(name))
+        buf[_control.size : _control.size + len(name)] = name
+        _sequence.pack_into(buf, 4, seq + 2)
+        # the views already returned own the block, which is closed once they are all
+        # gone, so the block is only unlinked
+        if self._block is not None:
+            self._block.unlink()
+        self._block = block
+        self._version = version
+        self._value = from_shared_memory(block)
+        return version
+
+    def get(self) -> Value:
+        """Returns a view of the latest version, see :func:`from_shared_memory`
+
+        Raises LookupError if nothing has been published yet.
+        """
+        while True:
+            version, name = self._read()
+            if version == 0:
+                raise LookupError(f"Nothing has been published to {self.name!r}")
+            if version == self._version:
+                return self._value
+            try:
+                value = from_shared_memory(name)
+            except FileNotFoundError:
+                # a newer version was published in the meantime
+                continue
+            self._version = version
+            self._value = value
+            return value
+
+    def close(self) -> None:
+        """Closes the channel in this process, views already returned stay valid"""
+        self._control.close()
+
+    def unlink(self) -> None:
+        """Removes the channel and its latest version, called by the publisher"""
+        self._control.unlink()
+        if self._block is not None:
+            self._block.unlink()
+
+    def _read(self) -> Tuple[int, str]:
+        buf = self._control_buf
+        deadline: Optional[float] = None
+        delay = 0.0
+        while True:
+            _, seq, version, size = _control.unpack_from(buf)
+            if seq % 2 == 0:
+                name = bytes(buf[_control.size : _control.size + size])
+                if _sequence.unpack_from(buf, 4)[0] == seq:
+                    return version, name.decode()
+            # a publish is in progress, or a publisher died in the middle of one
+            if deadline is None:
+                deadline = time.monotonic() + self.read_timeout
+            elif time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"The publisher of {self.name!r} did not finish publishing"
+                )
+            time.sleep(delay)
+            delay = min(max(delay * 2, 1e-5), 1e-3)
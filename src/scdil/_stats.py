@@ -0,0 +1,192 @@
+import io
+import sys
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Set, TextIO, Tuple, TypeVar, Union
+
+import scdil._ast as ast
+from scdil._frozendict import FrozenDict
+from scdil._types import Mapping, Sequence, Value
+
+T = TypeVar("T")
+
+
+@dataclass
+class LoadStats:
+    """Counters and per-phase wall times collected by :func:`scdil.load`
+
+    Passing the same object to several loads accumulates the counters.
+    ``parse_time`` excludes ``lex_time``. Documents decoded by the JSON fast path
+    are counted in ``json_loads`` and have no token counts. With ``dedupe=True``,
+    ``dedupe_hits`` counts the values replaced by an equal, already loaded instance,
+    and ``dedupe_bytes_saved`` the memory those duplicates would have used.
+    """
+
+    bytes_read: int = 0
+    token_counts: Dict[str, int] = field(default_factory=dict)
+    node_count: int = 0
+    max_depth: int = 0
+    read_time: float = 0.0
+    lex_time: float = 0.0
+    parse_time: float = 0.0
+    eval_time: float = 0.0
+    json_time: float = 0.0
+    json_loads: int = 0
+    dedupe_hits: int = 0
+    dedupe_bytes_saved: int = 0
+    total_time: float = 0.0
+
+
+@dataclass
+class DumpStats:
+    """Counters and wall times collected by :func:`scdil.dump`
+
+    Passing the same object to several dumps accumulates the counters.
+    ``dump_time`` excludes ``write_time``.
+    """
+
+    bytes_written: int = 0
+    write_calls: int = 0
+    node_count: int = 0
+    max_depth: int = 0
+    write_time: float = 0.0
+    dump_time: float = 0.0
+    total_time: float = 0.0
+
+
+class StatsReader(io.TextIOBase):
+    """Wraps a text stream, counting the bytes and time spent reading it"""
+
+    def __init__(self, stream: TextIO) -> None:
+        self._stream = stream
+        self.bytes_read = 0
+        self.elapsed = 0.0
+
+    def read(self, size: Optional[int] = -1) -> str:
+        start = perf_counter()
+        s = self._stream.read(-1 if size is None else size)
+        self.elapsed += perf_counter() - start
+        self.bytes_read += len(s.encode("utf-8", "surrogatepass"))
+        return s
+
+
+class StatsWriter(io.TextIOBase):
+    """Wraps a text stream, counting the bytes, calls, and time spent writing to it"""
+
+    def __init__(self, stream: TextIO) -> None:
+        self._stream = stream
+        self.bytes_written = 0
+        self.write_calls = 0
+        self.elapsed = 0.0
+
+    def write(self, s: str) -> int:
+        start = perf_counter()
+        n = self._stream.write(s)
+        self.elapsed += perf_counter() - start
+        self.bytes_written += len(s.encode("utf-8", "surrogatepass"))
+        self.write_calls += 1
+        return n
+
+
+class StatsLexer(Iterator[ast.Token]):
+    """Wraps a token stream, counting tokens by kind and the time spent producing them"""
+
+    def __init__(self, lexer: Iterator[ast.Token]) -> None:
+        self._lexer = lexer
+        self.token_counts: Dict[str, int] = {}
+        self.elapsed = 0.0
+
+    def __next__(self) -> ast.Token:
+        start = perf_counter()
+        try:
+            tok = next(self._lexer)
+        finally:
+            self.elapsed += perf_counter() - start
+        kind = type(tok).__name__
+        self.token_counts[kind] = self.token_counts.get(kind, 0) + 1
+        return tok
+
+
+class NodeCounter:
+    """Counts the values in a tree and the nesting depth of its containers
+
+    Iterators are counted as a single value by :meth:`add`, their elements are
+    counted by :meth:`elements` as they are consumed.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.max_depth = 0
+        # the depth of the elements of the iterators not consumed yet, by id
+        self._iterators: Dict[int, int] = {}
+
+    def add(self, value: object, depth: int = 0) -> None:
+        """Counts a value at *depth*, and everything in it but the iterators"""
+        stack: List[Tuple[object, int]] = [(value, depth)]
+        while stack:
+            value, depth = stack.pop()
+            self.count += 1
+            if value is None or isinstance(value, (bool, int, float, str)):
+                continue
+            depth += 1
+            self.max_depth = max(self.max_depth, depth)
+            if isinstance(value, Sequence):
+                stack.extend((elem, depth) for elem in value)
+            elif isinstance(value, Mapping):
+                for key, val in value.items():
+                    stack.append((key, depth))
+                    stack.append((val, depth))
+            else:
+                self._iterators[id(value)] = depth
+
+    def elements(self, iterator: Iterator[T]) -> Iterator[T]:
+        """Yields the elements of an iterator met by :meth:`add`, counting them"""
+        depth = self._iterators.pop(id(iterator), 1)
+        for elem in iterator:
+            self.add(elem, depth)
+            yield elem
+
+
+def measure(value: Value) -> Tuple[int, int]:
+    """Returns the number of values in the tree and the nesting depth of containers"""
+    counter = NodeCounter()
+    counter.add(value)
+    return counter.count, counter.max_depth
+
+
+def record_nodes(stats: Union[LoadStats, DumpStats], value: Value) -> None:
+    count, depth = measure(value)
+    stats.node_count += count
+    stats.max_depth = max(stats.max_depth, depth)
+
+
+def deep_sizeof(value: Value) -> int:
+    """Returns the bytes used by a value and all values it contains
+
+    Objects reachable more than once are only counted once.
+    """
+    seen: Set[int] = set()
+    total = 0
+    stack: List[object] = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sizeof(obj)
+        if obj is None or isinstance(obj, (bool, int, float, str)):
+            continue
+        if isinstance(obj, Sequence):
+            stack.extend(obj)
+        elif isinstance(obj, Mapping):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+    return total
+
+
+def sizeof(obj: object) -> int:
+    """Returns the bytes used by a value, not including the values it contains"""
+    if isinstance(obj, FrozenDict):
+        # the backing dict is not a value itself, but it is most of the cost
+        return sys.getsizeof(obj) + sys.getsizeof(obj._dict)
+    return sys.getsizeof(obj)
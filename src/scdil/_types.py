@@ -1,5 +1,7 @@
+import collections.abc
 from abc import abstractmethod
 from typing import (
+    Dict,
     ItemsView,
     Iterator,
     KeysView,
@@ -100,3 +102,53 @@ class Mapping(Protocol):
     @abstractmethod
     def items(self) -> ItemsView[Value, Value]:
         ...
+
+
+# Kinds of values, as returned by kind_of. Iterators are not values, but can be dumped
+# as sequences.
+NULL, BOOL, INT, FLOAT, STR, SEQUENCE, MAPPING, ITERATOR = range(8)
+
+_kinds: Dict[type, int] = {
+    type(None): NULL,
+    bool: BOOL,
+    int: INT,
+    float: FLOAT,
+    str: STR,
+    list: SEQUENCE,
+    tuple: SEQUENCE,
+    dict: MAPPING,
+}
+
+
+def kind_of(value: object) -> int:
+    """Returns the kind of a value, raising TypeError if it is not a value
+
+    The isinstance checks against the Protocols above are slow, so they are done
+    once per type, and the result is cached by exact type.
+    """
+    try:
+        return _kinds[type(value)]
+    except KeyError:
+        pass
+    kind = _classify(value)
+    _kinds[type(value)] = kind
+    return kind
+
+
+def _classify(value: object) -> int:
+    # the order matters, bool is a subclass of int and str is a Sequence
+    if isinstance(value, bool):
+        return BOOL
+    elif isinstance(value, int):
+        return INT
+    elif isinstance(value, float):
+        return FLOAT
+    elif isinstance(value, str):
+        return STR
+    elif isinstance(value, Sequence):
+        return SEQUENCE
+    elif isinstance(value, Mapping):
+        return MAPPING
+    elif isinstance(value, collections.abc.Iterator):
+        return ITERATOR
+    raise TypeError(f"Got unsupported type {type(value).__qualname__}")
@@ -0,0 +1,124 @@
+import hashlib
+import io
+import os
+from typing import BinaryIO, Iterator, List, Optional, TextIO, Union, cast
+
+# Where a dump can be written: a text or binary stream, a bytearray, or a file
+# descriptor
+Output = Union[TextIO, BinaryIO, bytearray, int]
+
+# the most buffers a single writev call is guaranteed to accept
+_IOV_MAX = 1024
+
+
+def text_writer(stream: Output) -> TextIO:
+    """Returns a text stream writing to *stream*, encoding the text as UTF-8 if needed
+
+    Text streams are returned as they are. The others must be flushed when done.
+    """
+    if isinstance(stream, bytearray):
+        return cast(TextIO, BufferWriter(stream))
+    elif isinstance(stream, int):
+        return cast(TextIO, FdWriter(stream))
+    elif isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        return cast(TextIO, BinaryWriter(cast(BinaryIO, stream)))
+    return cast(TextIO, stream)
+
+
+def encode(text: str) -> bytes:
+    # strings may hold lone surrogates, which are kept rather than rejected
+    return text.encode("utf-8", "surrogatepass")
+
+
+class BufferWriter(io.TextIOBase):
+    """Text stream encoding the text written to it into a bytearray"""
+
+    def __init__(self, buffer: Optional[bytearray] = None) -> None:
+        self.buffer = bytearray() if buffer is None else buffer
+
+    def write(self, s: str) -> int:
+        self.buffer += encode(s)
+        return len(s)
+
+    def take(self, chunk_size: int) -> Iterator[bytes]:
+        """Removes and yields chunks of the buffer, while it has a full one"""
+        start = 0
+        while len(self.buffer) - start >= chunk_size:
+            yield bytes(self.buffer[start : start + chunk_size])
+            start += chunk_size
+        del self.buffer[:start]
+
+
+class BinaryWriter(io.TextIOBase):
+    """Text stream encoding the text written to it to a binary stream"""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self._stream = stream
+
+    def write(self, s: str) -> int:
+        data = memoryview(encode(s))
+        while data:
+            # raw streams may write only part of the data
+            written = self._stream.write(data)
+            if written is None:
+                raise BlockingIOError("The stream is not ready for writing")
+            data = data[written:]
+        return len(s)
+
+
+class FdWriter(io.TextIOBase):
+    """Text stream encoding the text written to it to a file descriptor
+
+    The encoded text is collected and written with as few system calls as possible,
+    when there is at least *buffer_size* bytes of it and on flush().
+    """
+
+    def __init__(self, fd: int, buffer_size: int = 1 << 20) -> None:
+        self._fd = fd
+        self.buffer_size = buffer_size
+        self._chunks: List[bytes] = []
+        self._size = 0
+
+    def write(self, s: str) -> int:
+        data = encode(s)
+        self._chunks.append(data)
+        self._size += len(data)
+        if self._size >= self.buffer_size:
+            self.flush()
+        return len(s)
+
+    def flush(self) -> None:
+        chunks = self._chunks
+        self._chunks = []
+        self._size = 0
+        write_all(self._fd, chunks)
+
+
+def write_all(fd: int, chunks: List[bytes]) -> None:
+    """Writes all the chunks to a file descriptor, in one system call if possible"""
+    if not hasattr(os, "writev"):
+        chunks = [b"".join(chunks)]
+    views = [memoryview(chunk) for chunk in chunks if chunk]
+    first = 0
+    while first < len(views):
+        if hasattr(os, "writev"):
+            written = os.writev(fd, views[first : first + _IOV_MAX])
+        else:
+            written = os.write(fd, views[first])
+        # skip what was written, which may end in the middle of a chunk
+        while first < len(views) and written >= len(views[first]):
+            written -= len(views[first])
+            first += 1
+        if written:
+            views[first] = views[first][written:]
+
+
+class HashWriter(io.TextIOBase):
+    """Text stream feeding the UTF-8 encoding of the text written to it to a hash"""
+
+    def __init__(self, hash: "hashlib._Hash") -> None:
+        self.hash = hash
+
+    def write(self, s: str) -> int:
+        self.hash.update(encode(s))
+        return len(s)
@@ -0,0 +1,59 @@
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+import scdil
+
+
+def test_append(tmp_path: Path) -> None:
+    path = tmp_path / "log.scdil"
+    records = [{"id": 1, "text": "a\nb"}, [1, [2]], "x", {}]
+    with scdil.Appender(path) as appender:
+        appender.append(records[0])
+        appender.extend(records[1:])
+        appender.extend([])
+    assert path.read_text() == scdil.dumps(records)
+    # a file not ending in a newline
+    path.write_text("- 1")
+    with scdil.Appender(path) as appender:
+        appender.append(2)
+    assert scdil.load(path.read_text()) == [1, 2]
+
+
+def test_append_to_dumped(tmp_path: Path) -> None:
+    path = tmp_path / "log.scdil"
+    # an empty sequence is dumped as a literal, which is replaced
+    scdil.dump_file(path, [])
+    with scdil.Appender(path) as appender:
+        appender.append(1)
+    assert path.read_text() == "- 1\n"
+    path.write_text("# the log\n\n[]\n# end\n")
+    with scdil.Appender(path) as appender:
+        appender.append(1)
+    assert path.read_text() == "# the log\n\n- 1\n"
+    for text in ("[1]\n", "a: 1\n", "-1\n", "# no dash\n[]\n# []\n[]\n"):
+        path.write_text(text)
+        with scdil.Appender(path) as appender:
+            with pytest.raises(ValueError):
+                appender.append(2)
+        assert path.read_text() == text
+
+
+def _append_records(path: str, worker: int) -> None:
+    with scdil.Appender(path) as appender:
+        for i in range(50):
+            appender.append({"worker": worker, "i": i, "text": "x\n" * i})
+
+
+def test_append_processes(tmp_path: Path) -> None:
+    path = str(tmp_path / "log.scdil")
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(4) as pool:
+        pool.starmap(_append_records, [(path, worker) for worker in range(4)])
+    records = scdil.load(Path(path).read_text())
+    assert sorted(records, key=lambda r: (r["worker"], r["i"])) == [
+        {"worker": worker, "i": i, "text": "x\n" * i}
+        for worker in range(4)
+        for i in range(50)
+    ]
@@ -0,0 +1,75 @@
+import sys
+
+import pytest
+
+import scdil
+from scdil import FrozenDict, freeze, thaw
+
+
+def test_freeze() -> None:
+    value = {"a": [1, {"b": [None, True]}], "c": "d", (1, 2): 1.5}
+    frozen = freeze(value)
+    assert type(frozen) is FrozenDict
+    assert frozen == FrozenDict(
+        {"a": (1, FrozenDict(b=(None, True))), "c": "d", (1, 2): 1.5}
+    )
+    assert type(frozen["a"]) is tuple
+    assert hash(frozen) == hash(scdil.load(scdil.dumps(value), immutable=True))
+    assert freeze(1) == 1 and freeze("a") == "a" and freeze(None) is None
+
+
+def test_freeze_keeps_frozen_subtrees() -> None:
+    frozen = FrozenDict(a=(1, FrozenDict(b=())))
+    assert freeze(frozen) is frozen
+    inner = (1, 2)
+    value = [inner, FrozenDict(x=inner)]
+    result = freeze(value)
+    assert result[0] is inner
+    assert result[1] is value[1]
+    # a tuple holding a mutable value must itself be replaced
+    mixed = (1, [2])
+    assert freeze(mixed) == (1, (2,)) and freeze(mixed) is not mixed
+
+
+def test_thaw() -> None:
+    frozen = FrozenDict({"a": (1, FrozenDict(b=())), (1, 2): "c"})
+    thawed = thaw(frozen)
+    assert thawed == {"a": [1, {"b": []}], (1, 2): "c"}
+    assert type(thawed) is dict and type(thawed["a"]) is list
+    # keys stay hashable
+    assert (1, 2) in thawed
+    value = [1, {"a": [2]}]
+    copy = thaw(value)
+    assert copy == value and copy is not value and copy[1] is not value[1]
+
+
+def test_shared_subtrees() -> None:
+    shared = [1, 2]
+    frozen = freeze({"a": shared, "b": [shared, shared]})
+    assert frozen["a"] is frozen["b"][0] is frozen["b"][1]
+    thawed = thaw(frozen)
+    assert thawed["a"] is thawed["b"][0] is thawed["b"][1]
+
+
+def test_deep() -> None:
+    depth = sys.getrecursionlimit() * 2
+    value: scdil.Value = []
+    for _ in range(depth):
+        value = [value]
+    result = thaw(freeze(value))
+    for _ in range(depth):
+        assert type(result) is list and len(result) == 1
+        result = result[0]
+    assert result == []
+
+
+def test_errors() -> None:
+    recursive: list = [1]
+    recursive.append(recursive)
+    with pytest.raises(ValueError):
+        freeze(recursive)
+    # like deepcopy, thaw copies the cycle
+    copy = thaw({"a": recursive})
+    assert copy["a"] is not recursive and copy["a"][1] is copy["a"]
+    with pytest.raises(TypeError):
+        freeze([object()])
@@ -0,0 +1,172 @@
+from io import StringIO
+from textwrap import dedent
+from typing import Any
+
+import pytest
+
+import scdil
+from scdil import Document
+
+text = dedent(
+    """\
+    # deployment settings
+    name: "svc"  # the service
+    replicas:
+      # bumped by the deploy tool
+      count: 1   # keep low
+      zones:
+        - "a"
+        - "b"  # second
+    limits: {"cpu": 2, "mem": [1, 2]}
+    env: {
+      "A": 1,
+      "B": 2,
+    }
+    motd:
+      |hello
+      |world
+    """
+)
+
+
+def test_unchanged() -> None:
+    doc = Document(StringIO(text))
+    assert str(doc) == text
+    assert doc.edits() == []
+    assert doc.value == scdil.load(text)
+    assert doc["replicas"]["count"] == 1
+    assert list(doc["replicas"]["zones"]) == ["a", "b"]
+    assert dict(doc["limits"])["cpu"] == 2
+    assert doc["motd"] == "hello\nworld"
+    assert scdil.load(scdil.dumps(doc.root)) == scdil.load(text)
+
+
+def test_edit_scalar() -> None:
+    doc = Document(text)
+    doc["replicas"]["count"] = 3
+    offset = text.index("1   # keep low")
+    assert doc.edits() == [(offset, offset + 1, "3")]
+    assert str(doc) == text.replace("count: 1", "count: 3")
+
+
+def test_change_shape() -> None:
+    doc = Document(text)
+    doc["name"] = {"first": "svc"}
+    doc["replicas"]["zones"] = "c"
+    doc["replicas"]["zones"] = ["c", "d"]
+    doc["replicas"]["zones"][1] = {"id": "d"}
+    doc["motd"] = "hi"
+    expected = scdil.load(text)
+    expected["name"] = {"first": "svc"}
+    expected["replicas"]["zones"] = ["c", {"id": "d"}]
+    expected["motd"] = "hi"
+    assert doc.value == expected
+    # the comment after the old value moves before the block
+    assert '\nname:  # the service\n  first: "svc"\n' in str(doc)
+    assert "# bumped by the deploy tool\n  count: 1   # keep low\n" in str(doc)
+
+
+def test_literal() -> None:
+    doc = Document(text)
+    doc["limits"]["mem"] = {"min": 1}
+    doc["limits"]["gpu"] = 0
+    doc["env"]["C"] = 3
+    doc["env"]["B"] = [4]
+    assert 'limits: {"cpu": 2, "mem": {\n  "min": 1\n}, "gpu": 0}\n' in str(doc)
+    assert 'env: {\n  "A": 1,\n  "B": [\n    4\n  ],\n  "C": 3,\n}\n' in str(doc)
+    doc = Document("{}  # empty")
+    doc["a"] = 1
+    doc["b"] = 2
+    assert str(doc) == '{"a": 1, "b": 2}  # empty'
+
+
+def test_insert() -> None:
+    doc = Document(text)
+    doc["replicas"]["max"] = 5
+    doc["replicas"]["labels"] = {"tier": "web"}
+    doc["replicas"]["labels"]["tier"] = "api"
+    doc["version"] = 2
+    lines = str(doc).splitlines()
+    assert lines[7:11] == [
+        '    - "b"  # second',
+        "  max: 5",
+        "  labels:",
+        '    tier: "api"',
+    ]
+    assert lines[-1] == "version: 2"
+    with pytest.raises(TypeError):
+        doc["replicas"][1] = 2
+
+
+def test_root() -> None:
+    doc = Document("  1  # one\n")
+    assert doc.root == 1
+    doc.root = [1, 2]
+    assert str(doc) == "  # one\n  - 1\n  - 2\n"
+    doc = Document("- a: 1\n  b: 2\n- 3\n")
+    doc[0]["c"] = 3
+    assert str(doc) == "- a: 1\n  b: 2\n  c: 3\n- 3\n"
+    doc[-1] = [4]
+    assert doc.value == [{"a": 1, "b": 2, "c": 3}, [4]]
+
+
+def test_replaced_view() -> None:
+    doc = Document(text)
+    replicas = doc["replicas"]
+    doc["replicas"] = 2
+    with pytest.raises(RuntimeError):
+        replicas["count"]
+    with pytest.raises(TypeError):
+        doc["limits"]["mem"][0:1]
+
+
+def test_replace_edited() -> None:
+    # the edits inside a replaced value are dropped with it
+    doc = Document("a:\n  b: 1\n")
+    doc["a"]["b"] = 5
+    doc["a"] = 7
+    assert str(doc) == "a: 7\n"
+    doc = Document("a: 1\nb: 2\n")
+    doc["a"] = 5
+    doc.root = {"x": 1}
+    assert str(doc) == "x: 1\n"
+    doc = Document("- []\n")
+    doc[0] = []
+    doc.root = []
+    assert str(doc) == "[]\n"
+    # but not the keys added next to it
+    doc = Document("a: 1\n")
+    doc["b"] = 2
+    doc["a"] = {"c": 3}
+    doc["a"]["c"] = 4
+    doc["a"] = 5
+    assert str(doc) == "a: 5\nb: 2\n"
+
+
+def test_comment_before_block() -> None:
+    doc = Document("a: 1  # c\n")
+    doc["a"] = "x\ny"
+    assert str(doc) == "a:  # c\n  |x\n  |y\n"
+    assert doc.value == {"a": "x\ny"}
+    doc["a"] = 3
+    assert str(doc) == "a: 3  # c\n"
+
+
+@pytest.mark.parametrize(
+    "source, key, expected",
+    [
+        ("a:\n  - 1  # c\nb: 2\n", "a", "a:\n  # c\n  |x\n  |y\nb: 2\n"),
+        ("a:\n  k: 1  # c\nb: 2\n", "a", "a:\n  # c\n  |x\n  |y\nb: 2\n"),
+        ("- - 1  # c\n- 2\n", 0, "- # c\n  |x\n  |y\n- 2\n"),
+        ('""  # c\n', None, "# c\n|x\n|y\n"),
+    ],
+)
+def test_comment_before_replaced_block(source: str, key: Any, expected: str) -> None:
+    # a comment on the last line of a block string would be part of the string
+    doc = Document(source)
+    if key is None:
+        doc.root = "x\ny"
+    else:
+        doc[key] = "x\ny"
+    assert str(doc) == expected
+    assert (doc.value if key is None else doc.value[key]) == "x\ny"
@@ -1,3 +1,4 @@
+import pickle
 import sys
 
 import pytest
@@ -91,3 +92,68 @@ def test_union() -> None:
         a | {1, 2, 3}  # type: ignore
     with pytest.raises(TypeError):
         123 | a  # type: ignore
+
+
+def test_slots() -> None:
+    a = FrozenDict(a=1)
+    with pytest.raises(AttributeError):
+        a.b = 2  # type: ignore
+
+
+def test_hash_cached() -> None:
+    a = FrozenDict({"a": 1, "b": (1, 2)})
+    assert hash(a) == hash(a) == hash(FrozenDict(b=(1, 2), a=1))
+    assert a._hash is not None
+    with pytest.raises(TypeError):
+        hash(FrozenDict(a=[]))
+
+
+def test_from_dict() -> None:
+    d = {"a": 1}
+    a = FrozenDict._from_dict(d)
+    assert a == FrozenDict(a=1)
+    assert a._dict is d
+
+
+def test_pickle() -> None:
+    a = FrozenDict({"a": 1, None: FrozenDict(b=(1, 2))})
+    hash(a)
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        b = pickle.loads(pickle.dumps(a, protocol=protocol))
+        assert type(b) is FrozenDict
+        assert b == a
+        assert hash(b) == hash(a)
+
+
+# FrozenDict({"a": 1, "b": FrozenDict(c=(1, 2))}) pickled before __slots__ was added
+legacy_pickles = [
+    b"ccopy_reg\n_reconstructor\np0\n(cscdil._frozendict\nFrozenDict\np1\nc__builtin__"
+    b"\nobject\np2\nNtp3\nRp4\n(dp5\nV_dict\np6\n(dp7\nVa\np8\nI1\nsVb\np9\ng0\n("
+    b"g1\ng2\nNtp10\nRp11\n(dp12\ng6\n(dp13\nVc\np14\n(I1\nI2\ntp15\nssbssb.",
+    b"\x80\x02cscdil._frozendict\nFrozenDict\nq\x00)\x81q\x01}q\x02X\x05\x00\x00\x00"
+    b"_dictq\x03}q\x04(X\x01\x00\x00\x00aq\x05K\x01X\x01\x00\x00\x00bq\x06h\x00)"
+    b"\x81q\x07}q\x08h\x03}q\tX\x01\x00\x00\x00cq\nK\x01K\x02\x86q\x0bssbusb.",
+]
+
+
+@pytest.mark.parametrize("data", legacy_pickles, ids=["protocol 0", "protocol 2"])
+def test_legacy_pickle(data: bytes) -> None:
+    a = pickle.loads(data)
+    assert type(a) is FrozenDict and type(a["b"]) is FrozenDict
+    assert a == FrozenDict({"a": 1, "b": FrozenDict(c=(1, 2))})
+    assert hash(a) == hash(FrozenDict({"a": 1, "b": FrozenDict(c=(1, 2))}))
+    # a hash in the state is not carried over
+    b = FrozenDict.__new__(FrozenDict)
+    b.__setstate__({"_dict": {"a": 1}, "_hash": 42})
+    assert b == FrozenDict(a=1) and hash(b) == hash(FrozenDict(a=1))
+
+
+@pytest.mark.skipif(sys.version_info < (3, 9), reason="requires python3.9 or higher")
+def test_inplace_union_does_not_mutate() -> None:
+    a = FrozenDict(a=1)
+    b = a
+    h = hash(a)
+    b |= {"b": 2}
+    assert a == FrozenDict(a=1)
+    assert hash(a) == h
+    assert b == FrozenDict(a=1, b=2)
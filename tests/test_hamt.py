@@ -0,0 +1,151 @@
+import pickle
+import random
+from typing import Dict
+
+import pytest
+
+import scdil
+from scdil import FrozenDict, PersistentMap
+
+
+class Colliding:
+    """Key whose hash only depends on a small bucket number"""
+
+    def __init__(self, value: int, bucket: int) -> None:
+        self.value = value
+        self.bucket = bucket
+
+    def __hash__(self) -> int:
+        return self.bucket
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Colliding) and self.value == other.value
+
+    def __repr__(self) -> str:
+        return f"Colliding({self.value}, {self.bucket})"
+
+
+def test_construct() -> None:
+    assert len(PersistentMap()) == 0
+    a = PersistentMap({"a": 1}, b=2)
+    assert a["a"] == 1
+    assert a["b"] == 2
+    assert PersistentMap([(None, 1), (1.5, "x")])[None] == 1
+    with pytest.raises(KeyError):
+        a["c"]
+    assert a.get("c") is None
+    assert a.get("c", 7) == 7
+    assert "a" in a and "c" not in a
+
+
+def test_persistence() -> None:
+    a = PersistentMap(a=1, b=2)
+    b = a.set("c", 3)
+    c = b.delete("a")
+    d = c.update({"b": 20}, e=5)
+    assert dict(a) == {"a": 1, "b": 2}
+    assert dict(b) == {"a": 1, "b": 2, "c": 3}
+    assert dict(c) == {"b": 2, "c": 3}
+    assert dict(d) == {"b": 20, "c": 3, "e": 5}
+    assert a.set("a", 1) is a
+    with pytest.raises(KeyError):
+        a.delete("z")
+
+
+def test_evolver() -> None:
+    a = PersistentMap({i: i for i in range(100)})
+    e = a.evolver()
+    for i in range(0, 100, 2):
+        del e[i]
+    e[1000] = "x"
+    e.set(1001, "y").delete(1)
+    b = e.persistent()
+    e[5] = "changed after persistent()"
+    assert dict(a) == {i: i for i in range(100)}
+    expected = {i: i for i in range(3, 100, 2)}
+    expected.update({1000: "x", 1001: "y"})
+    assert dict(b) == expected
+    assert e.persistent()[5] == "changed after persistent()"
+    assert b[5] == 5
+
+
+def test_random_ops() -> None:
+    rng = random.Random(0)
+    model: Dict[object, int] = {}
+    m: PersistentMap[object, int] = PersistentMap()
+    history = []
+    for step in range(3000):
+        key: object = rng.randint(0, 300)
+        if rng.random() < 0.2:
+            key = Colliding(rng.randint(0, 30), rng.randint(0, 3))
+        if rng.random() < 0.3 and key in model:
+            del model[key]
+            m = m.delete(key)
+        else:
+            model[key] = step
+            m = m.set(key, step)
+        history.append((m, dict(model)))
+        assert len(m) == len(model)
+    for old, old_model in history[::100]:
+        assert dict(old.items()) == old_model
+        assert all(old[k] == v for k, v in old_model.items())
+
+
+def test_collisions() -> None:
+    keys = [Colliding(i, 7) for i in range(10)]
+    m = PersistentMap((k, i) for i, k in enumerate(keys))
+    m = m.set(7, "int with the same hash")
+    assert [m[k] for k in keys] == list(range(10))
+    assert m[7] == "int with the same hash"
+    for k in keys:
+        m = m.delete(k)
+    assert dict(m) == {7: "int with the same hash"}
+
+
+def test_equality_and_hash() -> None:
+    a = PersistentMap({"a": 1, "b": (1, 2)})
+    f = FrozenDict(b=(1, 2), a=1)
+    assert a == f and f == a
+    assert a == {"a": 1, "b": (1, 2)}
+    assert a != {"a": 1}
+    assert a != PersistentMap(a=1, b=(1, 3))
+    assert a != 7
+    assert hash(a) == hash(f)
+    assert len({a, f}) == 1
+
+
+def test_repr_and_pickle() -> None:
+    a = PersistentMap({"a": 1, None: [1, 2]})
+    assert eval(repr(a)) == a
+    b = pickle.loads(pickle.dumps(a))
+    assert type(b) is PersistentMap
+    assert b == a
+
+
+def test_dump() -> None:
+    a = PersistentMap(x=PersistentMap(y=1))
+    assert scdil.load(scdil.dumps(a)) == {"x": {"y": 1}}
+    assert scdil.load(scdil.dumps(a, for_humans=False)) == {"x": {"y": 1}}
+
+
+def test_random_evolver_ops() -> None:
+    rng = random.Random(1)
+    base = PersistentMap({i: -i for i in range(200)})
+    model = dict(base)
+    e = base.evolver()
+    for step in range(3000):
+        key: object = rng.randint(0, 400)
+        if rng.random() < 0.2:
+            key = Colliding(rng.randint(0, 30), rng.randint(0, 3))
+        if rng.random() < 0.4 and key in model:
+            del model[key]
+            del e[key]
+        else:
+            model[key] = step
+            e[key] = step
+        if step % 500 == 0:
+            snapshot, snapshot_model = e.persistent(), dict(model)
+        assert len(e) == len(model)
+    assert dict(e.persistent()) == model
+    assert dict(snapshot) == snapshot_model
+    assert dict(base) == {i: -i for i in range(200)}
@@ -1,9 +1,14 @@
 import math
+import sys
+from io import StringIO
 from textwrap import dedent
+from typing import Iterator, List
 
 import pytest
 
+import scdil
 from scdil import dumps
+from scdil._writers import BufferWriter
 
 
 def test_human_dump() -> None:
@@ -259,3 +264,150 @@ def test_sequence_element_is_literal_mapping() -> None:
 def test_unsuported_type_in_literal() -> None:
     with pytest.raises(TypeError):
         dumps({None: object()})
+
+
+def test_deep_nesting() -> None:
+    depth = sys.getrecursionlimit() * 2
+    sequence: scdil.Value = 1
+    block_mapping: scdil.Value = 1
+    literal_mapping: scdil.Value = 1
+    for _ in range(depth):
+        sequence = [sequence]
+        block_mapping = {"a": block_mapping}
+        literal_mapping = {0: literal_mapping}
+    lines = dumps(sequence).splitlines()
+    assert len(lines) == depth
+    assert lines[-1] == "  " * (depth - 1) + "- 1"
+    lines = dumps(block_mapping).splitlines()
+    assert len(lines) == depth
+    assert lines[-1] == "  " * (depth - 1) + "a: 1"
+    lines = dumps(literal_mapping).splitlines()
+    assert len(lines) == 2 * depth + 1
+    assert lines[depth] == "  " * depth + "0: 1"
+    assert lines[-1] == "}"
+
+
+def test_iterators() -> None:
+    def records() -> Iterator[scdil.Value]:
+        for i in range(1000):
+            yield {"id": i, "tags": (tag for tag in "ab"), "x": iter({1: i}.items())}
+
+    expected = [{"id": i, "tags": ["a", "b"], "x": [(1, i)]} for i in range(1000)]
+    assert dumps(records()) == dumps(expected)
+    assert dumps(iter([])) == "[]\n"
+    value = {"a": iter([]), "b": iter([1, "a\nb"]), "c": {0: iter([[]])}}
+    assert dumps(value) == dumps({"a": [], "b": [1, "a\nb"], "c": {0: [[]]}})
+
+
+def test_iterator_is_streamed() -> None:
+    stream = StringIO()
+
+    def elements() -> Iterator[scdil.Value]:
+        for i in range(10000):
+            yield i
+        # the output of the first elements has been written already
+        assert stream.getvalue().startswith("- 0\n- 1\n")
+
+    scdil.dump(elements(), stream=stream)
+    assert stream.getvalue().endswith("- 9999\n")
+
+
+def test_iterdumps() -> None:
+    value = {"a": [{"b": "℞ é", "c": list(range(i))} for i in range(100)], 1: 2}
+    for for_humans in (True, False):
+        expected = scdil.dumps(value, for_humans=for_humans).encode()
+        chunks = list(scdil.iterdumps(value, for_humans=for_humans, chunk_size=100))
+        assert b"".join(chunks) == expected
+        assert all(len(chunk) == 100 for chunk in chunks[:-1])
+        assert 0 < len(chunks[-1]) <= 100
+    assert list(scdil.iterdumps(1)) == [b"1\n"]
+    with pytest.raises(ValueError):
+        next(scdil.iterdumps(1, chunk_size=0))
+
+
+def test_iterdumps_is_incremental() -> None:
+    produced = []
+
+    def elements() -> Iterator[scdil.Value]:
+        for i in range(10000):
+            produced.append(i)
+            yield [i]
+
+    chunks = scdil.iterdumps(elements(), chunk_size=1000)
+    expected = scdil.dumps([[i] for i in range(10000)]).encode()
+    assert next(chunks) == expected[:1000]
+    assert len(produced) < 10000
+
+
+def test_iterdumps_flat(monkeypatch: pytest.MonkeyPatch) -> None:
+    value = list(range(200000))
+    for for_humans in (True, False):
+        expected = scdil.dumps(value, for_humans=for_humans).encode()
+        written = 0
+        write = BufferWriter.write
+
+        def counting_write(self: BufferWriter, s: str) -> int:
+            nonlocal written
+            written += len(s)
+            return write(self, s)
+
+        monkeypatch.setattr(BufferWriter, "write", counting_write)
+        chunks = scdil.iterdumps(value, for_humans=for_humans, chunk_size=1000)
+        # the first chunk comes before the whole list is formatted
+        assert next(chunks) == expected[:1000]
+        assert written < len(expected) // 10
+        assert b"".join(chunks) == expected[1000:]
+        monkeypatch.undo()
+
+
+def test_iterdumps_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    sizes: List[int] = []
+    write = BufferWriter.write
+
+    def recording_write(self: BufferWriter, s: str) -> int:
+        sizes.append(len(s))
+        return write(self, s)
+
+    monkeypatch.setattr(BufferWriter, "write", recording_write)
+    records = [
+        {"id": i, "name": f"record {i}", "tags": ["a", "b"]} for i in range(10000)
+    ]
+    for canonical in (False, True):
+        sizes.clear()
+        chunks = list(scdil.iterdumps(records, for_humans=False, canonical=canonical))
+        total = len(scdil.dumps(records, for_humans=False, canonical=canonical))
+        assert sum(len(chunk) for chunk in chunks) == total
+        assert max(sizes) < total // 10
+
+
+def test_shared_and_recursive() -> None:
+    shared = {"a": [1]}
+    value = [shared, {"b": shared}]
+    expected = dumps([{"a": [1]}, {"b": {"a": [1]}}])
+    assert dumps(value) == expected
+    assert scdil.dumps(value, check_circular=False) == expected
+    shared["c"] = value
+    with pytest.raises(ValueError):
+        dumps(value)
+
+
+def test_parallel(monkeypatch: pytest.MonkeyPatch) -> None:
+    import scdil._dump
+
+    # the container is split into chunks by the calling process
+    monkeypatch.setattr(scdil._dump, "parallel_chunk_length", 7)
+    records = [{"id": i, "text": "a\nb" * (i % 3), "tags": [i, {}]} for i in range(40)]
+    values = [
+        records,
+        {f"key {i}": record for i, record in enumerate(records)},
+        {i if i % 5 else str(i): record for i, record in enumerate(records)},
+        [],
+        {},
+        "a\nb",
+    ]
+    for value in values:
+        for options in [{}, {"for_humans": False}, {"canonical": True}]:
+            expected = scdil.dumps(value, **options)
+            assert scdil.dumps(value, workers=2, **options) == expected
+    assert scdil.dumps(iter(records), workers=3) == scdil.dumps(records)
+    assert scdil.dumps(iter([]), workers=3) == "[]\n"
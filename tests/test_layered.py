@@ -0,0 +1,71 @@
+from textwrap import dedent
+
+import pytest
+
+import scdil
+from scdil import FrozenDict, LayeredMapping
+
+
+def test_priority() -> None:
+    host = {"a": 1}
+    env = {"a": 2, "b": 2}
+    base = {"a": 3, "b": 3, "c": 3}
+    view = LayeredMapping(host, env, base)
+    assert view["a"] == 1
+    assert view["b"] == 2
+    assert view["c"] == 3
+    assert "c" in view and "d" not in view
+    with pytest.raises(KeyError):
+        view["d"]
+    assert view.get("d", 4) == 4
+    assert len(view) == 3
+    assert list(view) == ["a", "b", "c"]
+    assert view == {"a": 1, "b": 2, "c": 3}
+
+
+def test_nested() -> None:
+    base = {"db": {"host": "localhost", "port": 5432, "opts": {"a": 1}}, "x": [1]}
+    override = {"db": {"host": "db.prod", "opts": {"b": 2}}, "x": [2]}
+    view = LayeredMapping(override, base)
+    db = view["db"]
+    assert isinstance(db, LayeredMapping)
+    assert db == {"host": "db.prod", "port": 5432, "opts": {"a": 1, "b": 2}}
+    # sequences are replaced, not merged
+    assert view["x"] == [2]
+    # merged views are cached, unmerged values are returned as is
+    assert view["db"] is db
+    assert view["x"] is override["x"]
+    assert LayeredMapping({}, base)["db"] is base["db"]
+
+
+def test_non_mapping_hides_lower_layers() -> None:
+    view = LayeredMapping({"a": {"x": 1}}, {"a": None}, {"a": {"y": 2}})
+    assert view["a"] == {"x": 1}
+    view = LayeredMapping({"a": 5}, {"a": {"y": 2}})
+    assert view["a"] == 5
+
+
+def test_dump_layered_documents() -> None:
+    base = scdil.load(
+        dedent(
+            """\
+            name: "svc"
+            limits:
+              cpu: 1
+              memory: "1Gi"
+            """
+        ),
+        immutable=True,
+    )
+    override = scdil.load("limits: cpu: 4", immutable=True)
+    assert isinstance(base, FrozenDict) and isinstance(override, FrozenDict)
+    view = LayeredMapping(override, base)
+    assert scdil.dumps(view) == dedent(
+        """\
+        name: "svc"
+        limits:
+          cpu: 4
+          memory: "1Gi"
+        """
+    )
+    assert scdil.load(scdil.dumps(view, for_humans=False)) == view
@@ -1,6 +1,14 @@
+import math
+from collections import OrderedDict
+from decimal import Decimal
+from io import StringIO
 from textwrap import dedent
 
-from scdil import FrozenDict, load
+import pytest
+
+from scdil import FrozenDict, LoadStats, load
+from scdil._load import load_json
+from scdil._parse import ParseError
 
 
 def test_1() -> None:
@@ -124,3 +132,122 @@ def test_escaped_block_folded_string() -> None:
         )
         == "Control codes are \x00 through \x1F and \x7F through \x9F.\n"
     )
+
+
+def test_json_fast_path() -> None:
+    source = '{"a": [1, -2.5e3, true, null, "\\u00e9\\n"], "b": {"c": {}}, "d": []}'
+    assert load_json(source) is not None
+    assert load(source) == {
+        "a": [1, -2500.0, True, None, "\xe9\n"],
+        "b": {"c": {}},
+        "d": [],
+    }
+    assert load(StringIO("\n [1, 2]\n")) == [1, 2]
+
+
+def test_json_fast_path_fallback() -> None:
+    # not JSON, but SCDIL
+    assert load_json("[inf, -inf]") is None
+    assert load("[inf, -inf, 0x1F]") == [math.inf, -math.inf, 31]
+    assert load('{"a": 1} # comment') == {"a": 1}
+    assert load("[1, 2,]") == [1, 2]
+    # decoded differently by JSON, which would combine the surrogate pair
+    assert load_json('["\\ud83d\\ude00"]') is None
+    assert load('["\\ud83d\\ude00"]') == ["\ud83d\ude00"]
+    # valid JSON, but not valid SCDIL
+    for source in ("[NaN]", "[Infinity]", "[\t1]", "[1]\r\n", '["\x85"]'):
+        assert load_json(source) is None
+        with pytest.raises(ParseError):
+            load(source)
+
+
+def test_immutable() -> None:
+    source = dedent(
+        """\
+        a: [1, [2], {"a": []}]
+        b: - - 1
+        "c": d: null
+        e: {[1]: {}}
+        """
+    )
+    loaded = load(source, immutable=True)
+    assert loaded == FrozenDict(
+        a=(1, (2,), FrozenDict(a=())),
+        b=((1,),),
+        c=FrozenDict(d=None),
+        e=FrozenDict({(1,): FrozenDict()}),
+    )
+    assert hash(loaded) == hash(load(source, immutable=True))
+    # JSON documents are still loaded immutably
+    stats = LoadStats()
+    loaded = load('[[1, [2]], {"a": [[3], {}]}]', immutable=True, stats=stats)
+    assert stats.json_loads == 1
+    assert loaded == ((1, (2,)), FrozenDict(a=((3,), FrozenDict())))
+    assert type(loaded[1]) is FrozenDict and type(loaded[1]["a"][1]) is FrozenDict
+
+
+def test_dedupe() -> None:
+    source = dedent(
+        """\
+        - host: "a"
+          ports: [80, 443]
+          labels: {"tier": "web", "zone": 1.5}
+        - host: "b"
+          ports: [80, 443]
+          labels: {"tier": "web", "zone": 1.5}
+        - [0.0, -0.0, 1, 1.0, true]
+        """
+    )
+    stats = LoadStats()
+    frozen = load(source, immutable=True, dedupe=True, stats=stats)
+    assert frozen == load(source, immutable=True)
+    a, b, numbers = frozen
+    assert a["ports"] is b["ports"]
+    assert a["labels"] is b["labels"]
+    assert list(a)[0] is list(b)[0]
+    assert [repr(n) for n in numbers] == ["0.0", "-0.0", "1", "1.0", "True"]
+    assert stats.dedupe_hits > 0
+    assert stats.dedupe_bytes_saved > 0
+
+    # mutable containers are never shared, but their contents are
+    mutable = load(source, dedupe=True)
+    assert mutable == load(source)
+    assert mutable[0]["ports"] is not mutable[1]["ports"]
+    assert mutable[0]["labels"]["tier"] is mutable[1]["labels"]["tier"]
+
+
+def test_hooks() -> None:
+    source = dedent(
+        """\
+        a: [1, 0x10, "b", 0.1]
+        c: - >folded
+             >text
+           - {[1]: inf}
+        """
+    )
+    loaded = load(
+        source,
+        object_pairs_hook=OrderedDict,
+        sequence_factory=tuple,
+        parse_float=Decimal,
+        parse_int=lambda text: -int(text),
+        parse_string=str.upper,
+    )
+    assert loaded == OrderedDict(
+        a=(-1, -16, "B", Decimal("0.1")),
+        c=("FOLDED TEXT", OrderedDict({(1,): Decimal("inf")})),
+    )
+    assert type(loaded["c"][1]) is OrderedDict
+    # keys are never passed to hooks
+    assert list(loaded["c"][1]) == [(1,)]
+
+
+def test_hooks_json_fast_path() -> None:
+    source = '{"a": [1, -0, 2.50], "b": {"c": null}}'
+    expected = OrderedDict(a=[1, 0, Decimal("2.50")], b=OrderedDict(c=None))
+    for src in (source, source + " # not JSON"):
+        loaded = load(src, object_pairs_hook=OrderedDict, parse_float=Decimal)
+        assert loaded == expected
+        assert type(loaded["b"]) is OrderedDict
+        assert str(loaded["a"][2]) == "2.50"
+        assert load(src, parse_int=str)["a"][:2] == ["1", "-0"]
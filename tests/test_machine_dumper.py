@@ -1,9 +1,12 @@
 import math
+import sys
+from typing import Iterator, List
 
 import pytest
 
 import scdil
 from scdil import FrozenDict
+from scdil._writers import HashWriter
 
 
 def dumps(value: scdil.Value) -> str:
@@ -85,3 +88,141 @@ def test_recursive_obj() -> None:
     d.append(d)
     with pytest.raises(ValueError):
         dumps(d)
+    d = [1, [{2: 3}]]
+    d[1][0][4] = d
+    with pytest.raises(ValueError):
+        dumps(d)
+
+
+def test_shared_obj() -> None:
+    from scdil._dump import json_compatible
+
+    shared = [1, {"a": "b"}]
+    value = {"x": shared, "y": [shared, {1: shared}], "z": ((), ())}
+    expected = '{"x":[1,{"a":"b"}],"y":[[1,{"a":"b"}],{1:[1,{"a":"b"}]}],"z":[[],[]]}'
+    assert dumps(value) == expected
+    assert scdil.dumps(value, for_humans=False, check_circular=False) == expected
+    compatible = json_compatible(value)
+    assert id(shared) in compatible and id(value["y"]) not in compatible
+    # containers holding too many levels are not compatible, shared or not
+    deep: scdil.Value = 1
+    for _ in range(99):
+        deep = [deep]
+    value = [deep, [[deep]]]
+    compatible = json_compatible(value)
+    assert id(deep) in compatible and id(value[1][0]) in compatible
+    assert id(value[1]) not in compatible and id(value) not in compatible
+    assert dumps(value) == "[" + dumps(deep) + ",[[" + dumps(deep) + "]]]"
+
+
+def test_json_fast_path() -> None:
+    from io import StringIO
+
+    from scdil._dump import MachineDumper, json_compatible
+
+    json_part = {"a": [1, 2.5, -0.0, 'b\n\t"\\\r℞'], "c": (None, True, 2**80)}
+    values = [
+        json_part,
+        [json_part, {"a": math.inf}],
+        {"x": json_part, 1: [list(json_part["c"])]},
+        FrozenDict(a=[1, "\x00\x85\x08"], b=[{"c": {}}]),
+    ]
+    for value in values:
+        streams = StringIO(), StringIO()
+        MachineDumper(streams[0], use_json=True).dump(value)
+        MachineDumper(streams[1], use_json=False).dump(value)
+        assert streams[0].getvalue() == streams[1].getvalue()
+        assert scdil.load(streams[0].getvalue()) == scdil.load(streams[1].getvalue())
+    compatible = json_compatible(values[1])
+    assert id(json_part) in compatible and id(values[1]) not in compatible
+    assert id(values[3]["b"]) in json_compatible(values[3])
+    assert id(values[3]["a"]) not in json_compatible(values[3])
+
+
+def test_deep_nesting() -> None:
+    from io import StringIO
+
+    from scdil._dump import MachineDumper
+
+    depth = sys.getrecursionlimit() * 2
+    value: scdil.Value = 1
+    for _ in range(depth):
+        value = [{"a": value}]
+    expected = '[{"a":' * depth + "1" + "}]" * depth
+    for use_json in (True, False):
+        stream = StringIO()
+        MachineDumper(stream, use_json=use_json).dump(value)
+        assert stream.getvalue() == expected
+
+
+def test_iterators() -> None:
+    def records() -> Iterator[scdil.Value]:
+        for i in range(1000):
+            yield {"id": i, "tags": (tag for tag in "ab")}
+
+    expected = [{"id": i, "tags": ["a", "b"]} for i in range(1000)]
+    assert dumps(records()) == dumps(expected)
+    assert dumps({"a": iter([]), 1: map(str, range(3))}) == '{"a":[],1:["0","1","2"]}'
+
+
+def test_canonical() -> None:
+    from io import StringIO
+
+    from scdil._dump import CanonicalDumper
+
+    value = {"b": [1, 2.0, -0.0], "a": {"é": 1, "z": 2, "B": 3}, "": None}
+    reordered = {"": None, "a": {"z": 2, "B": 3, "é": 1}, "b": [1, 2.0, -0.0]}
+    expected = '{"":null,"a":{"B":3,"z":2,"é":1},"b":[1,2.0,-0.0]}'
+    assert scdil.dumps(value, canonical=True) == expected
+    assert scdil.dumps(reordered, for_humans=False, canonical=True) == expected
+    stream = StringIO()
+    CanonicalDumper(stream, use_json=False).dump(value)
+    assert stream.getvalue() == expected
+    # keys are ordered by kind, then by their own canonical dump
+    mixed = {
+        FrozenDict(b=1, a=2): 0,
+        (2, 1): 0,
+        "x": 0,
+        1.5: 0,
+        -3: 0,
+        True: 0,
+        None: 0,
+        (1, 2): 0,
+    }
+    assert scdil.dumps(mixed, canonical=True) == (
+        '{null:0,true:0,-3:0,1.5:0,"x":0,[1,2]:0,[2,1]:0,{"a":2,"b":1}:0}'
+    )
+    nans = {float("nan"): 2, float("nan"): 1}
+    assert scdil.dumps(nans, canonical=True) == "{nan:1,nan:2}"
+
+
+def test_fingerprint() -> None:
+    import hashlib
+
+    value = {"b": [{"y": 1, "x": "\n"}], "a": (None, True)}
+    canonical = scdil.dumps(value, canonical=True).encode()
+    assert scdil.fingerprint(value) == hashlib.sha256(canonical).hexdigest()
+    assert (
+        scdil.fingerprint(value, algorithm="md5") == hashlib.md5(canonical).hexdigest()
+    )
+    assert scdil.fingerprint(dict(reversed(value.items()))) == scdil.fingerprint(value)
+    assert scdil.fingerprint(iter([1])) == scdil.fingerprint([1])
+    assert scdil.fingerprint({"a": 1}) != scdil.fingerprint({"a": 1.0})
+
+
+def test_fingerprint_is_streamed(monkeypatch: pytest.MonkeyPatch) -> None:
+    sizes: List[int] = []
+    write = HashWriter.write
+
+    def recording_write(self: HashWriter, s: str) -> int:
+        sizes.append(len(s))
+        return write(self, s)
+
+    monkeypatch.setattr(HashWriter, "write", recording_write)
+    records = [
+        {"id": i, "name": f"record {i}", "tags": ["a", "b"]} for i in range(10000)
+    ]
+    assert scdil.fingerprint(records) == scdil.fingerprint(iter(records))
+    total = len(scdil.dumps(records, canonical=True))
+    assert sum(sizes) == 2 * total
+    assert max(sizes) < total // 10
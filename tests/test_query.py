@@ -0,0 +1,87 @@
+from typing import Any
+
+import pytest
+
+import scdil
+from scdil import FrozenDict, PathIndex, query
+
+cfg = scdil.load(
+    """\
+services:
+  - name: "web"
+    ports: [80, 443]
+    enabled: true
+  - name: "db"
+    ports: [5432]
+    enabled: false
+    weight: 1.5
+"odd key": {"a b": 1, 3: "three"}
+"""
+)
+
+
+def test_paths() -> None:
+    assert query("services[0].ports[1]").get(cfg) == 443
+    assert query("services[-1].name").get(cfg) == "db"
+    assert query('["odd key"]["a b"]').get(cfg) == 1
+    assert query('["odd key"][3]').get(cfg) == "three"
+    assert query("").get(cfg) is cfg
+    assert query("services[0].ports").keys == ("services", 0, "ports")
+    assert query("services[0]") is query("services[0]")
+    # strings are not indexed
+    assert query("services[0].name[0]").get(cfg, None) is None
+    with pytest.raises(KeyError):
+        query("services[2]").get(cfg)
+
+
+def test_wildcards_and_filters() -> None:
+    assert query("services[*].name").all(cfg) == ["web", "db"]
+    assert query("services.*.ports[0]").all(cfg) == [80, 5432]
+    assert query('services[?name == "db"].ports').all(cfg) == [[5432]]
+    assert query("services[?weight].name").all(cfg) == ["db"]
+    assert query("services[?weight >= 1].name").all(cfg) == ["db"]
+    assert query("services[?ports[1] > 100].name").all(cfg) == ["web"]
+    assert query("services[?enabled == true].name").get(cfg) == "web"
+    # booleans are not numbers
+    assert query("services[?enabled == 1].name").all(cfg) == []
+    assert query('*[?name != "web"].name').all(cfg) == ["db"]
+    assert query("services[*].weight").all(cfg) == [1.5]
+    assert query("services[*].name").keys is None
+
+
+@pytest.mark.parametrize(
+    "text", ["a..b", "a[", "[?]", "a[1.5]", "a[?b == [1]]", "a#", ".a", "a[?b ==]"]
+)
+def test_invalid(text: str) -> None:
+    with pytest.raises(ValueError):
+        query(text)
+
+
+def test_path_index() -> None:
+    index = PathIndex(cfg)
+    assert type(index.value) is FrozenDict
+    assert index["services[1].ports[0]"] == 5432
+    assert index[("services", 0, "name")] == "web"
+    assert index["services[-1].name"] == "db"
+    assert index.get("services[2]") is None
+    assert "services[0].weight" not in index
+    assert index.all("services[*].name") == ["web", "db"]
+    with pytest.raises(ValueError):
+        index["services[*]"]
+    with pytest.raises(KeyError):
+        index[("services", 0, "name", 0)]
+
+
+def test_index_miss_does_not_compile(monkeypatch: pytest.MonkeyPatch) -> None:
+    index = PathIndex(cfg)
+    path = ("services", 5, "name")
+    assert index.get(path) is None
+    assert index[("services", -1, "name")] == "db"
+
+    def compile(keys: Any) -> None:
+        raise AssertionError("compiled a lookup")
+
+    monkeypatch.setattr(scdil._query, "_lookup", compile)
+    assert path not in index and index.get(path) is None
+    assert ("services", 2, "name") not in index
+    assert index[("services", -1, "name")] == "db"
@@ -0,0 +1,91 @@
+import math
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+
+import scdil
+from scdil import FrozenDict, Reloader
+from scdil._reload import KeyPath, merge
+
+
+def test_merge() -> None:
+    old = {"a": {"b": [1, 2]}, "c": {"d": 1}, "e": "x", "f": math.nan, "g": [1, 2]}
+    new = {
+        "a": {"b": [1, 2]},
+        "c": {"d": 2},
+        "e": "x",
+        "f": float("nan"),
+        "g": [1],
+        "h": 1,
+    }
+    merged, changes = merge(old, new)
+    # NaNs are not equal, but dump the same
+    assert scdil.dumps(merged) == scdil.dumps(new)
+    assert merged["a"] is old["a"]
+    assert merged["e"] is old["e"] and merged["f"] is old["f"]
+    assert merged["c"] is not old["c"]
+    assert changes == [("c", "d"), ("g", 1), ("h",)]
+    merged, changes = merge(old, scdil.load(scdil.dumps(old)))
+    assert merged is old and changes == []
+    assert merge(old, [1]) == ([1], [()])
+    # bools and ints are different values
+    assert merge({"a": 1}, {"a": True}) == ({"a": True}, [("a",)])
+    assert merge({"a": 1, "b": 2}, {"a": 1}) == ({"a": 1}, [("b",)])
+    # so are 0.0 and -0.0
+    merged, changes = merge([0.0, -0.0], [-0.0, -0.0])
+    assert [math.copysign(1.0, x) for x in merged] == [-1.0, -1.0]
+    assert changes == [(0,)]
+
+
+def test_merge_immutable() -> None:
+    old = scdil.load("a:\n  - 1\n  - [2]\nb: 1\n", immutable=True)
+    new = scdil.load("a:\n  - 1\n  - [2]\nb: 2\n", immutable=True)
+    merged, changes = merge(old, new)
+    assert type(merged) is FrozenDict and merged == new
+    assert merged["a"] is old["a"]
+    assert changes == [("b",)]
+
+
+def test_reload(tmp_path: Path) -> None:
+    path = tmp_path / "config.scdil"
+    scdil.dump_file(path, {"db": {"host": "a", "port": 1}, "cache": {"size": 1}})
+    reloader = Reloader(path)
+    old = reloader.value
+    calls: List[List[KeyPath]] = []
+    db_calls: List[List[KeyPath]] = []
+    reloader.subscribe(calls.append)
+    reloader.subscribe(db_calls.append, prefix=("db",))
+    assert reloader.poll() == []
+
+    scdil.dump_file(path, {"db": {"host": "a", "port": 1}, "cache": {"size": 2}})
+    assert reloader.poll() == [("cache", "size")]
+    assert reloader.value["db"] is old["db"]
+    assert calls == [[("cache", "size")]]
+    assert db_calls == []
+
+    # a file that fails to load keeps the old value
+    path.write_text("db: [")
+    with pytest.raises(scdil._parse.ParseError):
+        reloader.poll()
+    assert reloader.error is not None
+    assert reloader.value["cache"] == {"size": 2}
+
+    scdil.dump_file(path, {"db": 1})
+    assert reloader.poll() == [("db",), ("cache",)]
+    assert reloader.error is None
+    assert db_calls == [[("db",)]]
+
+
+def test_reload_thread(tmp_path: Path) -> None:
+    path = tmp_path / "config.scdil"
+    scdil.dump_file(path, {"a": 1})
+    with Reloader(path, interval=0.01) as reloader:
+        scdil.dump_file(path, {"a": 2})
+        deadline = time.monotonic() + 10
+        while reloader.value != {"a": 2} and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert reloader.value == {"a": 2}
+        with pytest.raises(RuntimeError):
+            reloader.start()
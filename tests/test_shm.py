@@ -0,0 +1,233 @@
+import math
+import multiprocessing
+import os
+import sys
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, List
+
+import pytest
+
+import scdil
+from scdil import (
+    FrozenDict,
+    SharedChannel,
+    SharedMapping,
+    SharedSequence,
+    from_shared_memory,
+    to_shared_memory,
+)
+from scdil._shm import _attach, _sequence
+
+
+@pytest.fixture
+def name() -> Iterator[str]:
+    yield f"scdil_test_{os.getpid()}"
+
+
+def test_round_trip() -> None:
+    shared = [1, 2]
+    value = {
+        "scalars": [
+            None,
+            True,
+            False,
+            0,
+            -1,
+            2**70,
+            -(2**70),
+            1.5,
+            -0.0,
+            "℞\ud83d",
+        ],
+        "nested": {"a": shared, "b": [shared, {}], "c": []},
+        (1, "a"): "tuple key",
+        1: "int key",
+        2.5: "float key",
+    }
+    shm = to_shared_memory(value)
+    try:
+        view = from_shared_memory(shm.name)
+        assert isinstance(view, SharedMapping)
+        assert view == value
+        assert scdil.freeze(view) == scdil.freeze(value)
+        scalars = view["scalars"]
+        assert isinstance(scalars, SharedSequence)
+        assert scalars == value["scalars"] and tuple(value["scalars"]) == scalars
+        assert math.copysign(1.0, scalars[-2]) == -1.0
+        assert scalars[1:3] == (True, False)
+        with pytest.raises(IndexError):
+            scalars[10]
+        assert list(view) == list(value)
+        assert view[(1, "a")] == "tuple key"
+        assert FrozenDict() not in view
+        nested = view["nested"]
+        assert nested["a"] == nested["b"][0] == shared
+        del view, scalars
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_lookup() -> None:
+    value = {f"key{i}": i for i in range(100)}
+    value.update({1: "one", 0.0: "zero", None: "null"})
+    shm = to_shared_memory(value)
+    try:
+        view = from_shared_memory(shm)
+        assert all(view[f"key{i}"] == i for i in range(100))
+        # equal numbers find the same key, like in a dict
+        assert view[1] == view[1.0] == view[True] == "one"
+        assert view[0] == view[-0.0] == view[False] == "zero"
+        assert view[None] == "null"
+        assert "key100" not in view and 2 not in view and 0.5 not in view
+        assert view.get("missing") is None
+        with pytest.raises(KeyError):
+            view["missing"]
+        assert list(view.items()) == list(value.items())
+        assert list(view.values()) == list(value.values())
+        del view
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_dump() -> None:
+    value = {"a": [1, "b", {"c": None}], "d": 1.5}
+    shm = to_shared_memory(value)
+    try:
+        view = from_shared_memory(shm)
+        for for_humans in (True, False):
+            dumped = scdil.dumps(view, for_humans=for_humans)
+            assert dumped == scdil.dumps(value, for_humans=for_humans)
+        del view
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_scalar_and_errors() -> None:
+    shm = to_shared_memory("root")
+    try:
+        assert from_shared_memory(shm) == "root"
+    finally:
+        shm.close()
+        shm.unlink()
+    recursive: list = []
+    recursive.append(recursive)
+    with pytest.raises(ValueError):
+        to_shared_memory(recursive)
+    with pytest.raises(TypeError):
+        to_shared_memory([object()])
+
+
+def _read_channel(name: str) -> object:
+    channel = SharedChannel(name)
+    try:
+        return scdil.thaw(channel.get())
+    finally:
+        channel.close()
+
+
+def test_channel(name: str) -> None:
+    publisher = SharedChannel(name, create=True)
+    try:
+        reader = SharedChannel(name)
+        with pytest.raises(LookupError):
+            reader.get()
+        assert publisher.publish({"version": 1}) == 1
+        first = reader.get()
+        assert first == {"version": 1} and reader.get() is first
+        assert publisher.publish({"version": 2, "list": [1, 2]}) == 2
+        assert reader.version == 2
+        assert reader.get() == {"version": 2, "list": [1, 2]}
+        # views of a previous version stay valid
+        assert first == {"version": 1}
+        with pytest.raises(ValueError):
+            reader.publish(None)
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(2) as pool:
+            results = pool.map(_read_channel, [name, name])
+        assert results == [{"version": 2, "list": [1, 2]}] * 2
+        del first
+        reader.close()
+    finally:
+        publisher.close()
+        publisher.unlink()
+
+
+def test_channel_publisher_views(name: str) -> None:
+    publisher = SharedChannel(name, create=True)
+    try:
+        publisher.publish({"version": 1, "list": [1, 2]})
+        first = publisher.get()
+        publisher.publish({"version": 2})
+        assert first == {"version": 1, "list": [1, 2]}
+        second = publisher.get()
+        publisher.close()
+        assert second == {"version": 2}
+        assert first["list"] == [1, 2]
+    finally:
+        publisher.unlink()
+
+
+def test_channel_dead_publisher(name: str) -> None:
+    publisher = SharedChannel(name, create=True)
+    try:
+        publisher.publish(1)
+        reader = SharedChannel(name)
+        reader.read_timeout = 0.05
+        # as left by a publisher that died while publishing
+        _sequence.pack_into(publisher._control_buf, 4, 3)
+        with pytest.raises(TimeoutError):
+            reader.get()
+        _sequence.pack_into(publisher._control_buf, 4, 4)
+        assert reader.get() == 1
+        reader.close()
+    finally:
+        publisher.close()
+        publisher.unlink()
+
+
+@pytest.mark.skipif(sys.version_info >= (3, 13), reason="attaches with track=False")
+def test_attach_registers_other_blocks(
+    name: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    registered: List[str] = []
+    monkeypatch.setattr(
+        resource_tracker, "register", lambda tracked, rtype: registered.append(tracked)
+    )
+    record = resource_tracker.register
+    shm = shared_memory.SharedMemory(name, create=True, size=16)
+    try:
+        attach = shared_memory.SharedMemory
+
+        def attach_while_other_created(block: str) -> shared_memory.SharedMemory:
+            # stands for a block created by another thread during the attach
+            resource_tracker.register("/other", "shared_memory")
+            return attach(block)
+
+        monkeypatch.setattr(shared_memory, "SharedMemory", attach_while_other_created)
+        attached = _attach(name)
+        assert registered == [shm._name, "/other"]  # type: ignore[attr-defined]
+        attached.close()
+        assert resource_tracker.register is record
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_share_view() -> None:
+    value = {"a": [1, {"b": 2}], "c": {"d": [3]}}
+    shm = to_shared_memory(value)
+    try:
+        copy = to_shared_memory(from_shared_memory(shm))
+        try:
+            view = from_shared_memory(copy)
+            assert view == value
+            del view
+        finally:
+            copy.close()
+            copy.unlink()
+    finally:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,119 @@
+import sys
+from io import StringIO
+from textwrap import dedent
+from typing import Iterator, TextIO, cast
+
+import scdil
+from scdil import DumpStats, FrozenDict, LoadStats
+from scdil._dump import MachineDumper
+from scdil._stats import StatsWriter
+
+
+def test_load_stats() -> None:
+    source = dedent(
+        """\
+        a: [1, 2, {"b": 1}]
+        c: - null
+        """
+    )
+    stats = LoadStats()
+    assert scdil.load(source, stats=stats) == scdil.load(source)
+    assert stats.bytes_read == len(source)
+    assert stats.token_counts["Name"] == 2
+    assert stats.token_counts["Integer"] == 3
+    assert stats.token_counts["Comma"] == 2
+    assert stats.token_counts["Dash"] == 1
+    # root, a, [1, 2, {..}], 1, 2, {..}, "b", 1, c, [null], null
+    assert stats.node_count == 11
+    assert stats.max_depth == 3
+    assert stats.total_time >= stats.parse_time + stats.lex_time + stats.eval_time
+    assert min(stats.read_time, stats.lex_time, stats.parse_time) >= 0
+
+
+def test_load_stats_accumulate() -> None:
+    stats = LoadStats()
+    scdil.load("[1]", stats=stats)
+    scdil.load(StringIO("- - 2"), stats=stats)
+    assert stats.bytes_read == 8
+    assert stats.json_loads == 1
+    assert stats.token_counts["Integer"] == 1
+    assert stats.node_count == 5
+    assert stats.max_depth == 2
+
+
+def test_load_stats_counts_utf8_bytes() -> None:
+    stats = LoadStats()
+    scdil.load('"℞"', stats=stats)
+    assert stats.bytes_read == 5
+
+
+def test_dump_stats() -> None:
+    value = {"a": [1, 2, {None: 1}], "c": "d"}
+    for for_humans in (True, False):
+        stats = DumpStats()
+        dumped = scdil.dumps(value, for_humans=for_humans, stats=stats)
+        assert dumped == scdil.dumps(value, for_humans=for_humans)
+        assert stats.bytes_written == len(dumped)
+        assert stats.write_calls > 0
+        assert stats.node_count == 10
+        assert stats.max_depth == 3
+        assert stats.total_time >= stats.dump_time
+
+
+def test_dump_stats_iterator() -> None:
+    def inner() -> Iterator[scdil.Value]:
+        yield {"c": [1]}
+
+    def elements() -> Iterator[scdil.Value]:
+        yield 1
+        yield {"a": [1, 2], "b": inner()}
+        yield [3]
+
+    for for_humans in (True, False):
+        stats = DumpStats()
+        scdil.dumps(elements(), for_humans=for_humans, stats=stats)
+        assert stats.node_count == 15
+        assert stats.max_depth == 5
+    stats = DumpStats()
+    scdil.dumps(iter(range(1000)), workers=2, stats=stats)
+    assert stats.node_count == 1001
+    assert stats.max_depth == 1
+
+
+def test_dump_buffers_writes() -> None:
+    value = [{"a": i, "b": [str(i)]} for i in range(10000)]
+    for for_humans in (True, False):
+        stats = DumpStats()
+        scdil.dumps(value, for_humans=for_humans, stats=stats)
+        # output is written in large chunks, not once per token
+        assert 0 < stats.write_calls < 100
+
+
+def test_dump_bounds_writes() -> None:
+    # the output of containers of scalars is written as it grows too
+    values = [
+        list(range(200000)),
+        {str(i): i for i in range(100000)},
+        {1: [2] * 200000},
+    ]
+    for value in values:
+        stats = DumpStats()
+        dumped = scdil.dumps(value, stats=stats)
+        assert stats.write_calls > 10
+        assert stats.bytes_written == len(dumped)
+    writer = StatsWriter(StringIO())
+    MachineDumper(cast(TextIO, writer), use_json=False).dump(values[0])
+    assert writer.write_calls > 10
+
+
+def test_deep_sizeof() -> None:
+    assert scdil.deep_sizeof(1) == sys.getsizeof(1)
+    shared = "shared string"
+    value = [shared, shared]
+    assert scdil.deep_sizeof(value) == sys.getsizeof(value) + sys.getsizeof(shared)
+    frozen = FrozenDict(a=[1.5])
+    assert scdil.deep_sizeof(frozen) > scdil.deep_sizeof({"a": [1.5]})
+    loaded = scdil.load("a: [1, 2]")
+    assert scdil.deep_sizeof(loaded) == sum(
+        sys.getsizeof(obj) for obj in (loaded, "a", loaded["a"], 1, 2)
+    )
@@ -0,0 +1,77 @@
+import io
+import os
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+
+import scdil
+from scdil._writers import FdWriter, write_all
+
+value = {"a": [1, "é℞\ud83d", {"b": None}], "c": "x\ny"}
+expected = scdil.dumps(value).encode("utf-8", "surrogatepass")
+
+
+def test_binary_targets() -> None:
+    buffer = bytearray(b"#")
+    scdil.dump(value, stream=buffer)
+    assert buffer == b"#" + expected
+    stream = io.BytesIO()
+    scdil.dump(value, stream=stream)
+    assert stream.getvalue() == expected
+
+
+class SlowRawStream(io.RawIOBase):
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: Any) -> int:
+        self.data += bytes(b[:3])
+        return min(len(b), 3)
+
+
+def test_partial_writes() -> None:
+    stream = SlowRawStream()
+    scdil.dump(value, stream=stream)
+    assert stream.data == expected
+
+
+def test_fd(tmp_path: Path) -> None:
+    path = tmp_path / "out.scdil"
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+    try:
+        scdil.dump(value, stream=fd, for_humans=False)
+    finally:
+        os.close(fd)
+    assert path.read_bytes() == scdil.dumps(value, for_humans=False).encode(
+        "utf-8", "surrogatepass"
+    )
+
+
+def test_write_all() -> None:
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(read_fd, "rb") as reader:
+        with os.fdopen(write_fd, "wb") as out:
+            writer = FdWriter(out.fileno(), buffer_size=100)
+            chunks: List[str] = [str(i) * (i % 7) for i in range(3000)]
+            for chunk in chunks:
+                writer.write(chunk)
+            writer.flush()
+            write_all(out.fileno(), [])
+        assert reader.read() == "".join(chunks).encode()
+
+
+def test_dump_file(tmp_path: Path) -> None:
+    path = tmp_path / "out.scdil"
+    scdil.dump_file(path, value)
+    assert path.read_bytes() == expected
+    scdil.dump_file(str(path), [1], for_humans=False)
+    assert path.read_text() == "[1]"
+    # a failed dump leaves the file as it was
+    with pytest.raises(TypeError):
+        scdil.dump_file(path, [1, object()])
+    assert path.read_text() == "[1]"
+    assert os.listdir(tmp_path) == ["out.scdil"]